@@ -0,0 +1,121 @@
+"""
+Time of the play rating calculations, against their former `Decimal`-only
+implementations.
+
+    python benchmarks/calculate.py [--number 20000]
+"""
+
+import argparse
+import random
+import timeit
+from decimal import Decimal
+from types import SimpleNamespace
+
+from arcaea_offline.calculate import (
+    calculate_b30,
+    calculate_constants_from_play_rating,
+    calculate_play_rating,
+    get_b30_calculated_list,
+)
+from arcaea_offline.calculate.score import calculate_play_rating_fixed
+
+# region former implementations
+
+
+def decimal_score_modifier(score: int) -> Decimal:
+    if score >= 10000000:
+        return Decimal(2)
+    if score >= 9800000:
+        return Decimal(1) + (Decimal(score - 9800000) / 200000)
+    return Decimal(score - 9500000) / 300000
+
+
+def decimal_play_rating(constant: int, score: int) -> Decimal:
+    return max(Decimal(0), Decimal(constant) / 10 + decimal_score_modifier(score))
+
+
+def decimal_constants_from_play_rating(play_rating):
+    play_rating = Decimal(play_rating)
+    ranges = []
+    for upper_score, lower_score in [
+        (10000000, 9900000),
+        (9899999, 9800000),
+        (9799999, 9500000),
+        (9499999, 9200000),
+        (9199999, 8900000),
+        (8899999, 8600000),
+    ]:
+        ranges.append(
+            (
+                play_rating - decimal_score_modifier(upper_score),
+                play_rating - decimal_score_modifier(lower_score),
+            )
+        )
+    return ranges
+
+
+def decimal_b30(calculated_list) -> Decimal:
+    ptt_list = [Decimal(c.potential) for c in get_b30_calculated_list(calculated_list)]
+    sum_ptt_list = sum(ptt_list)
+    return (sum_ptt_list / len(ptt_list)) if sum_ptt_list else Decimal("0.0")
+
+
+# endregion
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--number", type=int, default=20000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    plays = [
+        (rng.randrange(10, 120), rng.randrange(9000000, 10002000)) for _ in range(1000)
+    ]
+    calculated = [
+        SimpleNamespace(
+            song_id=f"song{i}",
+            rating_class=2,
+            score=score,
+            potential=float(calculate_play_rating(constant, score)),
+        )
+        for i, (constant, score) in enumerate(plays[:60])
+    ]
+
+    def play_rating_decimal():
+        for constant, score in plays:
+            decimal_play_rating(constant, score)
+
+    def play_rating():
+        for constant, score in plays:
+            calculate_play_rating(constant, score)
+
+    def play_rating_fixed():
+        for constant, score in plays:
+            calculate_play_rating_fixed(constant, score)
+
+    cases = [
+        ("play rating, Decimal", play_rating_decimal, 1000),
+        ("play rating", play_rating, 1000),
+        ("play rating, fixed point", play_rating_fixed, 1000),
+        ("b30 of 60 scores, Decimal", lambda: decimal_b30(calculated), 1),
+        ("b30 of 60 scores", lambda: calculate_b30(calculated), 1),
+        (
+            "constants from play rating, Decimal",
+            lambda: decimal_constants_from_play_rating("12.3456"),
+            1,
+        ),
+        (
+            "constants from play rating",
+            lambda: calculate_constants_from_play_rating("12.3456"),
+            1,
+        ),
+    ]
+    for name, func, calls in cases:
+        number = max(args.number // calls, 1)
+        seconds = timeit.timeit(func, number=number)
+        print(f"{name:>38}: {seconds / number / calls * 1e6:8.3f}us")
+
+
+if __name__ == "__main__":
+    main()
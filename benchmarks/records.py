@@ -0,0 +1,58 @@
+"""
+Memory and time to load scores as ORM instances vs. as records.
+
+    python benchmarks/records.py [--rows 100000]
+"""
+
+import argparse
+import gc
+import time
+import tracemalloc
+
+from sqlalchemy import create_engine
+
+from arcaea_offline.database import Database
+
+
+def measure(load):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    results = load()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del results
+    return elapsed, retained, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite:///:memory:")
+    database = Database(engine)
+    database.engine = engine
+    database.init()
+    database.insert_scores(
+        (f"song{i % 500}", i % 4, 9_000_000 + i, 1000, 10, 2, 1_600_000_000 + i)
+        for i in range(args.rows)
+    )
+
+    print(f"{args.rows} scores")
+    print(f"{'':>10} {'time':>10} {'retained':>12} {'peak':>12}")
+    for name, load in [
+        ("orm", database.get_scores),
+        ("records", lambda: database.get_scores(as_records=True)),
+    ]:
+        elapsed, retained, peak = measure(load)
+        print(
+            f"{name:>10} {elapsed:>9.3f}s "
+            f"{retained / 2**20:>10.1f}MB {peak / 2**20:>10.1f}MB"
+        )
+
+
+if __name__ == "__main__":
+    main()
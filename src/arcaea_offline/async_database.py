@@ -0,0 +1,95 @@
+import asyncio
+import functools
+import inspect
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Any, AsyncIterator, Callable, Iterator, Optional, TypeVar
+
+from .database import Database
+
+__all__ = ["AsyncDatabase"]
+
+T = TypeVar("T")
+
+
+class AsyncDatabase:
+    """
+    Asyncio front of a `Database`: every public `Database` method is available
+    as a coroutine of the same name and arguments, e.g.
+    `await async_database.get_b30()`.
+
+    Methods returning iterators, like `iter_scores`, return async iterators
+    instead, e.g. `async for score in async_database.iter_scores()`: the rows
+    are fetched `page_size` at a time on the thread pool, never on the event
+    loop. Other attributes, properties included, are the `Database`'s own.
+
+    The calls run on a thread pool of at most `max_workers` threads, so at most
+    `max_workers` connections are checked out of the engine's pool at a time,
+    and they are reused across calls. The engine must be able to share its
+    database between threads, i.e. a database file, or `StaticPool` for an
+    in-memory database.
+    """
+
+    # `Database` methods returning lazy iterators, which query while iterated
+    ITERATOR_METHODS = frozenset(["iter_scores", "iter_scores_calculated"])
+    DEFAULT_PAGE_SIZE = 1000
+
+    def __init__(self, database: Optional[Database] = None, *, max_workers: int = 4):
+        self.database = database if database is not None else Database(None)
+        self.executor = ThreadPoolExecutor(
+            max_workers, thread_name_prefix="arcaea-offline-async"
+        )
+
+    async def run(self, func: Callable[..., T], *args, **kwargs) -> T:
+        """Run `func(*args, **kwargs)` on the thread pool."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.executor, functools.partial(func, *args, **kwargs)
+        )
+
+    async def iterate(
+        self, func: Callable[..., Iterator[T]], *args, page_size: int, **kwargs
+    ) -> AsyncIterator[T]:
+        """
+        Iterate over `func(*args, page_size=page_size, **kwargs)`, pulling
+        `page_size` items at a time on the thread pool.
+        """
+        iterator = await self.run(func, *args, page_size=page_size, **kwargs)
+        try:
+            while items := await self.run(list, islice(iterator, page_size)):
+                for item in items:
+                    yield item
+        finally:
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                await self.run(close)
+
+    def __getattr__(self, name: str) -> Any:
+        if name in ("database", "executor"):
+            raise AttributeError(name)
+        attribute = getattr(self.database, name)
+        if name.startswith("_") or not inspect.ismethod(attribute):
+            return attribute
+
+        if name in self.ITERATOR_METHODS:
+
+            @functools.wraps(attribute)
+            def iterator_method(*args, page_size=self.DEFAULT_PAGE_SIZE, **kwargs):
+                return self.iterate(attribute, *args, page_size=page_size, **kwargs)
+
+            return iterator_method
+
+        @functools.wraps(attribute)
+        async def method(*args, **kwargs):
+            return await self.run(attribute, *args, **kwargs)
+
+        return method
+
+    def close(self, *, wait: bool = True):
+        self.executor.shutdown(wait=wait)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await asyncio.get_running_loop().run_in_executor(None, self.close)
@@ -0,0 +1,249 @@
+"""
+Bulk score ingestion through Core `executemany`, bypassing the ORM unit of work,
+and maintenance of `Score.fingerprint`.
+"""
+
+from dataclasses import dataclass
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Sequence, Union
+
+from sqlalchemy import Connection, bindparam, exists, func, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from .models.scores import Score
+from .utils.score_fingerprint import score_fingerprint
+
+__all__ = [
+    "SCORE_TUPLE_FIELDS",
+    "DUPLICATE_KEY",
+    "InsertScoresResult",
+    "ScoreRow",
+    "score_rows",
+    "insert_score_rows",
+    "insert_scores",
+    "FingerprintBackfillResult",
+    "backfill_score_fingerprints",
+]
+
+ScoreRow = Union[Score, Mapping[str, Any], Sequence[Any]]
+
+SCORE_TUPLE_FIELDS = (
+    "song_id",
+    "rating_class",
+    "score",
+    "pure",
+    "far",
+    "lost",
+    "date",
+    "max_recall",
+    "modifier",
+    "clear_type",
+    "comment",
+)
+"""field order of scores given as tuples, trailing fields can be omitted"""
+
+_SCORE_TABLE = Score.__table__
+_COLUMN_NAMES = [c.name for c in _SCORE_TABLE.columns]
+DUPLICATE_KEY = ("song_id", "rating_class", "score", "date")
+"""with `skip_duplicate=True`, scores are duplicates if all these are the same"""
+
+
+@dataclass
+class InsertScoresResult:
+    inserted: int = 0
+    skipped: int = 0
+    """duplicates not inserted, with `skip_duplicate=True`"""
+    chunks: int = 0
+
+    def __add__(self, other: "InsertScoresResult") -> "InsertScoresResult":
+        return InsertScoresResult(
+            inserted=self.inserted + other.inserted,
+            skipped=self.skipped + other.skipped,
+            chunks=self.chunks + other.chunks,
+        )
+
+    @property
+    def total(self) -> int:
+        return self.inserted + self.skipped
+
+
+def _score_row(item: ScoreRow) -> Dict[str, Any]:
+    if isinstance(item, Score):
+        values = {name: getattr(item, name) for name in _COLUMN_NAMES}
+    elif isinstance(item, Mapping):
+        unknown = item.keys() - set(_COLUMN_NAMES)
+        if unknown:
+            raise ValueError(f"Unknown score fields {sorted(unknown)!r}")
+        values = dict(item)
+    else:
+        if len(item) > len(SCORE_TUPLE_FIELDS):
+            raise ValueError(
+                f"A score tuple has at most {len(SCORE_TUPLE_FIELDS)} fields, "
+                f"got {len(item)}"
+            )
+        values = dict(zip(SCORE_TUPLE_FIELDS, item))
+    # `executemany` needs every row to bind the same parameters
+    row = {name: values.get(name) for name in _COLUMN_NAMES}
+    row["fingerprint"] = score_fingerprint(row)
+    return row
+
+
+def score_rows(items: Iterable[ScoreRow], chunk_size: int) -> Iterator[List[dict]]:
+    """Lazily convert `items` to chunks of row dicts of the `scores` table."""
+    iterator = iter(items)
+    while chunk := [_score_row(item) for item in islice(iterator, chunk_size)]:
+        yield chunk
+
+
+def _insert_skipping_duplicates(duplicate_key: Sequence[str]):
+    params = {c.name: bindparam(c.name, type_=c.type) for c in _SCORE_TABLE.columns}
+    duplicate = exists().where(
+        *[
+            _SCORE_TABLE.c[name].is_not_distinct_from(params[name])
+            for name in duplicate_key
+        ]
+    )
+    return _ignore_fingerprint_conflicts(
+        sqlite_insert(_SCORE_TABLE).from_select(
+            _COLUMN_NAMES, select(*params.values()).where(~duplicate)
+        )
+    )
+
+
+def _ignore_fingerprint_conflicts(stmt):
+    # the target must repeat the `WHERE` of the partial unique index
+    return stmt.on_conflict_do_nothing(
+        index_elements=[_SCORE_TABLE.c.fingerprint],
+        index_where=_SCORE_TABLE.c.date.is_not(None),
+    )
+
+
+def insert_score_rows(
+    conn: Connection,
+    rows: List[dict],
+    *,
+    skip_duplicate: bool = False,
+    duplicate_key: Sequence[str] = DUPLICATE_KEY,
+) -> InsertScoresResult:
+    """
+    Insert `rows` with one `executemany`.
+
+    Dated rows with the fingerprint of a dated score already in the database,
+    or of an earlier row, are always skipped through `ON CONFLICT DO NOTHING`.
+    If `skip_duplicate`, rows with the same `duplicate_key` columns as an
+    existing score are skipped as well, by the `INSERT ... SELECT ... WHERE NOT
+    EXISTS` itself.
+    """
+    if not rows:
+        return InsertScoresResult()
+    stmt = (
+        _insert_skipping_duplicates(duplicate_key)
+        if skip_duplicate
+        else _ignore_fingerprint_conflicts(sqlite_insert(_SCORE_TABLE))
+    )
+    inserted = conn.execute(stmt, rows).rowcount
+    return InsertScoresResult(inserted=inserted, skipped=len(rows) - inserted, chunks=1)
+
+
+def insert_scores(
+    conn: Connection,
+    items: Iterable[ScoreRow],
+    *,
+    chunk_size: int = 1000,
+    skip_duplicate: bool = False,
+    duplicate_key: Sequence[str] = DUPLICATE_KEY,
+) -> InsertScoresResult:
+    """`insert_score_rows` for every chunk of `items`, on the same transaction."""
+    result = InsertScoresResult()
+    for rows in score_rows(items, chunk_size):
+        result += insert_score_rows(
+            conn, rows, skip_duplicate=skip_duplicate, duplicate_key=duplicate_key
+        )
+    return result
+
+
+@dataclass
+class FingerprintBackfillResult:
+    updated: int = 0
+    """scores whose fingerprint was missing or outdated"""
+    merged: int = 0
+    """duplicate scores merged into an earlier one and deleted"""
+
+
+# columns a duplicate can fill in on the score it's merged into
+_MERGED_COLUMNS = ("date", "max_recall", "modifier", "clear_type", "comment")
+
+
+def backfill_score_fingerprints(
+    conn: Connection, *, page_size: int = 1000
+) -> FingerprintBackfillResult:
+    """
+    Compute the fingerprint of every score, for databases created before
+    fingerprints existed, and merge duplicate scores into the earliest one.
+
+    Scores are walked in `id` order, one page at a time. A dated score with
+    the fingerprint of an earlier dated score fills the empty columns of that
+    score, and is deleted. Undated scores are never merged.
+    """
+    table = _SCORE_TABLE
+    result = FingerprintBackfillResult()
+    kept_ids: Dict[str, int] = {}
+
+    last_id = None
+    while True:
+        stmt = select(table).order_by(table.c.id).limit(page_size)
+        if last_id is not None:
+            stmt = stmt.where(table.c.id > last_id)
+        rows = conn.execute(stmt).mappings().all()
+        if not rows:
+            return result
+        last_id = rows[-1]["id"]
+
+        for row in rows:
+            fingerprint = score_fingerprint(row)
+            if row["date"] is None:
+                # undated scores aren't unique, see `Score.__table_args__`
+                if row["fingerprint"] != fingerprint:
+                    conn.execute(
+                        table.update()
+                        .where(table.c.id == row["id"])
+                        .values(fingerprint=fingerprint)
+                    )
+                    result.updated += 1
+                continue
+
+            kept_id = kept_ids.get(fingerprint)
+
+            if kept_id is not None:
+                conn.execute(
+                    table.update()
+                    .where(table.c.id == kept_id)
+                    .values(
+                        {
+                            name: func.coalesce(table.c[name], row[name])
+                            for name in _MERGED_COLUMNS
+                        }
+                    )
+                )
+                conn.execute(table.delete().where(table.c.id == row["id"]))
+                result.merged += 1
+                continue
+
+            kept_ids[fingerprint] = row["id"]
+            if row["fingerprint"] != fingerprint:
+                # a later score may hold it, it gets its own when its turn comes
+                conn.execute(
+                    table.update()
+                    .where(
+                        (table.c.fingerprint == fingerprint)
+                        & table.c.date.is_not(None)
+                        & (table.c.id > row["id"])
+                    )
+                    .values(fingerprint=None)
+                )
+                conn.execute(
+                    table.update()
+                    .where(table.c.id == row["id"])
+                    .values(fingerprint=fingerprint)
+                )
+                result.updated += 1
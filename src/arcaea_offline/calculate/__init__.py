@@ -1,4 +1,10 @@
-from .b30 import calculate_b30, get_b30_calculated_list
+from .b30 import B30Tracker, calculate_b30, get_b30_calculated_list
+from .batch import (
+    calculate_play_ratings,
+    calculate_score_modifiers,
+    calculate_score_ranges,
+    calculate_shiny_pures,
+)
 from .score import (
     calculate_constants_from_play_rating,
     calculate_play_rating,
@@ -1,24 +1,255 @@
+import heapq
 from decimal import Decimal
-from typing import Dict, List
+from itertools import count, islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
 
 from ..models.scores import ScoreCalculated
+from .score import fixed_to_decimal, potential_to_fixed
+
+ChartKey = Tuple[str, int]
+# greater is better: play rating, then score, then the earlier added
+_RankKey = Tuple[int, int, int]
+
+
+class _Entry:
+    __slots__ = ("score", "chart", "rating", "rank_key")
+
+    def __init__(self, score: ScoreCalculated, seq: int):
+        self.score = score
+        self.chart: ChartKey = (score.song_id, score.rating_class)
+        self.rating = potential_to_fixed(score.potential)
+        self.rank_key: _RankKey = (self.rating, score.score, -seq)
+
+
+class B30Tracker:
+    """
+    The best score of every chart, and the `limit` best of these, updated
+    incrementally as scores are added and removed.
+
+    Every chart's scores are kept in a heap, and the charts' bests are split
+    between a min-heap of the top `limit` and a max-heap of the others.
+    Adding or removing a score is O(log n); the average of the top `limit`
+    is kept as an integer sum of fixed-point play ratings (see
+    `.score.calculate_play_rating_fixed`), so `b30` is O(1). Heap entries
+    that are replaced or removed are skipped when they reach the top.
+
+    Scores are told apart by `id`: adding a score with the `id` of one
+    already added replaces it. They're ranked by potential, then score.
+    """
+
+    def __init__(
+        self,
+        scores: Iterable[ScoreCalculated] = (),
+        *,
+        limit: int = 30,
+        overflow_limit: int = 40,
+    ):
+        self.limit = limit
+        self.overflow_limit = overflow_limit
+        self.__seq = count()
+        self.rebuild(scores)
+
+    def rebuild(self, scores: Iterable[ScoreCalculated] = ()):
+        """
+        Forget every score and add `scores`, e.g.
+        `tracker.rebuild(database.iter_scores_calculated())`.
+        """
+        self.__entries: Dict[int, _Entry] = {}
+        self.__chart_heaps: Dict[ChartKey, List[Tuple[_RankKey, int]]] = {}
+        self.__bests: Dict[ChartKey, _Entry] = {}
+        # the heap the best of every chart is in, and the token of its item
+        self.__positions: Dict[ChartKey, Tuple[int, bool]] = {}
+        self.__tokens = count()
+        # (rank key, token, chart) min-heap, and the same max-heap of the others
+        self.__top: List[Tuple[_RankKey, int, ChartKey]] = []
+        self.__rest: List[Tuple[_RankKey, int, ChartKey]] = []
+        self.__top_count = 0
+        self.__top_rating_sum = 0
+        self.update(scores)
+
+    def __len__(self):
+        """Number of charts with a score."""
+        return len(self.__bests)
+
+    # region updates
+
+    def add(self, score: ScoreCalculated):
+        if score.id in self.__entries:
+            self.remove(score.id)
+
+        entry = _Entry(score, next(self.__seq))
+        self.__entries[score.id] = entry
+        heapq.heappush(
+            self.__chart_heaps.setdefault(entry.chart, []),
+            (_negate(entry.rank_key), score.id),
+        )
+
+        best = self.__bests.get(entry.chart)
+        if best is None or entry.rank_key > best.rank_key:
+            if best is not None:
+                self.__remove_best(entry.chart)
+            self.__insert_best(entry)
+
+    def update(self, scores: Iterable[ScoreCalculated]):
+        for score in scores:
+            self.add(score)
+
+    def remove(self, score: Union[ScoreCalculated, int]):
+        """Remove a score, or the score of this `id`, if it was added."""
+        score_id = score if isinstance(score, int) else score.id
+        entry = self.__entries.pop(score_id, None)
+        if entry is None:
+            return
+
+        if self.__bests[entry.chart] is not entry:
+            return
+        self.__remove_best(entry.chart)
+        next_best = self.__chart_best(entry.chart)
+        if next_best is None:
+            del self.__chart_heaps[entry.chart]
+        else:
+            self.__insert_best(next_best)
+
+    def __chart_best(self, chart: ChartKey) -> Optional[_Entry]:
+        heap = self.__chart_heaps[chart]
+        while heap:
+            negated_rank_key, score_id = heap[0]
+            entry = self.__entries.get(score_id)
+            if entry is not None and entry.rank_key == _negate(negated_rank_key):
+                return entry
+            heapq.heappop(heap)
+        return None
+
+    def __push(self, entry: _Entry, *, in_top: bool):
+        # a new token every time, so items pushed before for the same chart,
+        # even for this entry, are stale
+        token = next(self.__tokens)
+        self.__positions[entry.chart] = (token, in_top)
+        if in_top:
+            heapq.heappush(self.__top, (entry.rank_key, token, entry.chart))
+            self.__top_count += 1
+            self.__top_rating_sum += entry.rating
+        else:
+            heapq.heappush(self.__rest, (_negate(entry.rank_key), token, entry.chart))
+
+    def __is_current(self, token: int, chart: ChartKey, *, in_top: bool) -> bool:
+        return self.__positions.get(chart) == (token, in_top)
+
+    def __peek(self, *, in_top: bool) -> Optional[_Entry]:
+        heap = self.__top if in_top else self.__rest
+        while heap:
+            _, token, chart = heap[0]
+            if self.__is_current(token, chart, in_top=in_top):
+                return self.__bests[chart]
+            heapq.heappop(heap)
+        return None
+
+    def __insert_best(self, entry: _Entry):
+        self.__bests[entry.chart] = entry
+        if self.__top_count < self.limit:
+            self.__push(entry, in_top=True)
+            return
+
+        worst_top = self.__peek(in_top=True)
+        if worst_top is not None and entry.rank_key > worst_top.rank_key:
+            heapq.heappop(self.__top)
+            self.__top_count -= 1
+            self.__top_rating_sum -= worst_top.rating
+            self.__push(worst_top, in_top=False)
+            self.__push(entry, in_top=True)
+        else:
+            self.__push(entry, in_top=False)
+
+    def __remove_best(self, chart: ChartKey):
+        entry = self.__bests.pop(chart)
+        # its heap item is now stale, and skipped when it reaches the top
+        _, in_top = self.__positions.pop(chart)
+        if in_top:
+            self.__top_count -= 1
+            self.__top_rating_sum -= entry.rating
+            best_rest = self.__peek(in_top=False)
+            if best_rest is not None:
+                heapq.heappop(self.__rest)
+                self.__push(best_rest, in_top=True)
+        self.__compact()
+
+    def __compact(self):
+        # drop stale items once they outnumber the current ones,
+        # O(1) amortized over the removals that made them stale
+        if len(self.__top) > 2 * self.__top_count + 16:
+            self.__top = [
+                item
+                for item in self.__top
+                if self.__is_current(item[1], item[2], in_top=True)
+            ]
+            heapq.heapify(self.__top)
+        if len(self.__rest) > 2 * (len(self.__bests) - self.__top_count) + 16:
+            self.__rest = [
+                item
+                for item in self.__rest
+                if self.__is_current(item[1], item[2], in_top=False)
+            ]
+            heapq.heapify(self.__rest)
+
+    # endregion
+
+    # region results
+
+    def best(self, song_id: str, rating_class: int) -> Optional[ScoreCalculated]:
+        entry = self.__bests.get((song_id, rating_class))
+        return entry.score if entry is not None else None
+
+    def b30_list(self) -> List[ScoreCalculated]:
+        """The best `limit` scores, by potential descending."""
+        entries = [
+            self.__bests[chart]
+            for _, token, chart in self.__top
+            if self.__is_current(token, chart, in_top=True)
+        ]
+        entries.sort(key=lambda e: e.rank_key, reverse=True)
+        return [entry.score for entry in entries]
+
+    def __iter_rest(self) -> Iterator[_Entry]:
+        """The bests not in the top `limit`, best first, without popping them."""
+        heap = self.__rest
+        # best-first walk of the heap's tree
+        frontier = [(heap[0], 0)] if heap else []
+        while frontier:
+            (_, token, chart), i = heapq.heappop(frontier)
+            if self.__is_current(token, chart, in_top=False):
+                yield self.__bests[chart]
+            for child in (2 * i + 1, 2 * i + 2):
+                if child < len(heap):
+                    heapq.heappush(frontier, (heap[child], child))
+
+    def overflow_list(self) -> List[ScoreCalculated]:
+        """The scores ranked after `b30_list()`, up to `overflow_limit` in all."""
+        entries = islice(self.__iter_rest(), self.overflow_limit - self.limit)
+        return [entry.score for entry in entries]
+
+    @property
+    def b30_fixed(self) -> Tuple[int, int]:
+        """The sum of the fixed-point play ratings of `b30_list()`, and its length."""
+        return self.__top_rating_sum, self.__top_count
+
+    @property
+    def b30(self) -> Decimal:
+        if not self.__top_rating_sum:
+            return Decimal("0.0")
+        return fixed_to_decimal(self.__top_rating_sum, self.__top_count)
+
+    # endregion
+
+
+def _negate(rank_key: _RankKey) -> _RankKey:
+    return (-rank_key[0], -rank_key[1], -rank_key[2])
 
 
 def get_b30_calculated_list(
-    calculated_list: List[ScoreCalculated],
+    calculated_list: Iterable[ScoreCalculated],
 ) -> List[ScoreCalculated]:
-    best_scores: Dict[str, ScoreCalculated] = {}
-    for calculated in calculated_list:
-        key = f"{calculated.song_id}_{calculated.rating_class}"
-        stored = best_scores.get(key)
-        if stored and stored.score < calculated.score or not stored:
-            best_scores[key] = calculated
-    ret_list = list(best_scores.values())
-    ret_list = sorted(ret_list, key=lambda c: c.potential, reverse=True)[:30]
-    return ret_list
-
-
-def calculate_b30(calculated_list: List[ScoreCalculated]) -> Decimal:
-    ptt_list = [Decimal(c.potential) for c in get_b30_calculated_list(calculated_list)]
-    sum_ptt_list = sum(ptt_list)
-    return (sum_ptt_list / len(ptt_list)) if sum_ptt_list else Decimal("0.0")
+    return B30Tracker(calculated_list).b30_list()
+
+
+def calculate_b30(calculated_list: Iterable[ScoreCalculated]) -> Decimal:
+    return B30Tracker(calculated_list).b30
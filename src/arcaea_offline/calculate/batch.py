@@ -0,0 +1,155 @@
+"""
+Batch counterparts of `.score`, for many scores at once.
+
+Every argument is array-like (a NumPy array, a sequence of integers, or a
+scalar broadcast against the others), `str` and `bytes` are rejected. The
+piecewise formulas of `.score` are evaluated with exact integer arithmetic:
+each result is one floor division or one true division of integers, the same
+as the scalar functions.
+
+NumPy is optional (`pip install arcaea-offline[numpy]`). With it, results are
+NumPy arrays; without it, the same values are computed in pure Python and
+returned as lists.
+"""
+
+from typing import Any, List, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+__all__ = [
+    "calculate_play_ratings",
+    "calculate_score_modifiers",
+    "calculate_score_ranges",
+    "calculate_shiny_pures",
+]
+
+ArrayLike = Any
+
+_PM_SCORE = 10000000
+_EX_PLUS_LOWER = 9800000
+_EX_LOWER = 9500000
+
+
+def _check_not_text(args):
+    # a `str` is a `Sequence`, and NumPy would parse it as a number
+    if any(isinstance(arg, (str, bytes)) for arg in args):
+        raise TypeError("Arguments must be integers or arrays of integers")
+
+
+def _broadcast(*args) -> List[Sequence[int]]:
+    _check_not_text(args)
+    sequences = [arg for arg in args if isinstance(arg, Sequence)]
+    length = len(sequences[0]) if sequences else 1
+    if any(len(sequence) != length for sequence in sequences):
+        raise ValueError("Arguments must have the same length")
+    return [arg if isinstance(arg, Sequence) else [arg] * length for arg in args]
+
+
+def _as_int_arrays(*args):
+    _check_not_text(args)
+    return np.broadcast_arrays(*[np.asarray(arg, dtype=np.int64) for arg in args])
+
+
+def _check_notes(notes):
+    if np is not None and isinstance(notes, np.ndarray):
+        if (notes <= 0).any():
+            raise ValueError("notes must be positive")
+    elif any(n <= 0 for n in notes):
+        raise ValueError("notes must be positive")
+
+
+# The score modifier of every band as `numerator / denominator`, with the chart
+# constant (x10) optionally folded in:
+#   >= 10M:    2                          = (constant + 20) / 10
+#   >= 9.8M:   1 + (score - 9.8M) / 200k  = (20k * constant + score - 9.6M) / 200k
+#   otherwise: (score - 9.5M) / 300k      = (30k * constant + score - 9.5M) / 300k
+
+
+def _rating_fraction(constant: int, score: int) -> Tuple[int, int]:
+    if score >= _PM_SCORE:
+        return constant + 20, 10
+    if score >= _EX_PLUS_LOWER:
+        return 20000 * constant + score - 9600000, 200000
+    return 30000 * constant + score - _EX_LOWER, 300000
+
+
+def _rating_fractions_np(constants, scores):
+    numerators = np.where(
+        scores >= _PM_SCORE,
+        constants + 20,
+        np.where(
+            scores >= _EX_PLUS_LOWER,
+            20000 * constants + scores - 9600000,
+            30000 * constants + scores - _EX_LOWER,
+        ),
+    )
+    denominators = np.where(
+        scores >= _PM_SCORE, 10, np.where(scores >= _EX_PLUS_LOWER, 200000, 300000)
+    )
+    return numerators, denominators
+
+
+def calculate_score_modifiers(scores: ArrayLike):
+    """`calculate_score_modifier` of every score, as floats."""
+    if np is not None:
+        (scores,) = _as_int_arrays(scores)
+        numerators, denominators = _rating_fractions_np(np.zeros_like(scores), scores)
+        return numerators / denominators
+
+    (scores,) = _broadcast(scores)
+    return [
+        numerator / denominator
+        for numerator, denominator in (_rating_fraction(0, score) for score in scores)
+    ]
+
+
+def calculate_play_ratings(constants: ArrayLike, scores: ArrayLike):
+    """`calculate_play_rating` of every `(constant, score)`, as floats."""
+    if np is not None:
+        constants, scores = _as_int_arrays(constants, scores)
+        numerators, denominators = _rating_fractions_np(constants, scores)
+        return np.maximum(numerators, 0) / denominators
+
+    constants, scores = _broadcast(constants, scores)
+    results = []
+    for constant, score in zip(constants, scores):
+        numerator, denominator = _rating_fraction(constant, score)
+        results.append(max(numerator, 0) / denominator)
+    return results
+
+
+def calculate_score_ranges(notes: ArrayLike, pure: ArrayLike, far: ArrayLike):
+    """
+    `calculate_score_range` of every `(notes, pure, far)`, as a tuple of the
+    lower bounds and the upper bounds.
+    """
+    if np is not None:
+        notes, pure, far = _as_int_arrays(notes, pure, far)
+        _check_notes(notes)
+        lower = (_PM_SCORE * (2 * pure + far)) // (2 * notes)
+        return lower, lower + pure
+
+    notes, pure, far = _broadcast(notes, pure, far)
+    _check_notes(notes)
+    lower = [(_PM_SCORE * (2 * p + f)) // (2 * n) for n, p, f in zip(notes, pure, far)]
+    return lower, [low + p for low, p in zip(lower, pure)]
+
+
+def calculate_shiny_pures(
+    notes: ArrayLike, scores: ArrayLike, pure: ArrayLike, far: ArrayLike
+):
+    """`calculate_shiny_pure` of every `(notes, score, pure, far)`."""
+    if np is not None:
+        notes, scores, pure, far = _as_int_arrays(notes, scores, pure, far)
+        _check_notes(notes)
+        return scores - (_PM_SCORE * (2 * pure + far)) // (2 * notes)
+
+    notes, scores, pure, far = _broadcast(notes, scores, pure, far)
+    _check_notes(notes)
+    return [
+        s - (_PM_SCORE * (2 * p + f)) // (2 * n)
+        for n, s, p, f in zip(notes, scores, pure, far)
+    ]
@@ -1,35 +1,80 @@
 from dataclasses import dataclass
 from decimal import Decimal
-from math import floor
 from typing import Tuple, Union
 
 
-def calculate_score_range(notes: int, pure: int, far: int):
-    single_note_score = 10000000 / Decimal(notes)
+def _actual_score(notes: int, pure: int, far: int) -> int:
+    # floor(10M / notes * (pure + far / 2)) in integers, exact for any `notes`
+    return 10000000 * (2 * pure + far) // (2 * notes)
 
-    actual_score = floor(
-        single_note_score * pure + single_note_score * Decimal(0.5) * far
-    )
+
+def calculate_score_range(notes: int, pure: int, far: int):
+    actual_score = _actual_score(notes, pure, far)
     return (actual_score, actual_score + pure)
 
 
-def calculate_score_modifier(score: int) -> Decimal:
+PLAY_RATING_SCALE = 600000
+"""
+The `*_fixed` functions return integers in units of `1 / PLAY_RATING_SCALE`,
+a multiple of every denominator of the formulas (constant / 10, / 200000 and
+/ 300000), so their results are exact.
+"""
+
+
+def calculate_score_modifier_fixed(score: int) -> int:
     if score >= 10000000:
-        return Decimal(2)
+        return 2 * PLAY_RATING_SCALE
     if score >= 9800000:
-        return Decimal(1) + (Decimal(score - 9800000) / 200000)
-    return Decimal(score - 9500000) / 300000
+        return PLAY_RATING_SCALE + (score - 9800000) * (PLAY_RATING_SCALE // 200000)
+    return (score - 9500000) * (PLAY_RATING_SCALE // 300000)
+
+
+def calculate_play_rating_fixed(constant: int, score: int) -> int:
+    return max(
+        0,
+        constant * (PLAY_RATING_SCALE // 10) + calculate_score_modifier_fixed(score),
+    )
+
+
+def fixed_to_decimal(value: int, divisor: int = 1) -> Decimal:
+    """`value / divisor` as a `Decimal`, rounded once, e.g. an average of ratings."""
+    return Decimal(value) / (divisor * PLAY_RATING_SCALE)
+
+
+def fixed_to_float(value: int) -> float:
+    return value / PLAY_RATING_SCALE
+
+
+def potential_to_fixed(potential: float) -> int:
+    """
+    The play rating a `potential` float of the database stands for. Potentials
+    are computed from integer constants and scores, so they're at most a few
+    ulps away from a multiple of `1 / PLAY_RATING_SCALE`.
+    """
+    return round(potential * PLAY_RATING_SCALE)
+
+
+def calculate_score_modifier(score: int) -> Decimal:
+    return fixed_to_decimal(calculate_score_modifier_fixed(score))
 
 
 def calculate_play_rating(constant: int, score: int) -> Decimal:
-    score_modifier = calculate_score_modifier(score)
-    return max(Decimal(0), Decimal(constant) / 10 + score_modifier)
+    """
+    The play rating as a `Decimal`, with the same digits as it always had.
+
+    This isn't faster than before: only the modifier uses the fixed-point path,
+    `constant / 10` is still added in `Decimal`. Code rating many plays should
+    call `calculate_play_rating_fixed` and convert once, with `fixed_to_decimal`
+    or `fixed_to_float`.
+    """
+    # not `fixed_to_decimal(calculate_play_rating_fixed(...))`, which would
+    # round a modifier that isn't exact once instead of twice, and drop the
+    # trailing zeros of e.g. `Decimal("11.0")`
+    return max(Decimal(0), Decimal(constant) / 10 + calculate_score_modifier(score))
 
 
 def calculate_shiny_pure(notes: int, score: int, pure: int, far: int) -> int:
-    single_note_score = 10000000 / Decimal(notes)
-    actual_score = single_note_score * pure + single_note_score * Decimal(0.5) * far
-    return score - floor(actual_score)
+    return score - _actual_score(notes, pure, far)
 
 
 @dataclass
@@ -43,12 +88,8 @@ class ConstantsFromPlayRatingResult:
     C: Tuple[Decimal, Decimal]
 
 
-def calculate_constants_from_play_rating(play_rating: Union[Decimal, str, float, int]):
-    # pylint: disable=no-value-for-parameter
-
-    play_rating = Decimal(play_rating)
-
-    ranges = []
+_GRADE_SCORE_MODIFIERS = [
+    (calculate_score_modifier(upper_score), calculate_score_modifier(lower_score))
     for upper_score, lower_score in [
         (10000000, 9900000),
         (9899999, 9800000),
@@ -56,9 +97,17 @@ def calculate_constants_from_play_rating(play_rating: Union[Decimal, str, float,
         (9499999, 9200000),
         (9199999, 8900000),
         (8899999, 8600000),
-    ]:
-        upper_score_modifier = calculate_score_modifier(upper_score)
-        lower_score_modifier = calculate_score_modifier(lower_score)
+    ]
+]
+
+
+def calculate_constants_from_play_rating(play_rating: Union[Decimal, str, float, int]):
+    # pylint: disable=no-value-for-parameter
+
+    play_rating = Decimal(play_rating)
+
+    ranges = []
+    for upper_score_modifier, lower_score_modifier in _GRADE_SCORE_MODIFIERS:
         ranges.append(
             (play_rating - upper_score_modifier, play_rating - lower_score_modifier)
         )
@@ -0,0 +1,298 @@
+"""
+In-memory cache of the song catalog (`packs`, `songs`, `difficulties`,
+`charts_info`, their localized tables and the `charts` view).
+
+The catalog only changes when a songlist is imported, so `CatalogCache` loads
+each table once with a single query, and answers lookups from dicts of
+immutable records (see `models.records`) until the table is written again.
+"""
+
+import sys
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, Hashable, List, NamedTuple, Optional, Set, Tuple, Type
+
+from sqlalchemy import Engine, event, inspect
+from sqlalchemy.orm import DeclarativeBase, ORMExecuteState, Session, sessionmaker
+
+from .models.records import RECORD_TYPES, select_records
+from .models.songs import (
+    Chart,
+    ChartInfo,
+    Difficulty,
+    DifficultyLocalized,
+    Pack,
+    PackLocalized,
+    Song,
+    SongLocalized,
+)
+from .revisions import create_revision_triggers, get_revisions
+
+__all__ = ["CatalogCache", "CatalogCacheStats"]
+
+CATALOG_MODELS: Tuple[Type[DeclarativeBase], ...] = (
+    Pack,
+    PackLocalized,
+    Song,
+    SongLocalized,
+    Difficulty,
+    DifficultyLocalized,
+    ChartInfo,
+    Chart,
+)
+# `charts` is a view over these tables
+_CHART_SOURCE_TABLES = {
+    Song.__tablename__,
+    Difficulty.__tablename__,
+    ChartInfo.__tablename__,
+}
+_CATALOG_TABLES = {model.__tablename__ for model in CATALOG_MODELS}
+# the tables written to, `charts` being a view
+_CATALOG_BASE_TABLES = sorted(_CATALOG_TABLES - {Chart.__tablename__})
+_SESSION_INFO_KEY = "arcaea_offline_catalog_cache_tables"
+
+
+def _revision_key(table: str) -> str:
+    return f"{table}_revision"
+
+
+def _source_tables(model: Type[DeclarativeBase]) -> List[str]:
+    if model is Chart:
+        return sorted(_CHART_SOURCE_TABLES)
+    return [model.__tablename__]
+
+
+@dataclass
+class CatalogCacheStats:
+    hits: int
+    misses: int
+    invalidations: int
+    rows: Dict[str, int] = field(default_factory=dict)
+    """number of cached rows per loaded table"""
+    memory_bytes: int = 0
+    """approximate size of the cached records"""
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class _TableSnapshot:
+    def __init__(
+        self,
+        model: Type[DeclarativeBase],
+        rows: List[NamedTuple],
+        revisions: Dict[str, int],
+    ):
+        self.rows = rows
+        self.revisions = revisions
+        """revisions of the source tables when loaded"""
+        pk_fields = [column.name for column in inspect(model).primary_key]
+        self.by_pk: Dict[Hashable, NamedTuple] = {
+            tuple(getattr(row, name) for name in pk_fields): row for row in rows
+        }
+        self.indexes: Dict[str, Dict[Hashable, List[NamedTuple]]] = {}
+        self.memory_bytes = sum(_record_size(row) for row in rows)
+
+    def filter_by(self, attribute: str, value: Hashable) -> List[NamedTuple]:
+        index = self.indexes.get(attribute)
+        if index is None:
+            index = {}
+            for row in self.rows:
+                index.setdefault(getattr(row, attribute), []).append(row)
+            self.indexes[attribute] = index
+        return list(index.get(value, []))
+
+
+def _record_size(record: NamedTuple) -> int:
+    return sys.getsizeof(record) + sum(sys.getsizeof(v) for v in record)
+
+
+def _is_memory_database(engine: Engine) -> bool:
+    return engine.url.database in (None, "", ":memory:")
+
+
+class CatalogCache:
+    """
+    Cache of the song catalog tables for a `Database`.
+
+    Tables are loaded lazily, on their first lookup, or all at once with
+    `preload()`, as records of `models.records`: immutable, so they're safely
+    shared by every caller.
+
+    A table is invalidated when a session of `session_maker` commits a write
+    to it. When SQLite's `PRAGMA data_version` reports a commit from another
+    connection or process, the per-table revisions bumped by triggers on the
+    catalog tables tell which tables were written, so commits that don't touch
+    the catalog, e.g. of scores, keep the cache.
+    """
+
+    def __init__(self, engine: Engine, session_maker: sessionmaker):
+        self.engine = engine
+        self.sessionmaker = session_maker
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.__snapshots: Dict[Type[DeclarativeBase], _TableSnapshot] = {}
+        self.__lock = threading.RLock()
+
+        with engine.begin() as conn:
+            for table in _CATALOG_BASE_TABLES:
+                create_revision_triggers(conn, _revision_key(table), [table])
+
+        # `data_version` only changes for commits made by *other* connections,
+        # so it's watched on a dedicated one, outside of the engine's pool
+        self.__watcher = None
+        self.__data_version: Optional[int] = None
+        if not _is_memory_database(engine):
+            cargs, cparams = engine.dialect.create_connect_args(engine.url)
+            self.__watcher = engine.dialect.connect(*cargs, **cparams)
+            self.__data_version = self.__read_data_version()
+
+        event.listen(session_maker, "after_flush", self.__after_flush)
+        event.listen(session_maker, "do_orm_execute", self.__do_orm_execute)
+        event.listen(session_maker, "after_commit", self.__after_commit)
+        event.listen(session_maker, "after_soft_rollback", self.__after_rollback)
+
+    def close(self):
+        """Stop watching writes and drop every snapshot."""
+        event.remove(self.sessionmaker, "after_flush", self.__after_flush)
+        event.remove(self.sessionmaker, "do_orm_execute", self.__do_orm_execute)
+        event.remove(self.sessionmaker, "after_commit", self.__after_commit)
+        event.remove(self.sessionmaker, "after_soft_rollback", self.__after_rollback)
+        with self.__lock:
+            if self.__watcher is not None:
+                self.__watcher.close()
+                self.__watcher = None
+            self.__snapshots.clear()
+
+    # region invalidation
+
+    def __read_data_version(self) -> int:
+        return self.__watcher.execute("PRAGMA data_version").fetchone()[0]
+
+    def __read_revisions(self, conn, tables: List[str]) -> Dict[str, int]:
+        revisions = get_revisions(conn, [_revision_key(table) for table in tables])
+        return {table: revisions[_revision_key(table)] for table in tables}
+
+    def __check_data_version(self):
+        if self.__watcher is None:
+            return
+        data_version = self.__read_data_version()
+        if data_version == self.__data_version:
+            return
+        self.__data_version = data_version
+
+        # something was committed, maybe not to the catalog
+        with self.engine.connect() as conn:
+            revisions = self.__read_revisions(conn, _CATALOG_BASE_TABLES)
+        stale = {
+            table
+            for snapshot in self.__snapshots.values()
+            for table, revision in snapshot.revisions.items()
+            if revisions[table] != revision
+        }
+        if stale:
+            self.invalidate(stale)
+
+    @staticmethod
+    def __record_tables(session: Session, tables: Set[str]):
+        tables = tables & _CATALOG_TABLES
+        if tables:
+            session.info.setdefault(_SESSION_INFO_KEY, set()).update(tables)
+
+    def __after_flush(self, session: Session, flush_context):
+        self.__record_tables(
+            session,
+            {
+                inspect(instance).mapper.local_table.name
+                for instance in [*session.new, *session.dirty, *session.deleted]
+            },
+        )
+
+    def __do_orm_execute(self, orm_execute_state: ORMExecuteState):
+        table = getattr(orm_execute_state.statement, "table", None)
+        if orm_execute_state.statement.is_dml and table is not None:
+            self.__record_tables(orm_execute_state.session, {table.name})
+
+    def __after_commit(self, session: Session):
+        tables = session.info.pop(_SESSION_INFO_KEY, None)
+        if tables:
+            self.invalidate(tables)
+
+    def __after_rollback(self, session: Session, previous_transaction):
+        session.info.pop(_SESSION_INFO_KEY, None)
+
+    def invalidate(self, tables: Optional[Set[str]] = None):
+        """Drop the snapshots of `tables`, or of every table if not specified."""
+        with self.__lock:
+            if tables is None:
+                self.__snapshots.clear()
+            else:
+                if tables & _CHART_SOURCE_TABLES:
+                    tables = tables | {Chart.__tablename__}
+                for model in CATALOG_MODELS:
+                    if model.__tablename__ in tables:
+                        self.__snapshots.pop(model, None)
+            self.invalidations += 1
+
+    # endregion
+
+    # region lookups
+
+    def __snapshot(self, model: Type[DeclarativeBase]) -> _TableSnapshot:
+        with self.__lock:
+            self.__check_data_version()
+            snapshot = self.__snapshots.get(model)
+            if snapshot is not None:
+                self.hits += 1
+                return snapshot
+
+            self.misses += 1
+            record_type = RECORD_TYPES[model]
+            with self.engine.connect() as conn:
+                # read before the rows: a write in between makes the snapshot
+                # look stale, and reloaded, rather than the other way around
+                revisions = self.__read_revisions(conn, _source_tables(model))
+                rows = [
+                    record_type._make(row)
+                    for row in conn.execute(select_records(model))
+                ]
+            snapshot = _TableSnapshot(model, rows, revisions)
+            self.__snapshots[model] = snapshot
+            return snapshot
+
+    def preload(self):
+        """Load every catalog table now, instead of on first lookup."""
+        for model in CATALOG_MODELS:
+            self.__snapshot(model)
+
+    def all(self, model: Type[DeclarativeBase]) -> List[NamedTuple]:
+        return list(self.__snapshot(model).rows)
+
+    def get(
+        self, model: Type[DeclarativeBase], *primary_key: Hashable
+    ) -> Optional[NamedTuple]:
+        return self.__snapshot(model).by_pk.get(tuple(primary_key))
+
+    def filter_by(
+        self, model: Type[DeclarativeBase], attribute: str, value: Hashable
+    ) -> List[NamedTuple]:
+        return self.__snapshot(model).filter_by(attribute, value)
+
+    # endregion
+
+    def stats(self) -> CatalogCacheStats:
+        with self.__lock:
+            return CatalogCacheStats(
+                hits=self.hits,
+                misses=self.misses,
+                invalidations=self.invalidations,
+                rows={
+                    model.__tablename__: len(snapshot.rows)
+                    for model, snapshot in self.__snapshots.items()
+                },
+                memory_bytes=sum(s.memory_bytes for s in self.__snapshots.values()),
+            )
@@ -1,17 +1,64 @@
 import logging
 import math
-from typing import Iterable, List, Optional, Type, Union
+from concurrent.futures import Future
+from dataclasses import dataclass
+from itertools import chain
+from os import PathLike
+from typing import (
+    BinaryIO,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    TextIO,
+    Tuple,
+    Type,
+    TypeVar,
+    Union,
+)
 
-from sqlalchemy import Engine, func, inspect, select
+from sqlalchemy import (
+    Engine,
+    Select,
+    case,
+    create_engine,
+    func,
+    inspect,
+    select,
+    tuple_,
+)
 from sqlalchemy.orm import DeclarativeBase, InstrumentedAttribute, sessionmaker
 
+from .bulk_scores import (
+    FingerprintBackfillResult,
+    InsertScoresResult,
+    ScoreRow,
+    backfill_score_fingerprints,
+    insert_score_rows,
+    insert_scores,
+    score_rows,
+)
+from .catalog_cache import CATALOG_MODELS, CatalogCache, CatalogCacheStats
 from .external.arcsong.arcsong_json import ArcSongJsonBuilder
 from .external.exports import ArcaeaOfflineDEFV2_Score, ScoreExport, exporters
+from .materialized import (
+    MaterializedScoresReport,
+    check_materialized_scores,
+    create_materialized_scores,
+    drop_materialized_scores,
+    rebuild_materialized_scores,
+)
+from .migrations import SCHEMA_VERSION, get_schema_version, migrate, missing_columns
 from .models.config import ConfigBase, Property
+from .models.records import RECORD_TYPES, select_records
 from .models.scores import (
     CalculatedPotential,
+    CalculatedPotentialMaterialized,
     Score,
     ScoreBest,
+    ScoreBestMaterialized,
     ScoreCalculated,
     ScoresBase,
     ScoresViewBase,
@@ -28,17 +75,64 @@ from .models.songs import (
     SongsBase,
     SongsViewBase,
 )
+from .performance import (
+    SqlitePerformanceProfile,
+    apply_performance_profile,
+    get_performance_profile,
+)
+from .scores_revision import (
+    create_scores_revision_triggers,
+    drop_scores_revision_triggers,
+    get_scores_revision,
+)
 from .singleton import Singleton
+from .writer import DatabaseWriter, WriteJob
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
+ChartKey = Tuple[str, int]
+
+
+@dataclass(frozen=True)
+class ScoreQuery:
+    """
+    Filters and order of `Database.iter_scores`. Scores match every filter
+    specified; scores without a date are left out when `date_from` or
+    `date_to` is.
+    """
+
+    song_id: Optional[str] = None
+    rating_class: Optional[int] = None
+    date_from: Optional[int] = None
+    """inclusive"""
+    date_to: Optional[int] = None
+    """exclusive"""
+    clear_type: Optional[int] = None
+    order: str = "id"
+    """`"id"` or `"date"`, then id"""
+    descending: bool = False
+
+    def __post_init__(self):
+        if self.order not in ("id", "date"):
+            raise ValueError(f"Cannot order scores by {self.order!r}, only id or date")
+
 
 class Database(metaclass=Singleton):
+    # keys per `(song_id, rating_class) IN (...)` query, well below the
+    # 999 variables limit of older SQLite versions
+    CHART_KEYS_CHUNK_SIZE = 400
+    # ORM instances buffered at a time while streaming a page of `iter_scores`
+    ITER_YIELD_PER = 100
+
     def __init__(self, engine: Optional[Engine]):
         try:
             self.__engine
         except AttributeError:
             self.__engine = None
+            self.__catalog_cache: Optional[CatalogCache] = None
+            self.__writer: Optional[DatabaseWriter] = None
 
         if engine is None:
             if isinstance(self.engine, Engine):
@@ -59,6 +153,26 @@ class Database(metaclass=Singleton):
             )
         self.engine = engine
 
+    @staticmethod
+    def create_engine(
+        path: Union[str, PathLike],
+        *,
+        profile: Optional[SqlitePerformanceProfile] = SqlitePerformanceProfile(),
+        **kwargs,
+    ) -> Engine:
+        """
+        Create an engine for the SQLite database file at `path`, with
+        `profile` applied to all of its connections (`None` to skip tuning).
+        `kwargs` are passed to `sqlalchemy.create_engine`.
+
+        With a profile, score writes of `Database` are also retried when
+        another process holds the database lock.
+        """
+        engine = create_engine(f"sqlite:///{path}", **kwargs)
+        if profile is not None:
+            apply_performance_profile(engine, profile)
+        return engine
+
     @property
     def engine(self) -> Engine:
         return self.__engine  # type: ignore
@@ -69,6 +183,9 @@ class Database(metaclass=Singleton):
             raise ValueError("Database.engine only accepts sqlalchemy.Engine")
         self.__engine = value
         self.__sessionmaker = sessionmaker(self.__engine)
+        self.__materialized_scores = None
+        self.disable_catalog_cache()
+        self.disable_writer()
 
     @property
     def sessionmaker(self):
@@ -91,14 +208,10 @@ class Database(metaclass=Singleton):
         ScoresBase.metadata.create_all(self.engine, checkfirst=checkfirst)
         ScoresViewBase.metadata.create_all(self.engine)
         ConfigBase.metadata.create_all(self.engine, checkfirst=checkfirst)
-
-        # insert version property
-        with self.sessionmaker() as session:
-            stmt = select(Property.value).where(Property.key == "version")
-            result = session.execute(stmt).fetchone()
-            if not checkfirst or not result:
-                session.add(Property(key="version", value="4"))
-                session.commit()
+        with self.engine.begin() as conn:
+            # upgrade the tables of databases created by older versions,
+            # and set the `version` property
+            migrate(conn)
 
     def check_init(self) -> bool:
         # check table exists
@@ -113,7 +226,220 @@ class Database(metaclass=Singleton):
                 CalculatedPotential.__tablename__,
             ]
         )
-        return all(inspect(self.engine).has_table(t) for t in expect_tables)
+        if not all(inspect(self.engine).has_table(t) for t in expect_tables):
+            return False
+        # check the tables are up to date
+        with self.engine.connect() as conn:
+            return get_schema_version(conn) == SCHEMA_VERSION and not missing_columns(
+                conn, Score.__table__
+            )
+
+    # endregion
+
+    # region materialized scores
+
+    @property
+    def materialized_scores(self) -> bool:
+        """
+        Whether the materialized `scores_best` / `calculated_potential` tables
+        are enabled. If so, `get_score_best`, `get_b30` and `count_scores_best`
+        read from these tables instead of the views.
+        """
+        if self.__materialized_scores is None:
+            self.__materialized_scores = inspect(self.engine).has_table(
+                ScoreBestMaterialized.__tablename__
+            )
+        return self.__materialized_scores
+
+    def enable_materialized_scores(self):
+        with self.engine.begin() as conn:
+            create_materialized_scores(conn)
+        self.__materialized_scores = True
+
+    def disable_materialized_scores(self):
+        with self.engine.begin() as conn:
+            drop_materialized_scores(conn)
+        self.__materialized_scores = False
+
+    def rebuild_materialized_scores(self):
+        if not self.materialized_scores:
+            raise ValueError("Materialized scores are not enabled.")
+        with self.engine.begin() as conn:
+            rebuild_materialized_scores(conn)
+
+    def check_materialized_scores(self) -> MaterializedScoresReport:
+        if not self.materialized_scores:
+            raise ValueError("Materialized scores are not enabled.")
+        with self.engine.connect() as conn:
+            return check_materialized_scores(conn)
+
+    # endregion
+
+    # region catalog cache
+
+    @property
+    def catalog_cache(self) -> Optional[CatalogCache]:
+        """
+        The `CatalogCache` answering the pack, song, difficulty, chart info and
+        chart getters, or `None` if it's not enabled. While it is, these getters
+        return the immutable records of `models.records`, whatever `as_records`.
+        """
+        return self.__catalog_cache
+
+    def enable_catalog_cache(self, *, preload: bool = False) -> CatalogCache:
+        if self.__catalog_cache is None:
+            self.__catalog_cache = CatalogCache(self.engine, self.sessionmaker)
+        if preload:
+            self.__catalog_cache.preload()
+        return self.__catalog_cache
+
+    def disable_catalog_cache(self):
+        if self.__catalog_cache is not None:
+            self.__catalog_cache.close()
+            self.__catalog_cache = None
+
+    def catalog_cache_stats(self) -> Optional[CatalogCacheStats]:
+        if self.__catalog_cache is None:
+            return None
+        return self.__catalog_cache.stats()
+
+    # endregion
+
+    def __select(
+        self, model: Type[DeclarativeBase], *, as_records: bool = False
+    ) -> Select:
+        return select_records(model) if as_records else select(model)
+
+    def __execute(
+        self,
+        stmt: Select,
+        model: Type[DeclarativeBase],
+        *,
+        as_records: bool = False,
+        **execution_options,
+    ) -> Iterator:
+        """
+        Yield the results of `stmt`, made by `__select(model, as_records=...)`:
+        detached ORM instances, or records built from Core rows.
+        """
+        if as_records:
+            record_type = RECORD_TYPES[model]
+            with self.engine.connect() as conn:
+                result = conn.execution_options(**execution_options).execute(stmt)
+                yield from map(record_type._make, result)
+        else:
+            with self.sessionmaker() as session:
+                yield from session.scalars(stmt.execution_options(**execution_options))
+
+    def __all(
+        self, stmt: Select, model: Type[DeclarativeBase], *, as_records: bool = False
+    ) -> list:
+        return list(self.__execute(stmt, model, as_records=as_records))
+
+    def __first(
+        self, stmt: Select, model: Type[DeclarativeBase], *, as_records: bool = False
+    ):
+        results = self.__all(stmt.limit(1), model, as_records=as_records)
+        return results[0] if results else None
+
+    def __get_by_chart_keys(
+        self,
+        model: Type[DeclarativeBase],
+        keys: Iterable[ChartKey],
+        *,
+        as_records: bool = False,
+    ) -> Dict[ChartKey, DeclarativeBase]:
+        keys = list(
+            dict.fromkeys((song_id, rating_class) for song_id, rating_class in keys)
+        )
+        if self.__catalog_cache is not None and model in CATALOG_MODELS:
+            results = {key: self.__catalog_cache.get(model, *key) for key in keys}
+            return {
+                key: result for key, result in results.items() if result is not None
+            }
+
+        results = {}
+        for i in range(0, len(keys), self.CHART_KEYS_CHUNK_SIZE):
+            chunk = keys[i : i + self.CHART_KEYS_CHUNK_SIZE]
+            stmt = self.__select(model, as_records=as_records).where(
+                tuple_(model.song_id, model.rating_class).in_(chunk)
+            )
+            for result in self.__execute(stmt, model, as_records=as_records):
+                results[(result.song_id, result.rating_class)] = result
+        return results
+
+    # region writer
+
+    @property
+    def writer(self) -> Optional[DatabaseWriter]:
+        """
+        The `DatabaseWriter` running the `submit_*` writes, or `None` if it's
+        not enabled.
+        """
+        return self.__writer
+
+    def enable_writer(self, *, max_batch_jobs: int = 256) -> DatabaseWriter:
+        if self.__writer is None:
+            self.__writer = DatabaseWriter(
+                self.sessionmaker,
+                max_batch_jobs=max_batch_jobs,
+                profile=get_performance_profile(self.engine),
+            )
+        return self.__writer
+
+    def disable_writer(self, *, wait: bool = True):
+        """Stop the writer, after running every write submitted so far."""
+        if self.__writer is not None:
+            self.__writer.close(wait=wait)
+            self.__writer = None
+
+    def submit_write(self, write: WriteJob) -> Future:
+        """
+        Run `write(session)` on the writer thread, `session` is committed
+        afterwards. Parsers' `write_database` methods can be submitted as is.
+        """
+        if self.__writer is None:
+            raise ValueError("Writer is not enabled.")
+        return self.__writer.submit(write)
+
+    def submit_insert_score(self, score: Score) -> Future:
+        return self.submit_write(lambda session: session.add(score))
+
+    def submit_insert_scores(self, scores: Iterable[Score]) -> Future:
+        scores = list(scores)
+        return self.submit_write(lambda session: session.add_all(scores))
+
+    def submit_update_score(self, score: Score) -> Future:
+        if score.id is None:
+            raise ValueError(
+                "Cannot determine which score to update, please specify `score.id`"
+            )
+        return self.submit_write(lambda session: session.merge(score))
+
+    def submit_delete_score(self, score: Score) -> Future:
+        return self.submit_write(lambda session: session.delete(score))
+
+    # endregion
+
+    # region scores revision
+
+    def enable_scores_revision(self):
+        """
+        Create the triggers maintaining the `scores_revision` property, needed
+        by caches of data derived from scores, such as the cache of
+        `AndrealImageGeneratorApiDataConverter`. See `arcaea_offline.scores_revision`.
+        """
+        with self.engine.begin() as conn:
+            create_scores_revision_triggers(conn)
+
+    def disable_scores_revision(self):
+        with self.engine.begin() as conn:
+            drop_scores_revision_triggers(conn)
+
+    def scores_revision(self) -> Optional[int]:
+        """The `scores_revision`, or `None` if it's not enabled."""
+        with self.engine.connect() as conn:
+            return get_scores_revision(conn)
 
     # endregion
 
@@ -126,18 +452,24 @@ class Database(metaclass=Singleton):
     # region Pack
 
     def get_packs(self):
+        if self.__catalog_cache is not None:
+            return self.__catalog_cache.all(Pack)
         stmt = select(Pack)
         with self.sessionmaker() as session:
             results = list(session.scalars(stmt))
         return results
 
     def get_pack(self, pack_id: str):
+        if self.__catalog_cache is not None:
+            return self.__catalog_cache.get(Pack, pack_id)
         stmt = select(Pack).where(Pack.id == pack_id)
         with self.sessionmaker() as session:
             result = session.scalar(stmt)
         return result
 
     def get_pack_localized(self, pack_id: str):
+        if self.__catalog_cache is not None:
+            return self.__catalog_cache.get(PackLocalized, pack_id)
         stmt = select(PackLocalized).where(PackLocalized.id == pack_id)
         with self.sessionmaker() as session:
             result = session.scalar(stmt)
@@ -148,24 +480,32 @@ class Database(metaclass=Singleton):
     # region Song
 
     def get_songs(self):
+        if self.__catalog_cache is not None:
+            return self.__catalog_cache.all(Song)
         stmt = select(Song)
         with self.sessionmaker() as session:
             results = list(session.scalars(stmt))
         return results
 
     def get_songs_by_pack_id(self, pack_id: str):
+        if self.__catalog_cache is not None:
+            return self.__catalog_cache.filter_by(Song, "set", pack_id)
         stmt = select(Song).where(Song.set == pack_id)
         with self.sessionmaker() as session:
             results = list(session.scalars(stmt))
         return results
 
     def get_song(self, song_id: str):
+        if self.__catalog_cache is not None:
+            return self.__catalog_cache.get(Song, song_id)
         stmt = select(Song).where(Song.id == song_id)
         with self.sessionmaker() as session:
             result = session.scalar(stmt)
         return result
 
     def get_song_localized(self, song_id: str):
+        if self.__catalog_cache is not None:
+            return self.__catalog_cache.get(SongLocalized, song_id)
         stmt = select(SongLocalized).where(SongLocalized.id == song_id)
         with self.sessionmaker() as session:
             result = session.scalar(stmt)
@@ -176,24 +516,40 @@ class Database(metaclass=Singleton):
     # region Difficulty
 
     def get_difficulties(self):
+        if self.__catalog_cache is not None:
+            return self.__catalog_cache.all(Difficulty)
         stmt = select(Difficulty)
         with self.sessionmaker() as session:
             results = list(session.scalars(stmt))
         return results
 
+    def get_difficulties_by_keys(
+        self, keys: Iterable[ChartKey]
+    ) -> Dict[ChartKey, Difficulty]:
+        """A dict of the difficulties of these `(song_id, rating_class)`s."""
+        return self.__get_by_chart_keys(Difficulty, keys)  # type: ignore
+
     def get_difficulties_by_song_id(self, song_id: str):
+        if self.__catalog_cache is not None:
+            return self.__catalog_cache.filter_by(Difficulty, "song_id", song_id)
         stmt = select(Difficulty).where(Difficulty.song_id == song_id)
         with self.sessionmaker() as session:
             results = list(session.scalars(stmt))
         return results
 
     def get_difficulties_localized_by_song_id(self, song_id: str):
+        if self.__catalog_cache is not None:
+            return self.__catalog_cache.filter_by(
+                DifficultyLocalized, "song_id", song_id
+            )
         stmt = select(DifficultyLocalized).where(DifficultyLocalized.song_id == song_id)
         with self.sessionmaker() as session:
             results = list(session.scalars(stmt))
         return results
 
     def get_difficulty(self, song_id: str, rating_class: int):
+        if self.__catalog_cache is not None:
+            return self.__catalog_cache.get(Difficulty, song_id, rating_class)
         stmt = select(Difficulty).where(
             (Difficulty.song_id == song_id) & (Difficulty.rating_class == rating_class)
         )
@@ -202,6 +558,8 @@ class Database(metaclass=Singleton):
         return result
 
     def get_difficulty_localized(self, song_id: str, rating_class: int):
+        if self.__catalog_cache is not None:
+            return self.__catalog_cache.get(DifficultyLocalized, song_id, rating_class)
         stmt = select(DifficultyLocalized).where(
             (DifficultyLocalized.song_id == song_id)
             & (DifficultyLocalized.rating_class == rating_class)
@@ -215,18 +573,30 @@ class Database(metaclass=Singleton):
     # region ChartInfo
 
     def get_chart_infos(self):
+        if self.__catalog_cache is not None:
+            return self.__catalog_cache.all(ChartInfo)
         stmt = select(ChartInfo)
         with self.sessionmaker() as session:
             results = list(session.scalars(stmt))
         return results
 
+    def get_chart_infos_by_keys(
+        self, keys: Iterable[ChartKey]
+    ) -> Dict[ChartKey, ChartInfo]:
+        """A dict of the chart infos of these `(song_id, rating_class)`s."""
+        return self.__get_by_chart_keys(ChartInfo, keys)  # type: ignore
+
     def get_chart_infos_by_song_id(self, song_id: str):
+        if self.__catalog_cache is not None:
+            return self.__catalog_cache.filter_by(ChartInfo, "song_id", song_id)
         stmt = select(ChartInfo).where(ChartInfo.song_id == song_id)
         with self.sessionmaker() as session:
             results = list(session.scalars(stmt))
         return results
 
     def get_chart_info(self, song_id: str, rating_class: int):
+        if self.__catalog_cache is not None:
+            return self.__catalog_cache.get(ChartInfo, song_id, rating_class)
         stmt = select(ChartInfo).where(
             (ChartInfo.song_id == song_id) & (ChartInfo.rating_class == rating_class)
         )
@@ -238,118 +608,341 @@ class Database(metaclass=Singleton):
 
     # region Chart
 
-    def get_charts_by_pack_id(self, pack_id: str):
-        stmt = select(Chart).where(Chart.set == pack_id)
-        with self.sessionmaker() as session:
-            results = list(session.scalars(stmt))
-        return results
-
-    def get_charts_by_song_id(self, song_id: str):
-        stmt = select(Chart).where(Chart.song_id == song_id)
-        with self.sessionmaker() as session:
-            results = list(session.scalars(stmt))
-        return results
+    def get_charts_by_pack_id(self, pack_id: str, *, as_records: bool = False):
+        if self.__catalog_cache is not None:
+            return self.__catalog_cache.filter_by(Chart, "set", pack_id)
+        stmt = self.__select(Chart, as_records=as_records).where(Chart.set == pack_id)
+        return self.__all(stmt, Chart, as_records=as_records)
+
+    def get_charts_by_song_id(self, song_id: str, *, as_records: bool = False):
+        if self.__catalog_cache is not None:
+            return self.__catalog_cache.filter_by(Chart, "song_id", song_id)
+        stmt = self.__select(Chart, as_records=as_records).where(
+            Chart.song_id == song_id
+        )
+        return self.__all(stmt, Chart, as_records=as_records)
 
-    def get_charts_by_constant(self, constant: int):
-        stmt = select(Chart).where(Chart.constant == constant)
-        with self.sessionmaker() as session:
-            results = list(session.scalars(stmt))
-        return results
+    def get_charts_by_constant(self, constant: int, *, as_records: bool = False):
+        if self.__catalog_cache is not None:
+            return self.__catalog_cache.filter_by(Chart, "constant", constant)
+        stmt = self.__select(Chart, as_records=as_records).where(
+            Chart.constant == constant
+        )
+        return self.__all(stmt, Chart, as_records=as_records)
+
+    def get_charts(
+        self, keys: Iterable[ChartKey], *, as_records: bool = False
+    ) -> Dict[ChartKey, Chart]:
+        """A dict of the charts of these `(song_id, rating_class)`s."""
+        return self.__get_by_chart_keys(  # type: ignore
+            Chart, keys, as_records=as_records
+        )
 
-    def get_chart(self, song_id: str, rating_class: int):
-        stmt = select(Chart).where(
+    def get_chart(self, song_id: str, rating_class: int, *, as_records: bool = False):
+        if self.__catalog_cache is not None:
+            return self.__catalog_cache.get(Chart, song_id, rating_class)
+        stmt = self.__select(Chart, as_records=as_records).where(
             (Chart.song_id == song_id) & (Chart.rating_class == rating_class)
         )
-        with self.sessionmaker() as session:
-            result = session.scalar(stmt)
-        return result
+        return self.__first(stmt, Chart, as_records=as_records)
 
     # endregion
 
     # region Score
 
-    def get_scores(self):
-        stmt = select(Score)
-        with self.sessionmaker() as session:
-            results = list(session.scalars(stmt))
-        return results
+    def get_scores(self, *, as_records: bool = False):
+        return self.__all(
+            self.__select(Score, as_records=as_records), Score, as_records=as_records
+        )
 
-    def get_score(self, score_id: int):
-        stmt = select(Score).where(Score.id == score_id)
-        with self.sessionmaker() as session:
-            result = session.scalar(stmt)
-        return result
+    def get_score(self, score_id: int, *, as_records: bool = False):
+        stmt = self.__select(Score, as_records=as_records).where(Score.id == score_id)
+        return self.__first(stmt, Score, as_records=as_records)
+
+    def __iter_keyset(
+        self,
+        stmt: Select,
+        keys: List[InstrumentedAttribute],
+        execute: Callable[..., Iterator],
+        *,
+        descending: bool,
+        page_size: int,
+    ) -> Iterator:
+        """
+        Stream the results of `stmt` ordered by `keys`, which must be unique
+        together and never NULL, one `LIMIT page_size` query per page, run by
+        `execute(page, **execution_options)`.
+        Each page resumes after the keys of the last row of the previous one,
+        in a session of its own, so no read transaction is held across pages.
+        """
+        key = keys[0] if len(keys) == 1 else tuple_(*keys)
+        stmt = stmt.order_by(*[k.desc() if descending else k for k in keys]).limit(
+            page_size
+        )
+        yield_per = min(page_size, self.ITER_YIELD_PER)
+
+        last = None
+        while True:
+            page = stmt
+            if last is not None:
+                last_key = last[0] if len(keys) == 1 else tuple_(*last)
+                page = page.where(key < last_key if descending else key > last_key)
+
+            rows = 0
+            for row in execute(page, yield_per=yield_per):
+                rows += 1
+                yield row
+            if rows < page_size:
+                return
+            last = [getattr(row, k.key) for k in keys]
+
+    def __iter_scores_of(
+        self,
+        model: Union[Type[Score], Type[ScoreCalculated]],
+        query: Optional[ScoreQuery],
+        *,
+        page_size: int,
+        as_records: bool,
+    ) -> Iterator:
+        if page_size < 1:
+            raise ValueError("page_size must be positive")
+        query = query if query is not None else ScoreQuery()
+
+        stmt = self.__select(model, as_records=as_records)
+        if query.song_id is not None:
+            stmt = stmt.where(model.song_id == query.song_id)
+        if query.rating_class is not None:
+            stmt = stmt.where(model.rating_class == query.rating_class)
+        if query.date_from is not None:
+            stmt = stmt.where(model.date >= query.date_from)
+        if query.date_to is not None:
+            stmt = stmt.where(model.date < query.date_to)
+        if query.clear_type is not None:
+            stmt = stmt.where(model.clear_type == query.clear_type)
+
+        def execute(page: Select, **execution_options) -> Iterator:
+            return self.__execute(
+                page, model, as_records=as_records, **execution_options
+            )
+
+        def iter_keyset(stmt: Select, keys: List[InstrumentedAttribute]):
+            return self.__iter_keyset(
+                stmt,
+                keys,
+                execute,
+                descending=query.descending,
+                page_size=page_size,
+            )
 
-    def get_score_best(self, song_id: str, rating_class: int):
-        stmt = select(ScoreBest).where(
-            (ScoreBest.song_id == song_id) & (ScoreBest.rating_class == rating_class)
+        if query.order == "id":
+            return iter_keyset(stmt, [model.id])
+
+        # NULL dates can't be compared in a keyset, so scores without a date
+        # are walked apart, by id, where SQLite sorts NULLs: first when
+        # ascending, last when descending
+        dated = iter_keyset(stmt.where(model.date.is_not(None)), [model.date, model.id])
+        if query.date_from is not None or query.date_to is not None:
+            return dated
+        undated = iter_keyset(stmt.where(model.date.is_(None)), [model.id])
+        return chain(dated, undated) if query.descending else chain(undated, dated)
+
+    def iter_scores(
+        self,
+        query: Optional[ScoreQuery] = None,
+        *,
+        page_size: int = 1000,
+        as_records: bool = False,
+    ) -> Iterator[Score]:
+        """
+        Iterate over the scores matching `query` (every score if `None`),
+        in its order, without loading them all at once.
+
+        The yielded scores are detached, or `ScoreRecord`s if `as_records`.
+        """
+        return self.__iter_scores_of(
+            Score, query, page_size=page_size, as_records=as_records
+        )
+
+    def iter_scores_calculated(
+        self,
+        query: Optional[ScoreQuery] = None,
+        *,
+        page_size: int = 1000,
+        as_records: bool = False,
+    ) -> Iterator[ScoreCalculated]:
+        """`iter_scores`, over the `scores_calculated` view."""
+        return self.__iter_scores_of(
+            ScoreCalculated, query, page_size=page_size, as_records=as_records
         )
-        with self.sessionmaker() as session:
-            result = session.scalar(stmt)
-        return result
+
+    def __score_best_model(self):
+        return ScoreBestMaterialized if self.materialized_scores else ScoreBest
+
+    def get_score_best(
+        self, song_id: str, rating_class: int, *, as_records: bool = False
+    ):
+        model = self.__score_best_model()
+        stmt = self.__select(model, as_records=as_records).where(
+            (model.song_id == song_id) & (model.rating_class == rating_class)
+        )
+        return self.__first(stmt, model, as_records=as_records)
+
+    def get_scores_best(
+        self, keys: Iterable[ChartKey], *, as_records: bool = False
+    ) -> Dict[ChartKey, Union[ScoreBest, ScoreBestMaterialized]]:
+        """A dict of the best scores of these `(song_id, rating_class)`s."""
+        return self.__get_by_chart_keys(  # type: ignore
+            self.__score_best_model(), keys, as_records=as_records
+        )
+
+    def __write(self, write: Callable[[], T]) -> T:
+        # retry on `database is locked` if the engine has a performance profile
+        profile = get_performance_profile(self.engine)
+        return write() if profile is None else profile.run_write(write)
 
     def insert_score(self, score: Score):
-        with self.sessionmaker() as session:
-            session.add(score)
-            session.commit()
+        def write():
+            with self.sessionmaker() as session:
+                session.add(score)
+                session.commit()
 
-    def insert_scores(self, scores: Iterable[Score]):
-        with self.sessionmaker() as session:
-            session.add_all(scores)
-            session.commit()
+        self.__write(write)
+
+    def insert_scores(
+        self, scores: Iterable[ScoreRow], *, skip_duplicate: bool = False
+    ):
+        """
+        Insert `scores` in a single transaction: either all of them are
+        inserted, or none if any fails. `scores` may be `Score`s, dicts of
+        `scores` columns, or tuples of `SCORE_TUPLE_FIELDS`, inserted with Core
+        `executemany`s. See `insert_scores_chunked` for large imports.
+
+        :param skip_duplicate: skip scores with the same `song_id`,
+            `rating_class`, `score` and `date` as an existing one.
+        """
+        # kept whole, the write may be retried
+        scores = list(scores)
+
+        def write():
+            with self.engine.begin() as conn:
+                insert_scores(conn, scores, skip_duplicate=skip_duplicate)
+
+        self.__write(write)
+
+    def insert_scores_chunked(
+        self,
+        scores: Iterable[ScoreRow],
+        *,
+        chunk_size: int = 1000,
+        skip_duplicate: bool = False,
+        progress: Optional[Callable[[InsertScoresResult], None]] = None,
+    ) -> InsertScoresResult:
+        """
+        `insert_scores`, committing every chunk of `chunk_size` rows in its own
+        transaction. `scores` is consumed one chunk at a time, so a generator
+        of any length is inserted in flat memory, but if a chunk fails, the
+        chunks before it stay inserted.
+
+        :param progress: called with the running totals after every chunk.
+        """
+        result = InsertScoresResult()
+        for rows in score_rows(scores, chunk_size):
+
+            def write(rows=rows):
+                with self.engine.begin() as conn:
+                    return insert_score_rows(conn, rows, skip_duplicate=skip_duplicate)
+
+            result += self.__write(write)
+            if progress is not None:
+                progress(result)
+        return result
+
+    def backfill_score_fingerprints(self) -> FingerprintBackfillResult:
+        """
+        Fill `Score.fingerprint` of scores inserted before it existed, and merge
+        the duplicate scores found on the way. See `backfill_score_fingerprints`.
+        """
+
+        def write():
+            with self.engine.begin() as conn:
+                return backfill_score_fingerprints(conn)
+
+        return self.__write(write)
 
     def update_score(self, score: Score):
         if score.id is None:
             raise ValueError(
                 "Cannot determine which score to update, please specify `score.id`"
             )
-        with self.sessionmaker() as session:
-            session.merge(score)
-            session.commit()
+
+        def write():
+            with self.sessionmaker() as session:
+                session.merge(score)
+                session.commit()
+
+        self.__write(write)
 
     def delete_score(self, score: Score):
-        with self.sessionmaker() as session:
-            session.delete(score)
-            session.commit()
+        def write():
+            with self.sessionmaker() as session:
+                session.delete(score)
+                session.commit()
 
-    def recommend_charts(self, play_result: float, bounds: float = 0.1):
+        self.__write(write)
+
+    def recommend_charts(
+        self,
+        play_result: float,
+        bounds: float = 0.1,
+        *,
+        limit: Optional[int] = None,
+        offset: int = 0,
+    ) -> List[Chart]:
         base_constant = math.ceil(play_result * 10)
 
-        results = []
-        results_id = []
+        min_scores: Dict[int, int] = {}
+        for constant in range(base_constant - 20, base_constant + 1):
+            # from Pure Memory(EX+) to AA
+            score_modifier = (play_result * 10 - constant) / 10
+            if score_modifier >= 2.0:
+                min_score = 10000000
+            elif score_modifier >= 1.0:
+                min_score = 200000 * (score_modifier - 1) + 9800000
+            else:
+                min_score = 300000 * score_modifier + 9500000
+            min_scores[constant] = int(min_score)
+
+        score_best = self.__score_best_model()
+        stmt = (
+            select(Chart)
+            .join(
+                score_best,
+                (Chart.song_id == score_best.song_id)
+                & (Chart.rating_class == score_best.rating_class),
+            )
+            .where(
+                Chart.constant.in_(min_scores.keys())
+                & (score_best.score >= case(min_scores, value=Chart.constant))
+                & (play_result - bounds < score_best.potential)
+                & (score_best.potential < play_result + bounds)
+            )
+            .order_by(Chart.constant, Chart.song_id, Chart.rating_class)
+            .limit(limit)
+            .offset(offset)
+        )
         with self.sessionmaker() as session:
-            for constant in range(base_constant - 20, base_constant + 1):
-                # from Pure Memory(EX+) to AA
-                score_modifier = (play_result * 10 - constant) / 10
-                if score_modifier >= 2.0:
-                    min_score = 10000000
-                elif score_modifier >= 1.0:
-                    min_score = 200000 * (score_modifier - 1) + 9800000
-                else:
-                    min_score = 300000 * score_modifier + 9500000
-                min_score = int(min_score)
-
-                charts = self.get_charts_by_constant(constant)
-                for chart in charts:
-                    score_best_stmt = select(ScoreBest).where(
-                        (ScoreBest.song_id == chart.song_id)
-                        & (ScoreBest.rating_class == chart.rating_class)
-                        & (ScoreBest.score >= min_score)
-                        & (play_result - bounds < ScoreBest.potential)
-                        & (ScoreBest.potential < play_result + bounds)
-                    )
-                    if session.scalar(score_best_stmt):
-                        chart_id = f"{chart.song_id},{chart.rating_class}"
-                        if chart_id not in results_id:
-                            results.append(chart)
-                            results_id.append(chart_id)
-
+            results = list(session.scalars(stmt))
         return results
 
     # endregion
 
     def get_b30(self):
-        stmt = select(CalculatedPotential.b30).select_from(CalculatedPotential)
+        model = (
+            CalculatedPotentialMaterialized
+            if self.materialized_scores
+            else CalculatedPotential
+        )
+        stmt = select(model.b30).select_from(model)
         with self.sessionmaker() as session:
             result = session.scalar(stmt)
         return result
@@ -400,28 +993,43 @@ class Database(metaclass=Singleton):
         return self.__count_table(ScoreCalculated)
 
     def count_scores_best(self):
-        return self.__count_table(ScoreBest)
+        return self.__count_table(self.__score_best_model())
 
     # endregion
 
     # region export
 
     def export_scores(self) -> List[ScoreExport]:
-        scores = self.get_scores()
-        return [exporters.score(score) for score in scores]
+        return [exporters.score(score) for score in self.iter_scores(as_records=True)]
 
     def export_scores_def_v2(self) -> ArcaeaOfflineDEFV2_Score:
-        scores = self.get_scores()
-        return {
-            "$schema": "https://arcaeaoffline.sevive.xyz/schemas/def/v2/score.schema.json",
-            "type": "score",
-            "version": 2,
-            "scores": [exporters.score_def_v2(score) for score in scores],
-        }
+        return exporters.scores_def_v2(
+            [
+                exporters.score_def_v2(score)
+                for score in self.iter_scores(as_records=True)
+            ]
+        )
+
+    def write_scores(self, fp: BinaryIO, *, ndjson: bool = False):
+        """Stream `export_scores()` to `fp` as JSON, or NDJSON if `ndjson`."""
+        exporters.write_scores(fp, self.iter_scores(as_records=True), ndjson=ndjson)
+
+    def write_scores_def_v2(self, fp: BinaryIO, *, ndjson: bool = False):
+        """
+        Stream `export_scores_def_v2()` to `fp` as JSON, or only its score
+        items as NDJSON if `ndjson`.
+        """
+        exporters.write_scores_def_v2(
+            fp, self.iter_scores(as_records=True), ndjson=ndjson
+        )
 
     def generate_arcsong(self):
         with self.sessionmaker() as session:
             arcsong = ArcSongJsonBuilder(session).generate_arcsong_json()
         return arcsong
 
+    def write_arcsong(self, fp: TextIO):
+        with self.sessionmaker() as session:
+            ArcSongJsonBuilder(session).write_arcsong_json(fp)
+
     # endregion
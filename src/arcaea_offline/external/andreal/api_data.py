@@ -1,31 +1,144 @@
-from typing import Optional, Union
+import json
+from dataclasses import dataclass, field
+from typing import Hashable, Iterable, List, Optional, Tuple, Union
 
-from sqlalchemy import select
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 
-from ...models import CalculatedPotential, ScoreBest, ScoreCalculated
+from ...models import ScoreBest, ScoreCalculated, ScoreCalculatedRecord
+from ...models.records import record_columns
+from ...scores_revision import get_scores_revision
+from ...utils.cache import LRUCache
 from .account import AndrealImageGeneratorAccount
 
+_B30_LIMIT = 30
+_B30_OVERFLOW_LIMIT = 40
+
+
+def _select_ranked_scores():
+    chart_rank = (
+        func.row_number()
+        .over(
+            partition_by=(ScoreCalculated.song_id, ScoreCalculated.rating_class),
+            order_by=(ScoreCalculated.potential.desc(), ScoreCalculated.id),
+        )
+        .label("chart_rank")
+    )
+    recent_rank = (
+        func.row_number()
+        .over(order_by=(ScoreCalculated.date.desc(), ScoreCalculated.id.desc()))
+        .label("recent_rank")
+    )
+    ranked = select(
+        *record_columns(ScoreCalculated), chart_rank, recent_rank
+    ).subquery()
+    return (
+        select(ranked)
+        .where((ranked.c.chart_rank == 1) | (ranked.c.recent_rank == 1))
+        .order_by(ranked.c.potential.desc(), ranked.c.id)
+    )
+
+
+@dataclass
+class AndrealRankedScores:
+    """The scores every payload is made of, read with a single query."""
+
+    bests: List[ScoreCalculatedRecord] = field(default_factory=list)
+    """the best score of every chart, by potential descending"""
+    recent: Optional[ScoreCalculatedRecord] = None
+    """the score with the latest date"""
+
+    def __post_init__(self):
+        self.__bests_by_chart = {(s.song_id, s.rating_class): s for s in self.bests}
+
+    def best(self, song_id: str, rating_class: int) -> Optional[ScoreCalculatedRecord]:
+        return self.__bests_by_chart.get((song_id, rating_class))
+
+    @property
+    def b30(self) -> Optional[float]:
+        potentials = [score.potential for score in self.bests[:_B30_LIMIT]]
+        if not potentials:
+            return None
+        # summed in order like SQLite's `avg()` of the `calculated_potential` view
+        total = 0.0
+        for potential in potentials:
+            total += potential
+        return total / len(potentials)
+
 
 class AndrealImageGeneratorApiDataConverter:
+    PAYLOADS = ("user_info", "user_best", "user_best30")
+
     def __init__(
         self,
         session: Session,
         account: AndrealImageGeneratorAccount = AndrealImageGeneratorAccount(),
+        *,
+        cache: Optional[LRUCache] = None,
     ):
+        """
+        :param cache: if specified, serialized payloads of `dumps()` are stored
+            in it, and reused until the `scores_revision` changes. It can be
+            shared by converters of different sessions and accounts, and needs
+            the `scores_revision` to be enabled, see
+            `Database.enable_scores_revision()`.
+        """
         self.session = session
         self.account = account
+        self.cache = cache
+        self.__ranked: Optional[Tuple[int, AndrealRankedScores]] = None
 
-    def account_info(self):
+    def account_info(self, account: Optional[AndrealImageGeneratorAccount] = None):
+        """The info of `account`, `self.account` if not specified."""
+        account = account if account is not None else self.account
         return {
-            "code": self.account.code,
-            "name": self.account.name,
-            "is_char_uncapped": self.account.character_uncapped,
-            "rating": self.account.rating,
-            "character": self.account.character,
+            "code": account.code,
+            "name": account.name,
+            "is_char_uncapped": account.character_uncapped,
+            "rating": account.rating,
+            "character": account.character,
         }
 
-    def score(self, score: Union[ScoreCalculated, ScoreBest]):
+    @staticmethod
+    def __account_key(account: AndrealImageGeneratorAccount) -> Hashable:
+        return (
+            account.code,
+            account.name,
+            account.character_uncapped,
+            account.rating,
+            account.character,
+        )
+
+    def __scores_revision(self) -> Optional[int]:
+        return get_scores_revision(self.session.connection())
+
+    def ranked_scores(self) -> AndrealRankedScores:
+        """
+        The `AndrealRankedScores`, reused while the `scores_revision` is the
+        same, if it's enabled.
+        """
+        revision = self.__scores_revision()
+        if (
+            revision is not None
+            and self.__ranked is not None
+            and self.__ranked[0] == revision
+        ):
+            return self.__ranked[1]
+
+        bests = []
+        recent = None
+        fields = len(ScoreCalculatedRecord._fields)
+        for row in self.session.execute(_select_ranked_scores()):
+            score = ScoreCalculatedRecord._make(row[:fields])
+            if row.chart_rank == 1:
+                bests.append(score)
+            if row.recent_rank == 1:
+                recent = score
+        ranked = AndrealRankedScores(bests=bests, recent=recent)
+        self.__ranked = None if revision is None else (revision, ranked)
+        return ranked
+
+    def score(self, score: Union[ScoreCalculated, ScoreBest, ScoreCalculatedRecord]):
         return {
             "score": score.score,
             "health": 75,
@@ -42,47 +155,48 @@ class AndrealImageGeneratorApiDataConverter:
             "shiny_perfect_count": score.shiny_pure,
         }
 
-    def user_info(self, score: Optional[ScoreCalculated] = None):
+    def user_info(
+        self,
+        score: Optional[ScoreCalculated] = None,
+        *,
+        account: Optional[AndrealImageGeneratorAccount] = None,
+    ):
         if not score:
-            score = self.session.scalar(
-                select(ScoreCalculated).order_by(ScoreCalculated.date.desc()).limit(1)
-            )
+            score = self.ranked_scores().recent
         if not score:
             raise ValueError("No score available.")
 
         return {
             "content": {
-                "account_info": self.account_info(),
+                "account_info": self.account_info(account),
                 "recent_score": [self.score(score)],
             }
         }
 
-    def user_best(self, song_id: str, rating_class: int):
-        score = self.session.scalar(
-            select(ScoreBest).where(
-                (ScoreBest.song_id == song_id)
-                & (ScoreBest.rating_class == rating_class)
-            )
-        )
+    def user_best(
+        self,
+        song_id: str,
+        rating_class: int,
+        *,
+        account: Optional[AndrealImageGeneratorAccount] = None,
+    ):
+        score = self.ranked_scores().best(song_id, rating_class)
         if not score:
             raise ValueError("No score available.")
 
         return {
             "content": {
-                "account_info": self.account_info(),
+                "account_info": self.account_info(account),
                 "record": self.score(score),
             }
         }
 
-    def user_best30(self):
-        scores = list(
-            self.session.scalars(
-                select(ScoreBest).order_by(ScoreBest.potential.desc()).limit(40)
-            )
-        )
+    def user_best30(self, *, account: Optional[AndrealImageGeneratorAccount] = None):
+        ranked = self.ranked_scores()
+        scores = ranked.bests[:_B30_OVERFLOW_LIMIT]
         if not scores:
             raise ValueError("No score available.")
-        best30_avg = self.session.scalar(select(CalculatedPotential.b30))
+        best30_avg = ranked.b30
 
         best30_overflow = (
             [self.score(score) for score in scores[30:40]] if len(scores) > 30 else []
@@ -90,9 +204,47 @@ class AndrealImageGeneratorApiDataConverter:
 
         return {
             "content": {
-                "account_info": self.account_info(),
+                "account_info": self.account_info(account),
                 "best30_avg": best30_avg,
                 "best30_list": [self.score(score) for score in scores[:30]],
                 "best30_overflow": best30_overflow,
             }
         }
+
+    def dumps(
+        self,
+        payload: str,
+        *args,
+        account: Optional[AndrealImageGeneratorAccount] = None,
+    ) -> str:
+        """
+        `json.dumps` of the payload method named `payload` called with `args`
+        for `account` (`self.account` if not specified), e.g.
+        `dumps("user_best", "tempestissimo", 3)`, cached in `cache`.
+        """
+        if payload not in self.PAYLOADS:
+            raise ValueError(f"Unknown payload {payload!r}")
+        account = account if account is not None else self.account
+
+        def compute():
+            return json.dumps(getattr(self, payload)(*args, account=account))
+
+        if self.cache is None:
+            return compute()
+        revision = self.__scores_revision()
+        if revision is None:
+            raise ValueError(
+                "Caching payloads needs the scores revision, "
+                "see `Database.enable_scores_revision()`"
+            )
+        key = ("andreal", payload, args, self.__account_key(account), revision)
+        return self.cache.get_or_compute(key, compute)
+
+    def dumps_many(
+        self, accounts: Iterable[AndrealImageGeneratorAccount], payload: str, *args
+    ) -> List[str]:
+        """
+        `dumps()` for every account of `accounts`, in the same order. With the
+        `scores_revision` enabled, the scores are read once for all of them.
+        """
+        return [self.dumps(payload, *args, account=account) for account in accounts]
@@ -1,39 +1,12 @@
 import contextlib
 import json
-import math
-import time
 from os import PathLike
 from typing import Any, List, Optional, Union
 
 from sqlalchemy.orm import DeclarativeBase, Session
 
-
-def fix_timestamp(timestamp: int) -> Union[int, None]:
-    """
-    Some of the `date` column in st3 are strangely truncated. For example,
-    a `1670283375` may be truncated to `167028`, even `1`. Yes, a single `1`.
-
-    To properly handle this situation, we check the timestamp's digits.
-    If `digits < 5`, we treat this timestamp as a `None`. Otherwise, we try to
-    fix the timestamp.
-
-    :param timestamp: a POSIX timestamp
-    :return: `None` if the timestamp's digits < 5, otherwise a fixed POSIX timestamp
-    """
-    # find digit length from https://stackoverflow.com/a/2189827/16484891
-    # CC BY-SA 2.5
-    # this might give incorrect result when timestamp > 999999999999997,
-    # see https://stackoverflow.com/a/28883802/16484891 (CC BY-SA 4.0).
-    # but that's way too later than 9999-12-31 23:59:59, 253402271999,
-    # I don't think Arcaea would still be an active updated game by then.
-    # so don't mind those small issues, just use this.
-    digits = int(math.log10(abs(timestamp))) + 1 if timestamp != 0 else 1
-    if digits < 5:
-        return None
-    timestamp_str = str(timestamp)
-    current_timestamp_digits = int(math.log10(int(time.time()))) + 1
-    timestamp_str = timestamp_str.ljust(current_timestamp_digits, "0")
-    return int(timestamp_str, 10)
+from ...utils.timestamp import fix_timestamp  # noqa: F401
+from ..upsert import UpsertResult, bulk_upsert
 
 
 def to_db_value(val: Any) -> Any:
@@ -93,7 +66,5 @@ class ArcaeaParser:
     def parse(self) -> List[DeclarativeBase]:
         raise NotImplementedError()
 
-    def write_database(self, session: Session):
-        results = self.parse()
-        for result in results:
-            session.merge(result)
+    def write_database(self, session: Session) -> UpsertResult:
+        return bulk_upsert(session, self.parse())
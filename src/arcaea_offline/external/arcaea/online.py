@@ -3,6 +3,9 @@ import logging
 from datetime import datetime
 from typing import Dict, List, Literal, Optional, TypedDict
 
+from sqlalchemy.orm import Session
+
+from ...bulk_scores import InsertScoresResult, insert_scores
 from ...models import Score
 from .common import ArcaeaParser, fix_timestamp
 
@@ -70,3 +73,19 @@ class ArcaeaOnlineParser(ArcaeaParser):
             score.comment = f"Parsed from web API at {date_text}"
             results.append(score)
         return results
+
+    def write_database(
+        self, session: Session, *, skip_duplicate=True
+    ) -> InsertScoresResult:
+        """
+        Insert the parsed scores, skipping those whose fingerprint is already in
+        the database, e.g. from an overlapping snapshot. If `skip_duplicate`,
+        scores with the same chart, score and date as an existing one are
+        skipped as well.
+        """
+        result = insert_scores(
+            session.connection(), self.parse(), skip_duplicate=skip_duplicate
+        )
+        if result.skipped:
+            logger.info("%d duplicate scores skipped.", result.skipped)
+        return result
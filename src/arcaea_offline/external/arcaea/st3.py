@@ -1,10 +1,10 @@
 import logging
 import sqlite3
-from typing import List
+from typing import Iterator, List
 
-from sqlalchemy import select
 from sqlalchemy.orm import Session
 
+from ...bulk_scores import InsertScoresResult, insert_scores
 from ...models.scores import Score
 from .common import ArcaeaParser, fix_timestamp
 
@@ -12,31 +12,32 @@ logger = logging.getLogger(__name__)
 
 
 class St3ScoreParser(ArcaeaParser):
-    def parse(self) -> List[Score]:
-        items = []
+    FETCH_SIZE = 1000
+    # st3 scores may have been entered by hand before, without their date
+    DUPLICATE_KEY = ("song_id", "rating_class", "score")
+
+    def iter_scores(self) -> Iterator[Score]:
         with sqlite3.connect(self.filepath) as st3_conn:
             cursor = st3_conn.cursor()
-            db_scores = cursor.execute(
-                "SELECT songId, songDifficulty, score, perfectCount, nearCount, missCount, "
-                "date, modifier FROM scores"
-            ).fetchall()
-            for (
-                song_id,
-                rating_class,
-                score,
-                pure,
-                far,
-                lost,
-                date,
-                modifier,
-            ) in db_scores:
-                clear_type = cursor.execute(
-                    "SELECT clearType FROM cleartypes WHERE songId = ? AND songDifficulty = ?",
-                    (song_id, rating_class),
-                ).fetchone()[0]
-
-                items.append(
-                    Score(
+            cursor.execute(
+                "SELECT s.songId, s.songDifficulty, s.score, s.perfectCount, "
+                "s.nearCount, s.missCount, s.date, s.modifier, c.clearType "
+                "FROM scores s LEFT JOIN cleartypes c "
+                "ON c.songId = s.songId AND c.songDifficulty = s.songDifficulty"
+            )
+            while rows := cursor.fetchmany(self.FETCH_SIZE):
+                for (
+                    song_id,
+                    rating_class,
+                    score,
+                    pure,
+                    far,
+                    lost,
+                    date,
+                    modifier,
+                    clear_type,
+                ) in rows:
+                    yield Score(
                         song_id=song_id,
                         rating_class=rating_class,
                         score=score,
@@ -48,26 +49,25 @@ class St3ScoreParser(ArcaeaParser):
                         clear_type=clear_type,
                         comment="Parsed from st3",
                     )
-                )
 
-        return items
-
-    def write_database(self, session: Session, *, skip_duplicate=True):
-        parsed_scores = self.parse()
-        for parsed_score in parsed_scores:
-            query_score = session.scalar(
-                select(Score).where(
-                    (Score.song_id == parsed_score.song_id)
-                    & (Score.rating_class == parsed_score.rating_class)
-                    & (Score.score == parsed_score.score)
-                )
-            )
+    def parse(self) -> List[Score]:
+        return list(self.iter_scores())
 
-            if query_score and skip_duplicate:
-                logger.info(
-                    "%r skipped because potential duplicate item %r found.",
-                    parsed_score,
-                    query_score,
-                )
-                continue
-            session.add(parsed_score)
+    def write_database(
+        self, session: Session, *, skip_duplicate=True
+    ) -> InsertScoresResult:
+        """
+        Insert the parsed scores, skipping those whose fingerprint is already in
+        the database. If `skip_duplicate`, scores with the same chart and score
+        as an existing one are skipped as well, whatever their dates.
+        """
+        result = insert_scores(
+            session.connection(),
+            self.iter_scores(),
+            chunk_size=self.FETCH_SIZE,
+            skip_duplicate=skip_duplicate,
+            duplicate_key=self.DUPLICATE_KEY,
+        )
+        if result.skipped:
+            logger.info("%d duplicate scores skipped.", result.skipped)
+        return result
@@ -1,9 +1,11 @@
 import sqlite3
 from typing import List
 
+from sqlalchemy import column, func, select, table
 from sqlalchemy.orm import Session
 
 from ...models.songs import ChartInfo
+from ..upsert import UpsertResult, attach_database, bulk_upsert, upsert_from_select
 
 
 class ArcsongDbParser:
@@ -28,7 +30,27 @@ class ArcsongDbParser:
 
         return results
 
-    def write_database(self, session: Session):
-        results = self.parse()
-        for result in results:
-            session.merge(result)
+    def write_database(self, session: Session) -> UpsertResult:
+        if session.get_bind().dialect.name != "sqlite":
+            return bulk_upsert(session, self.parse())
+
+        # copy the rows inside SQLite, without loading them into Python
+        schema = attach_database(session, self.filepath)
+        source = table(
+            "charts",
+            column("song_id"),
+            column("rating_class"),
+            column("rating"),
+            column("note"),
+            schema=schema,
+        )
+        return upsert_from_select(
+            session,
+            ChartInfo.__table__,
+            select(
+                source.c.song_id,
+                source.c.rating_class,
+                source.c.rating.label("constant"),
+                func.nullif(source.c.note, 0).label("notes"),
+            ),
+        )
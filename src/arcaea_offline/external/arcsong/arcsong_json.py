@@ -1,8 +1,9 @@
+import json
 import logging
 import re
-from typing import List, Optional, TypedDict
+from typing import Dict, Iterator, List, Optional, TextIO, Tuple, TypedDict
 
-from sqlalchemy import func, select
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 
 from ...models import (
@@ -55,6 +56,65 @@ class ArcSongJsonBuilder:
     def __init__(self, session: Session):
         self.session = session
 
+        self.__packs: Optional[Dict[str, Pack]] = None
+        self.__song_localized: Optional[Dict[str, SongLocalized]] = None
+        self.__difficulties: Optional[Dict[str, List[Difficulty]]] = None
+        self.__difficulty_localized: Optional[
+            Dict[Tuple[str, int], DifficultyLocalized]
+        ] = None
+        self.__chart_infos: Optional[Dict[Tuple[str, int], ChartInfo]] = None
+
+    # region catalog prefetch
+
+    # Every table is loaded with a single query on first use, so building the
+    # whole document costs a fixed number of queries regardless of catalog size.
+
+    @property
+    def _packs(self) -> Dict[str, Pack]:
+        if self.__packs is None:
+            self.__packs = {p.id: p for p in self.session.scalars(select(Pack))}
+        return self.__packs
+
+    @property
+    def _song_localized(self) -> Dict[str, SongLocalized]:
+        if self.__song_localized is None:
+            self.__song_localized = {
+                sl.id: sl for sl in self.session.scalars(select(SongLocalized))
+            }
+        return self.__song_localized
+
+    @property
+    def _difficulties(self) -> Dict[str, List[Difficulty]]:
+        if self.__difficulties is None:
+            self.__difficulties = {}
+            for difficulty in self.session.scalars(
+                select(Difficulty).order_by(Difficulty.song_id, Difficulty.rating_class)
+            ):
+                self.__difficulties.setdefault(difficulty.song_id, []).append(
+                    difficulty
+                )
+        return self.__difficulties
+
+    @property
+    def _difficulty_localized(self) -> Dict[Tuple[str, int], DifficultyLocalized]:
+        if self.__difficulty_localized is None:
+            self.__difficulty_localized = {
+                (dl.song_id, dl.rating_class): dl
+                for dl in self.session.scalars(select(DifficultyLocalized))
+            }
+        return self.__difficulty_localized
+
+    @property
+    def _chart_infos(self) -> Dict[Tuple[str, int], ChartInfo]:
+        if self.__chart_infos is None:
+            self.__chart_infos = {
+                (ci.song_id, ci.rating_class): ci
+                for ci in self.session.scalars(select(ChartInfo))
+            }
+        return self.__chart_infos
+
+    # endregion
+
     def get_difficulty_item(
         self,
         difficulty: Difficulty,
@@ -63,24 +123,13 @@ class ArcSongJsonBuilder:
         song_localized: Optional[SongLocalized],
     ) -> TArcSongJsonDifficultyItem:
         if "_append_" in pack.id:
-            base_pack = self.session.scalar(
-                select(Pack).where(Pack.id == re.sub(r"_append_.*$", "", pack.id))
-            )
+            base_pack = self._packs.get(re.sub(r"_append_.*$", "", pack.id))
         else:
             base_pack = None
 
-        difficulty_localized = self.session.scalar(
-            select(DifficultyLocalized).where(
-                (DifficultyLocalized.song_id == difficulty.song_id)
-                & (DifficultyLocalized.rating_class == difficulty.rating_class)
-            )
-        )
-        chart_info = self.session.scalar(
-            select(ChartInfo).where(
-                (ChartInfo.song_id == difficulty.song_id)
-                & (ChartInfo.rating_class == difficulty.rating_class)
-            )
-        )
+        chart_key = (difficulty.song_id, difficulty.rating_class)
+        difficulty_localized = self._difficulty_localized.get(chart_key)
+        chart_info = self._chart_infos.get(chart_key)
 
         if difficulty_localized:
             name_jp = difficulty_localized.title_ja or ""
@@ -116,19 +165,15 @@ class ArcSongJsonBuilder:
         }
 
     def get_song_item(self, song: Song) -> TArcSongJsonSongItem:
-        difficulties = self.session.scalars(
-            select(Difficulty).where(Difficulty.song_id == song.id)
-        )
+        difficulties = self._difficulties.get(song.id, [])
 
-        pack = self.session.scalar(select(Pack).where(Pack.id == song.set))
+        pack = self._packs.get(song.set)
         if not pack:
             logger.warning(
                 'Cannot find pack "%s", using placeholder instead.', song.set
             )
             pack = Pack(id="unknown", name="Unknown", description="__PLACEHOLDER__")
-        song_localized = self.session.scalar(
-            select(SongLocalized).where(SongLocalized.id == song.id)
-        )
+        song_localized = self._song_localized.get(song.id)
 
         return {
             "song_id": song.id,
@@ -139,19 +184,24 @@ class ArcSongJsonBuilder:
             "alias": [],
         }
 
-    def generate_arcsong_json(self) -> TArcSongJson:
-        songs = self.session.scalars(select(Song))
-        arcsong_songs = []
-        for song in songs:
-            proceed = self.session.scalar(
-                select(func.count(Difficulty.rating_class)).where(
-                    Difficulty.song_id == song.id
-                )
-            )
-
-            if not proceed:
+    def iter_song_items(self) -> Iterator[TArcSongJsonSongItem]:
+        for song in self.session.scalars(select(Song)):
+            if not self._difficulties.get(song.id):
                 continue
 
-            arcsong_songs.append(self.get_song_item(song))
+            yield self.get_song_item(song)
 
-        return {"songs": arcsong_songs}
+    def generate_arcsong_json(self) -> TArcSongJson:
+        return {"songs": list(self.iter_song_items())}
+
+    def write_arcsong_json(self, fp: TextIO):
+        """
+        Write the arcsong json to `fp` one song at a time. The output is the same
+        as `json.dump(self.generate_arcsong_json(), fp)`.
+        """
+        fp.write('{"songs": [')
+        for i, song_item in enumerate(self.iter_song_items()):
+            if i:
+                fp.write(", ")
+            fp.write(json.dumps(song_item))
+        fp.write("]}")
@@ -1,8 +1,11 @@
-from ...models import Score
-from .types import ArcaeaOfflineDEFV2_ScoreItem, ScoreExport
+import json
+from typing import BinaryIO, Iterable, List, Union
 
+from ...models import Score, ScoreRecord
+from .types import ArcaeaOfflineDEFV2_Score, ArcaeaOfflineDEFV2_ScoreItem, ScoreExport
 
-def score(score: Score) -> ScoreExport:
+
+def score(score: Union[Score, ScoreRecord]) -> ScoreExport:
     return {
         "id": score.id,
         "song_id": score.song_id,
@@ -19,7 +22,7 @@ def score(score: Score) -> ScoreExport:
     }
 
 
-def score_def_v2(score: Score) -> ArcaeaOfflineDEFV2_ScoreItem:
+def score_def_v2(score: Union[Score, ScoreRecord]) -> ArcaeaOfflineDEFV2_ScoreItem:
     return {
         "id": score.id,
         "songId": score.song_id,
@@ -35,3 +38,60 @@ def score_def_v2(score: Score) -> ArcaeaOfflineDEFV2_ScoreItem:
         "source": None,
         "comment": score.comment,
     }
+
+
+def scores_def_v2(
+    items: List[ArcaeaOfflineDEFV2_ScoreItem],
+) -> ArcaeaOfflineDEFV2_Score:
+    return {
+        "$schema": "https://arcaeaoffline.sevive.xyz/schemas/def/v2/score.schema.json",
+        "type": "score",
+        "version": 2,
+        "scores": items,
+    }
+
+
+def _write_items(fp: BinaryIO, items: Iterable[dict], *, ndjson: bool):
+    if ndjson:
+        for item in items:
+            fp.write(json.dumps(item).encode("utf-8"))
+            fp.write(b"\n")
+        return
+
+    fp.write(b"[")
+    for i, item in enumerate(items):
+        if i:
+            fp.write(b", ")
+        fp.write(json.dumps(item).encode("utf-8"))
+    fp.write(b"]")
+
+
+def write_scores(
+    fp: BinaryIO, scores: Iterable[Union[Score, ScoreRecord]], *, ndjson: bool = False
+):
+    """
+    Write the exports of `scores` to `fp` one score at a time. The output is the
+    same as `json.dump([score(s) for s in scores], fp)`, encoded in UTF-8,
+    or one export per line if `ndjson`.
+    """
+    _write_items(fp, map(score, scores), ndjson=ndjson)
+
+
+def write_scores_def_v2(
+    fp: BinaryIO, scores: Iterable[Union[Score, ScoreRecord]], *, ndjson: bool = False
+):
+    """
+    Write the DEF v2 score document of `scores` to `fp` one score at a time.
+    The output is the same as `json.dump(scores_def_v2(...), fp)`, encoded in
+    UTF-8, or, if `ndjson`, only the score items, one per line.
+    """
+    items = map(score_def_v2, scores)
+    if ndjson:
+        _write_items(fp, items, ndjson=True)
+        return
+
+    # the document with an empty `scores`, which is its last key
+    head = json.dumps(scores_def_v2([]))
+    fp.write(head[: -len("[]}")].encode("utf-8"))
+    _write_items(fp, items, ndjson=False)
+    fp.write(b"}")
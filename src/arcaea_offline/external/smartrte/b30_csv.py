@@ -1,3 +1,7 @@
+import csv
+from typing import Iterator, TextIO
+
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 
 from ...models import Chart, ScoreBest
@@ -24,41 +28,60 @@ class SmartRteB30CsvConverter:
     ):
         self.session = session
 
-    def rows(self) -> list:
-        csv_rows = [self.CSV_ROWS.copy()]
+    # rows buffered at a time while streaming the query
+    YIELD_PER = 500
 
-        with self.session as session:
-            results = (
-                session.query(
-                    Chart.title,
-                    ScoreBest.song_id,
-                    ScoreBest.rating_class,
-                    ScoreBest.score,
-                    ScoreBest.pure,
-                    ScoreBest.shiny_pure,
-                    ScoreBest.far,
-                    ScoreBest.lost,
-                    Chart.constant,
-                    ScoreBest.potential,
-                )
-                .join(
-                    Chart,
-                    (Chart.song_id == ScoreBest.song_id)
-                    & (Chart.rating_class == ScoreBest.rating_class),
-                )
-                .all()
+    def __select(self):
+        return (
+            select(
+                Chart.title,
+                ScoreBest.song_id,
+                ScoreBest.rating_class,
+                ScoreBest.score,
+                ScoreBest.pure,
+                ScoreBest.shiny_pure,
+                ScoreBest.far,
+                ScoreBest.lost,
+                Chart.constant,
+                ScoreBest.potential,
+            )
+            .select_from(ScoreBest)
+            .join(
+                Chart,
+                (Chart.song_id == ScoreBest.song_id)
+                & (Chart.rating_class == ScoreBest.rating_class),
             )
+            .execution_options(yield_per=self.YIELD_PER)
+        )
 
-            for result in results:
-                # replace the comma in song title because the target project
-                # cannot handle quoted string
-                result = list(result)
-                result[0] = result[0].replace(",", "")
-                result[2] = rating_class_to_text(result[2])
-                # divide constant to float
-                result[-2] = result[-2] / 10
-                # round potential
-                result[-1] = round(result[-1], 5)
-                csv_rows.append(result)
+    def iter_rows(self) -> Iterator[list]:
+        """
+        Yield the rows of `rows()` one at a time, streaming them from the
+        database. The session is left open.
+        """
+        yield self.CSV_ROWS.copy()
+
+        for result in self.session.execute(self.__select()):
+            # replace the comma in song title because the target project
+            # cannot handle quoted string
+            result = list(result)
+            result[0] = result[0].replace(",", "")
+            result[2] = rating_class_to_text(result[2])
+            # divide constant to float
+            result[-2] = result[-2] / 10
+            # round potential
+            result[-1] = round(result[-1], 5)
+            yield result
+
+    def rows(self) -> list:
+        with self.session:
+            return list(self.iter_rows())
 
-        return csv_rows
+    def write_csv(self, fp: TextIO):
+        """
+        Write the rows to `fp`, a file opened with `newline=""` or a
+        `csv.writer`, one row at a time. The session is left open.
+        """
+        writer = fp if hasattr(fp, "writerow") else csv.writer(fp)
+        for row in self.iter_rows():
+            writer.writerow(row)
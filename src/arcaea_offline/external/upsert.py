@@ -0,0 +1,216 @@
+import uuid
+from dataclasses import dataclass
+from itertools import islice
+from os import PathLike
+from typing import Dict, Iterable, List, Tuple, Union
+
+from sqlalchemy import (
+    Select,
+    Table,
+    event,
+    exists,
+    func,
+    inspect,
+    or_,
+    select,
+    true,
+    tuple_,
+)
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import DeclarativeBase, Session
+
+__all__ = ["UpsertResult", "bulk_upsert", "attach_database", "upsert_from_select"]
+
+_ATTACHED_DATABASES_INFO_KEY = "arcaea_offline_attached_databases"
+
+
+@dataclass
+class UpsertResult:
+    inserted: int = 0
+    updated: int = 0
+    unchanged: int = 0
+
+    def __add__(self, other: "UpsertResult") -> "UpsertResult":
+        return UpsertResult(
+            inserted=self.inserted + other.inserted,
+            updated=self.updated + other.updated,
+            unchanged=self.unchanged + other.unchanged,
+        )
+
+    @property
+    def total(self) -> int:
+        return self.inserted + self.updated + self.unchanged
+
+
+def _chunks(iterable: Iterable, size: int):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def _row_values(item: DeclarativeBase) -> Dict[str, object]:
+    # Only the attributes that were actually set on the model are written,
+    # which is what `session.merge()` does with a transient instance.
+    state = inspect(item)
+    return {
+        attr.columns[0].name: state.dict[attr.key]
+        for attr in state.mapper.column_attrs
+        if attr.key in state.dict
+    }
+
+
+def _upsert_chunk(session: Session, table: Table, rows: List[dict]) -> UpsertResult:
+    pk_columns = list(table.primary_key.columns)
+    columns = [table.c[name] for name in rows[0]]
+    update_columns = [c for c in columns if not c.primary_key]
+
+    if any(row.get(c.name) is None for row in rows for c in pk_columns):
+        # no complete primary key (e.g. autoincrement ids), nothing to conflict on
+        session.execute(table.insert(), rows)
+        return UpsertResult(inserted=len(rows))
+
+    keys = [tuple(row[c.name] for c in pk_columns) for row in rows]
+    existing = len(
+        session.execute(select(*pk_columns).where(tuple_(*pk_columns).in_(keys))).all()
+    )
+
+    stmt = _on_conflict_update(sqlite_insert(table), table, update_columns)
+    affected = session.execute(stmt, rows).rowcount
+
+    inserted = len(rows) - existing
+    updated = affected - inserted
+    return UpsertResult(
+        inserted=inserted, updated=updated, unchanged=existing - updated
+    )
+
+
+def _on_conflict_update(stmt, table: Table, update_columns):
+    pk_columns = list(table.primary_key.columns)
+    if not update_columns:
+        return stmt.on_conflict_do_nothing(index_elements=pk_columns)
+    return stmt.on_conflict_do_update(
+        index_elements=pk_columns,
+        set_={c.name: stmt.excluded[c.name] for c in update_columns},
+        # skip the write entirely if nothing changed
+        where=or_(*[c.is_distinct_from(stmt.excluded[c.name]) for c in update_columns]),
+    )
+
+
+def _merge(session: Session, items: Iterable[DeclarativeBase]) -> UpsertResult:
+    result = UpsertResult()
+    for item in items:
+        merged = session.merge(item)
+        if inspect(merged).pending:
+            result.inserted += 1
+        elif session.is_modified(merged):
+            result.updated += 1
+        else:
+            result.unchanged += 1
+    return result
+
+
+def bulk_upsert(
+    session: Session, items: Iterable[DeclarativeBase], *, chunk_size: int = 400
+) -> UpsertResult:
+    """
+    Insert or update `items` in batches, grouped by model type.
+
+    On SQLite, each batch is written with a single
+    `INSERT ... ON CONFLICT DO UPDATE` statement, and rows whose content
+    didn't change are left untouched. Other dialects fall back to
+    `session.merge()` per item.
+
+    If `items` contains the same primary key several times, the last one wins.
+    """
+    if session.get_bind().dialect.name != "sqlite":
+        return _merge(session, items)
+
+    # (table, written column names) -> {primary key or position: row}
+    groups: Dict[Tuple[Table, Tuple[str, ...]], Dict[object, dict]] = {}
+    for position, item in enumerate(items):
+        table = inspect(item).mapper.local_table
+        row = _row_values(item)
+        pk = tuple(row.get(c.name) for c in table.primary_key.columns)
+        rows = groups.setdefault((table, tuple(row)), {})
+        rows[position if None in pk else pk] = row
+
+    result = UpsertResult()
+    for (table, _), rows in groups.items():
+        for chunk in _chunks(rows.values(), chunk_size):
+            result += _upsert_chunk(session, table, chunk)
+    return result
+
+
+def _detach_databases(dbapi_connection, connection_record):
+    # SQLite refuses to DETACH inside a transaction, so databases attached by
+    # `attach_database` are detached once the connection is back in the pool.
+    if dbapi_connection is None:
+        return
+    for alias in connection_record.info.pop(_ATTACHED_DATABASES_INFO_KEY, []):
+        dbapi_connection.execute(f"DETACH DATABASE {alias}")
+
+
+def attach_database(session: Session, filepath: Union[str, PathLike]) -> str:
+    """
+    `ATTACH` the SQLite database at `filepath` to the connection of `session`,
+    and return the schema name it was attached as.
+
+    The database is detached automatically when the connection is released.
+    """
+    alias = f"attached_{uuid.uuid4().hex}"
+    connection = session.connection()
+    # listen on this engine's pool only, pools of unrelated engines are left alone
+    pool = connection.engine.pool
+    if not event.contains(pool, "checkin", _detach_databases):
+        event.listen(pool, "checkin", _detach_databases)
+    connection.exec_driver_sql(f"ATTACH DATABASE ? AS {alias}", (str(filepath),))
+    connection.connection.info.setdefault(_ATTACHED_DATABASES_INFO_KEY, []).append(
+        alias
+    )
+    return alias
+
+
+def upsert_from_select(session: Session, table: Table, source: Select) -> UpsertResult:
+    """
+    Insert or update every row of `source` into `table` with a single
+    SQLite `INSERT ... SELECT ... ON CONFLICT DO UPDATE`, without loading
+    any row into Python.
+
+    `source` must select the columns of `table` by name, primary key included.
+    """
+    source_subquery = source.subquery()
+    pk_columns = list(table.primary_key.columns)
+    update_columns = [
+        table.c[c.name]
+        for c in source.selected_columns
+        if not table.c[c.name].primary_key
+    ]
+
+    total = session.scalar(select(func.count()).select_from(source_subquery)) or 0
+    existing = (
+        session.scalar(
+            select(func.count())
+            .select_from(source_subquery)
+            .where(
+                exists().where(*[c == source_subquery.c[c.name] for c in pk_columns])
+            )
+        )
+        or 0
+    )
+
+    stmt = _on_conflict_update(
+        sqlite_insert(table).from_select(
+            [c.name for c in source.selected_columns],
+            # `WHERE true` avoids the "ON CONFLICT" parsing ambiguity of SQLite
+            source.where(true()),
+        ),
+        table,
+        update_columns,
+    )
+    affected = session.execute(stmt).rowcount
+
+    inserted = total - existing
+    updated = affected - inserted
+    return UpsertResult(
+        inserted=inserted, updated=updated, unchanged=existing - updated
+    )
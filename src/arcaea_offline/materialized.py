@@ -0,0 +1,186 @@
+"""
+Maintenance of the materialized `scores_best` / `calculated_potential` tables.
+
+The materialized tables mirror the `ScoreBest` and `CalculatedPotential` views,
+but live in real tables. SQLite triggers on `scores`, `charts_info` and
+`difficulties` refresh the affected chart's best row and the B30 average after
+every write, so every write path (`Database.insert_score`, parsers'
+`write_database`, raw SQL...) keeps them consistent.
+"""
+
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+from sqlalchemy import Connection, delete, func, insert, literal, literal_column, select
+from sqlalchemy.dialects import sqlite
+
+from .models.scores import (
+    CalculatedPotential,
+    CalculatedPotentialMaterialized,
+    Score,
+    ScoreBest,
+    ScoreBestMaterialized,
+    ScoreCalculated,
+    ScoresMaterializedBase,
+)
+from .models.songs import ChartInfo, Difficulty
+
+__all__ = [
+    "MaterializedScoresReport",
+    "create_materialized_scores",
+    "drop_materialized_scores",
+    "rebuild_materialized_scores",
+    "check_materialized_scores",
+]
+
+_B30_LIMIT = 30
+_TRIGGER_PREFIX = "trg_materialized_scores"
+_WATCHED_TABLES = [
+    Score.__tablename__,
+    ChartInfo.__tablename__,
+    Difficulty.__tablename__,
+]
+
+
+@dataclass
+class MaterializedScoresReport:
+    missing: List[Tuple[str, int]] = field(default_factory=list)
+    """charts present in the `scores_best` view but not in the table"""
+    stale: List[Tuple[str, int]] = field(default_factory=list)
+    """charts present in the table but not in the view, or with a different potential"""
+    b30_view: Optional[float] = None
+    b30_materialized: Optional[float] = None
+
+    @property
+    def ok(self) -> bool:
+        return (
+            not self.missing
+            and not self.stale
+            and self.b30_view == self.b30_materialized
+        )
+
+
+def _compile(stmt) -> str:
+    return str(
+        stmt.compile(dialect=sqlite.dialect(), compile_kwargs={"literal_binds": True})
+    )
+
+
+def _select_best(*whereclause):
+    return (
+        select(
+            *[
+                col
+                for col in ScoreCalculated.__table__.columns
+                if col.name != "potential"
+            ],
+            func.max(ScoreCalculated.potential).label("potential"),
+        )
+        .where(*whereclause)
+        .group_by(ScoreCalculated.song_id, ScoreCalculated.rating_class)
+    )
+
+
+def _refresh_chart_statements(row_alias: str):
+    song_id = literal_column(f"{row_alias}.song_id")
+    rating_class = literal_column(f"{row_alias}.rating_class")
+
+    best_select = _select_best(
+        ScoreCalculated.song_id == song_id,
+        ScoreCalculated.rating_class == rating_class,
+    )
+    return [
+        delete(ScoreBestMaterialized).where(
+            (ScoreBestMaterialized.song_id == song_id)
+            & (ScoreBestMaterialized.rating_class == rating_class)
+        ),
+        insert(ScoreBestMaterialized).from_select(
+            [c.name for c in best_select.selected_columns], best_select
+        ),
+    ]
+
+
+def _refresh_b30_statement():
+    bests_subquery = (
+        select(ScoreBestMaterialized.potential)
+        .order_by(ScoreBestMaterialized.potential.desc())
+        .limit(_B30_LIMIT)
+        .subquery()
+    )
+    return (
+        insert(CalculatedPotentialMaterialized)
+        .prefix_with("OR REPLACE")
+        .from_select(
+            ["id", "b30"],
+            select(literal(1), func.avg(bests_subquery.c.potential)),
+        )
+    )
+
+
+def _trigger_name(table: str, event: str) -> str:
+    return f"{_TRIGGER_PREFIX}_{table}_{event.lower()}"
+
+
+def _trigger_ddls() -> List[str]:
+    ddls = []
+    for table in _WATCHED_TABLES:
+        for event, row_aliases in [
+            ("INSERT", ["NEW"]),
+            ("DELETE", ["OLD"]),
+            ("UPDATE", ["OLD", "NEW"]),
+        ]:
+            statements = []
+            for row_alias in row_aliases:
+                statements.extend(_refresh_chart_statements(row_alias))
+            statements.append(_refresh_b30_statement())
+            body = "".join(f"{_compile(stmt)};\n" for stmt in statements)
+            ddls.append(
+                f"CREATE TRIGGER IF NOT EXISTS {_trigger_name(table, event)} "
+                f"AFTER {event} ON {table} FOR EACH ROW BEGIN\n{body}END"
+            )
+    return ddls
+
+
+def create_materialized_scores(conn: Connection):
+    ScoresMaterializedBase.metadata.create_all(conn)
+    for ddl in _trigger_ddls():
+        conn.exec_driver_sql(ddl)
+    rebuild_materialized_scores(conn)
+
+
+def drop_materialized_scores(conn: Connection):
+    for table in _WATCHED_TABLES:
+        for event in ["INSERT", "DELETE", "UPDATE"]:
+            conn.exec_driver_sql(
+                f"DROP TRIGGER IF EXISTS {_trigger_name(table, event)}"
+            )
+    ScoresMaterializedBase.metadata.drop_all(conn)
+
+
+def rebuild_materialized_scores(conn: Connection):
+    best_select = _select_best()
+    conn.execute(delete(ScoreBestMaterialized))
+    conn.execute(
+        insert(ScoreBestMaterialized).from_select(
+            [c.name for c in best_select.selected_columns], best_select
+        )
+    )
+    conn.execute(_refresh_b30_statement())
+
+
+def check_materialized_scores(conn: Connection) -> MaterializedScoresReport:
+    view_select = select(ScoreBest.song_id, ScoreBest.rating_class, ScoreBest.potential)
+    table_select = select(
+        ScoreBestMaterialized.song_id,
+        ScoreBestMaterialized.rating_class,
+        ScoreBestMaterialized.potential,
+    )
+
+    report = MaterializedScoresReport()
+    view_only = {(r[0], r[1]) for r in conn.execute(view_select.except_(table_select))}
+    table_only = {(r[0], r[1]) for r in conn.execute(table_select.except_(view_select))}
+    report.missing = sorted(view_only - table_only)
+    report.stale = sorted(table_only)
+    report.b30_view = conn.scalar(select(CalculatedPotential.b30))
+    report.b30_materialized = conn.scalar(select(CalculatedPotentialMaterialized.b30))
+    return report
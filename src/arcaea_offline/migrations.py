@@ -0,0 +1,86 @@
+"""
+Upgrades of databases created by older versions, run by `Database.init()`.
+
+The `version` property holds the schema version of a database. Every upgrade
+only adds to the schema and can be replayed, so a database without a
+`version` property is upgraded from the first version there's an upgrade for.
+"""
+
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import Connection, Table, inspect, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from .models.config import Property
+from .models.scores import Score
+
+__all__ = [
+    "SCHEMA_VERSION",
+    "get_schema_version",
+    "missing_columns",
+    "migrate",
+]
+
+SCHEMA_VERSION = 5
+_VERSION_KEY = "version"
+
+
+def get_schema_version(conn: Connection) -> Optional[int]:
+    value = conn.scalar(select(Property.value).where(Property.key == _VERSION_KEY))
+    return None if value is None else int(value)
+
+
+def _set_schema_version(conn: Connection, version: int):
+    stmt = sqlite_insert(Property).values(key=_VERSION_KEY, value=str(version))
+    conn.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[Property.key], set_={"value": stmt.excluded.value}
+        )
+    )
+
+
+def missing_columns(conn: Connection, table: Table) -> List[str]:
+    """Columns of `table` the existing table of the same name doesn't have."""
+    existing = {c["name"] for c in inspect(conn).get_columns(table.name)}
+    return [column.name for column in table.columns if column.name not in existing]
+
+
+def _add_missing_columns(conn: Connection, table: Table):
+    for name in missing_columns(conn, table):
+        column_type = table.c[name].type.compile(dialect=conn.dialect)
+        conn.exec_driver_sql(
+            f"ALTER TABLE {table.name} ADD COLUMN {name} {column_type}"
+        )
+
+
+def _migrate_to_5(conn: Connection):
+    # `scores.fingerprint`, and the indexes of bulk inserts and `iter_scores`
+    table: Table = Score.__table__  # type: ignore
+    _add_missing_columns(conn, table)
+    # may have been created unique over undated scores as well
+    conn.exec_driver_sql("DROP INDEX IF EXISTS ux_scores_fingerprint")
+    for index in table.indexes:
+        index.create(conn, checkfirst=True)
+
+
+# the upgrade to every version from the previous one
+_MIGRATIONS: Dict[int, Callable[[Connection], None]] = {
+    5: _migrate_to_5,
+}
+
+
+def migrate(conn: Connection) -> Tuple[Optional[int], int]:
+    """
+    Upgrade the database to `SCHEMA_VERSION`.
+
+    :return: the schema version before and after
+    """
+    version = get_schema_version(conn)
+    start = min(_MIGRATIONS) if version is None else version + 1
+    for target in range(start, SCHEMA_VERSION + 1):
+        _MIGRATIONS[target](conn)
+    # databases of newer versions are left as is
+    upgraded = max(version or 0, SCHEMA_VERSION)
+    if version != upgraded:
+        _set_schema_version(conn, upgraded)
+    return version, upgraded
@@ -1,10 +1,26 @@
 from .config import ConfigBase, Property
+from .records import (
+    ChartInfoRecord,
+    ChartRecord,
+    DifficultyLocalizedRecord,
+    DifficultyRecord,
+    PackLocalizedRecord,
+    PackRecord,
+    ScoreBestRecord,
+    ScoreCalculatedRecord,
+    ScoreRecord,
+    SongLocalizedRecord,
+    SongRecord,
+)
 from .scores import (
     CalculatedPotential,
+    CalculatedPotentialMaterialized,
     Score,
     ScoreBest,
+    ScoreBestMaterialized,
     ScoreCalculated,
     ScoresBase,
+    ScoresMaterializedBase,
     ScoresViewBase,
 )
 from .songs import (
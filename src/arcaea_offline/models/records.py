@@ -0,0 +1,258 @@
+"""
+Immutable records of the rows of the scores and song catalog models, for
+callers that only read them, and for the snapshots of `CatalogCache`.
+
+A record is a plain `NamedTuple`, built straight from a Core result row: no
+session, identity map or attribute instrumentation is involved.
+"""
+
+from typing import Dict, List, NamedTuple, Optional, Type
+
+from sqlalchemy import ColumnElement, Select, select
+from sqlalchemy.orm import DeclarativeBase
+
+from .scores import Score, ScoreBest, ScoreBestMaterialized, ScoreCalculated
+from .songs import (
+    Chart,
+    ChartInfo,
+    Difficulty,
+    DifficultyLocalized,
+    Pack,
+    PackLocalized,
+    Song,
+    SongLocalized,
+)
+
+__all__ = [
+    "ScoreRecord",
+    "ScoreCalculatedRecord",
+    "ScoreBestRecord",
+    "ChartRecord",
+    "PackRecord",
+    "PackLocalizedRecord",
+    "SongRecord",
+    "SongLocalizedRecord",
+    "DifficultyRecord",
+    "DifficultyLocalizedRecord",
+    "ChartInfoRecord",
+    "RECORD_TYPES",
+    "record_columns",
+    "select_records",
+    "to_record",
+]
+
+
+class ScoreRecord(NamedTuple):
+    id: int
+    song_id: str
+    rating_class: int
+    score: int
+    pure: Optional[int]
+    far: Optional[int]
+    lost: Optional[int]
+    date: Optional[int]
+    max_recall: Optional[int]
+    modifier: Optional[int]
+    clear_type: Optional[int]
+    comment: Optional[str]
+    fingerprint: Optional[str]
+
+
+class ScoreCalculatedRecord(NamedTuple):
+    id: int
+    song_id: str
+    rating_class: int
+    score: int
+    pure: Optional[int]
+    shiny_pure: Optional[int]
+    far: Optional[int]
+    lost: Optional[int]
+    date: Optional[int]
+    max_recall: Optional[int]
+    modifier: Optional[int]
+    clear_type: Optional[int]
+    potential: float
+    comment: Optional[str]
+
+
+class ScoreBestRecord(NamedTuple):
+    id: int
+    song_id: str
+    rating_class: int
+    score: int
+    pure: Optional[int]
+    shiny_pure: Optional[int]
+    far: Optional[int]
+    lost: Optional[int]
+    date: Optional[int]
+    max_recall: Optional[int]
+    modifier: Optional[int]
+    clear_type: Optional[int]
+    potential: float
+    comment: Optional[str]
+
+
+class ChartRecord(NamedTuple):
+    song_idx: int
+    song_id: str
+    rating_class: int
+    rating: int
+    rating_plus: bool
+    title: str
+    artist: str
+    set: str
+    bpm: Optional[str]
+    bpm_base: Optional[float]
+    audio_preview: Optional[int]
+    audio_preview_end: Optional[int]
+    side: Optional[int]
+    version: Optional[str]
+    date: Optional[int]
+    bg: Optional[str]
+    bg_inverse: Optional[str]
+    bg_day: Optional[str]
+    bg_night: Optional[str]
+    source: Optional[str]
+    source_copyright: Optional[str]
+    chart_designer: Optional[str]
+    jacket_desginer: Optional[str]
+    audio_override: bool
+    jacket_override: bool
+    jacket_night: Optional[str]
+    constant: int
+    notes: Optional[int]
+
+
+class PackRecord(NamedTuple):
+    id: str
+    name: str
+    description: Optional[str]
+
+
+class PackLocalizedRecord(NamedTuple):
+    id: str
+    name_ja: Optional[str]
+    name_ko: Optional[str]
+    name_zh_hans: Optional[str]
+    name_zh_hant: Optional[str]
+    description_ja: Optional[str]
+    description_ko: Optional[str]
+    description_zh_hans: Optional[str]
+    description_zh_hant: Optional[str]
+
+
+class SongRecord(NamedTuple):
+    idx: int
+    id: str
+    title: str
+    artist: str
+    set: str
+    bpm: Optional[str]
+    bpm_base: Optional[float]
+    audio_preview: Optional[int]
+    audio_preview_end: Optional[int]
+    side: Optional[int]
+    version: Optional[str]
+    date: Optional[int]
+    bg: Optional[str]
+    bg_inverse: Optional[str]
+    bg_day: Optional[str]
+    bg_night: Optional[str]
+    source: Optional[str]
+    source_copyright: Optional[str]
+
+
+class SongLocalizedRecord(NamedTuple):
+    id: str
+    title_ja: Optional[str]
+    title_ko: Optional[str]
+    title_zh_hans: Optional[str]
+    title_zh_hant: Optional[str]
+    search_title_ja: Optional[str]
+    search_title_ko: Optional[str]
+    search_title_zh_hans: Optional[str]
+    search_title_zh_hant: Optional[str]
+    search_artist_ja: Optional[str]
+    search_artist_ko: Optional[str]
+    search_artist_zh_hans: Optional[str]
+    search_artist_zh_hant: Optional[str]
+    source_ja: Optional[str]
+    source_ko: Optional[str]
+    source_zh_hans: Optional[str]
+    source_zh_hant: Optional[str]
+
+
+class DifficultyRecord(NamedTuple):
+    song_id: str
+    rating_class: int
+    rating: int
+    rating_plus: bool
+    chart_designer: Optional[str]
+    jacket_desginer: Optional[str]
+    audio_override: bool
+    jacket_override: bool
+    jacket_night: Optional[str]
+    title: Optional[str]
+    artist: Optional[str]
+    bg: Optional[str]
+    bg_inverse: Optional[str]
+    bpm: Optional[str]
+    bpm_base: Optional[float]
+    version: Optional[str]
+    date: Optional[int]
+
+
+class DifficultyLocalizedRecord(NamedTuple):
+    song_id: str
+    rating_class: int
+    title_ja: Optional[str]
+    title_ko: Optional[str]
+    title_zh_hans: Optional[str]
+    title_zh_hant: Optional[str]
+    artist_ja: Optional[str]
+    artist_ko: Optional[str]
+    artist_zh_hans: Optional[str]
+    artist_zh_hant: Optional[str]
+
+
+class ChartInfoRecord(NamedTuple):
+    song_id: str
+    rating_class: int
+    constant: int
+    notes: Optional[int]
+
+
+RECORD_TYPES: Dict[Type[DeclarativeBase], Type[NamedTuple]] = {
+    Score: ScoreRecord,
+    ScoreCalculated: ScoreCalculatedRecord,
+    ScoreBest: ScoreBestRecord,
+    ScoreBestMaterialized: ScoreBestRecord,
+    Chart: ChartRecord,
+    Pack: PackRecord,
+    PackLocalized: PackLocalizedRecord,
+    Song: SongRecord,
+    SongLocalized: SongLocalizedRecord,
+    Difficulty: DifficultyRecord,
+    DifficultyLocalized: DifficultyLocalizedRecord,
+    ChartInfo: ChartInfoRecord,
+}
+
+
+def record_columns(model: Type[DeclarativeBase]) -> List[ColumnElement]:
+    """The columns of `model`, in the field order of its record type."""
+    columns = model.__table__.columns
+    return [columns[field] for field in RECORD_TYPES[model]._fields]
+
+
+def select_records(model: Type[DeclarativeBase]) -> Select:
+    """
+    `select(model)`, but selecting the columns of its record type, so every
+    result row can be turned into one with `RECORD_TYPES[model]._make(row)`.
+    """
+    return select(*record_columns(model))
+
+
+def to_record(instance: DeclarativeBase):
+    """The record of an ORM instance."""
+    record_type = RECORD_TYPES[type(instance)]
+    return record_type._make(getattr(instance, field) for field in record_type._fields)
@@ -2,10 +2,11 @@
 
 from typing import Optional
 
-from sqlalchemy import TEXT, case, func, inspect, select, text
+from sqlalchemy import TEXT, Index, case, event, func, inspect, select, text
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
 from sqlalchemy_utils import create_view
 
+from ..utils.score_fingerprint import score_fingerprint
 from .common import ReprHelper
 from .songs import ChartInfo, Difficulty
 
@@ -16,6 +17,9 @@ __all__ = [
     "ScoreCalculated",
     "ScoreBest",
     "CalculatedPotential",
+    "ScoresMaterializedBase",
+    "ScoreBestMaterialized",
+    "CalculatedPotentialMaterialized",
 ]
 
 
@@ -43,6 +47,36 @@ class Score(ScoresBase):
         "3: PURE MEMORY, 4: EASY CLEAR, 5: HARD CLEAR"
     )
     comment: Mapped[Optional[str]] = mapped_column(TEXT())
+    fingerprint: Mapped[Optional[str]] = mapped_column(
+        TEXT(), comment="see `utils.score_fingerprint`, filled on insert & update"
+    )
+
+    __table_args__ = (
+        Index(
+            "ix_scores_song_id_rating_class_score_date",
+            "song_id",
+            "rating_class",
+            "score",
+            "date",
+        ),
+        # undated scores can't be told apart from a score entered twice by hand
+        Index(
+            "ux_scores_fingerprint",
+            "fingerprint",
+            unique=True,
+            sqlite_where=text("date IS NOT NULL"),
+        ),
+        # `id` is the rowid, which every index ends with,
+        # so these back keyset pages on `(date, id)` too
+        Index("ix_scores_date", "date"),
+        Index("ix_scores_clear_type_date", "clear_type", "date"),
+    )
+
+
+@event.listens_for(Score, "before_insert")
+@event.listens_for(Score, "before_update")
+def _set_score_fingerprint(mapper, connection, target: Score):
+    target.fingerprint = score_fingerprint(target)
 
 
 # How to create an SQL View with SQLAlchemy?
@@ -186,3 +220,39 @@ class CalculatedPotential(ScoresViewBase):
         metadata=ScoresViewBase.metadata,
         cascade_on_drop=False,
     )
+
+
+# Materialized counterparts of `ScoreBest` and `CalculatedPotential`.
+# These are real tables kept up to date by triggers, see `..materialized`.
+
+
+class ScoresMaterializedBase(DeclarativeBase, ReprHelper):
+    pass
+
+
+class ScoreBestMaterialized(ScoresMaterializedBase):
+    __tablename__ = "scores_best_materialized"
+
+    id: Mapped[int]
+    song_id: Mapped[str] = mapped_column(TEXT(), primary_key=True)
+    rating_class: Mapped[int] = mapped_column(primary_key=True)
+    score: Mapped[int]
+    pure: Mapped[Optional[int]]
+    shiny_pure: Mapped[Optional[int]]
+    far: Mapped[Optional[int]]
+    lost: Mapped[Optional[int]]
+    date: Mapped[Optional[int]]
+    max_recall: Mapped[Optional[int]]
+    modifier: Mapped[Optional[int]]
+    clear_type: Mapped[Optional[int]]
+    potential: Mapped[float]
+    comment: Mapped[Optional[str]] = mapped_column(TEXT())
+
+    __table_args__ = (Index("ix_scores_best_materialized_potential", "potential"),)
+
+
+class CalculatedPotentialMaterialized(ScoresMaterializedBase):
+    __tablename__ = "calculated_potential_materialized"
+
+    id: Mapped[int] = mapped_column(primary_key=True, comment="always 1")
+    b30: Mapped[Optional[float]]
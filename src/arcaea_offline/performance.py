@@ -0,0 +1,117 @@
+"""
+Opt-in SQLite tuning for engines shared by the GUI and importer scripts.
+"""
+
+import logging
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional, TypeVar
+
+from sqlalchemy import Engine, event
+from sqlalchemy.exc import OperationalError
+
+__all__ = [
+    "SqlitePerformanceProfile",
+    "apply_performance_profile",
+    "get_performance_profile",
+    "is_busy_error",
+]
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_EXECUTION_OPTIONS_KEY = "arcaea_offline_performance_profile"
+
+
+def is_busy_error(e: BaseException) -> bool:
+    """Whether `e` is SQLite's `SQLITE_BUSY` / `SQLITE_LOCKED`, worth retrying."""
+    if not isinstance(e, OperationalError):
+        return False
+    message = str(e.orig).lower()
+    return "database is locked" in message or "database is busy" in message
+
+
+@dataclass(frozen=True)
+class SqlitePerformanceProfile:
+    journal_mode: str = "WAL"
+    synchronous: str = "NORMAL"
+    cache_size: int = -65536
+    """pages if positive, KiB if negative (SQLite's convention)"""
+    mmap_size: int = 256 * 1024 * 1024
+    temp_store: str = "MEMORY"
+    busy_timeout: int = 5000
+    """milliseconds SQLite itself waits for a lock before failing"""
+
+    write_retries: int = 5
+    """how many times a write failing with `database is locked` is retried"""
+    retry_backoff: float = 0.05
+    """seconds to wait before the first retry, doubled for every next one"""
+    retry_backoff_max: float = 2.0
+
+    def pragmas(self):
+        return [
+            f"PRAGMA journal_mode = {self.journal_mode}",
+            f"PRAGMA synchronous = {self.synchronous}",
+            f"PRAGMA cache_size = {int(self.cache_size)}",
+            f"PRAGMA mmap_size = {int(self.mmap_size)}",
+            f"PRAGMA temp_store = {self.temp_store}",
+            f"PRAGMA busy_timeout = {int(self.busy_timeout)}",
+        ]
+
+    def apply(self, dbapi_connection):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in self.pragmas():
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+    def run_write(self, write: Callable[[], T]) -> T:
+        """
+        Call `write`, and call it again with an exponential backoff while it
+        fails because another connection or process holds the write lock.
+
+        `write` must open and commit its own transaction.
+        """
+        attempt = 0
+        backoff = self.retry_backoff
+        while True:
+            try:
+                return write()
+            except OperationalError as e:
+                if not is_busy_error(e) or attempt >= self.write_retries:
+                    raise
+                attempt += 1
+                logger.debug(
+                    "Database is locked, retrying in %.3fs (attempt %d/%d)",
+                    backoff,
+                    attempt,
+                    self.write_retries,
+                )
+                time.sleep(backoff)
+                backoff = min(backoff * 2, self.retry_backoff_max)
+
+
+def apply_performance_profile(engine: Engine, profile: SqlitePerformanceProfile):
+    """
+    Apply `profile` to every connection `engine` opens from now on, and record
+    it in the engine's execution options for `get_performance_profile`.
+
+    Connections already in the engine's pool are not changed, so call this
+    right after creating the engine.
+    """
+    if engine.dialect.name != "sqlite":
+        raise ValueError(
+            f"SqlitePerformanceProfile cannot be applied to {engine.dialect.name}"
+        )
+
+    @event.listens_for(engine, "connect")
+    def _apply_profile(dbapi_connection, connection_record):
+        profile.apply(dbapi_connection)
+
+    engine.update_execution_options(**{_EXECUTION_OPTIONS_KEY: profile})
+
+
+def get_performance_profile(engine: Engine) -> Optional[SqlitePerformanceProfile]:
+    return engine.get_execution_options().get(_EXECUTION_OPTIONS_KEY)
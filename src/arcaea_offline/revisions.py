@@ -0,0 +1,71 @@
+"""
+Revision counters in the `properties` table, bumped by SQLite triggers on
+every write to the tables they watch.
+
+Caches compare a revision instead of the data itself: one primary key lookup
+tells whether they're stale, whatever the write path was (`Database`,
+parsers' `write_database`, raw SQL, another process...).
+"""
+
+from typing import Dict, Iterable
+
+from sqlalchemy import Connection, column, exists, select
+from sqlalchemy import table as table_clause
+
+from .models.config import Property
+
+__all__ = [
+    "create_revision_triggers",
+    "drop_revision_triggers",
+    "revision_triggers_exist",
+    "get_revisions",
+]
+
+_EVENTS = ["INSERT", "DELETE", "UPDATE"]
+_SQLITE_MASTER = table_clause("sqlite_master", column("type"), column("name"))
+
+
+def _trigger_name(key: str, table: str, event: str) -> str:
+    return f"trg_{key}_{table}_{event.lower()}"
+
+
+def create_revision_triggers(conn: Connection, key: str, tables: Iterable[str]):
+    """Bump the `key` property on every row written to `tables`."""
+    properties = Property.__tablename__
+    for table in tables:
+        for event in _EVENTS:
+            conn.exec_driver_sql(
+                f"CREATE TRIGGER IF NOT EXISTS {_trigger_name(key, table, event)} "
+                f"AFTER {event} ON {table} FOR EACH ROW BEGIN\n"
+                f"INSERT INTO {properties} (key, value) VALUES ('{key}', '1') "
+                "ON CONFLICT (key) DO UPDATE SET value = CAST(value AS INTEGER) + 1;\n"
+                "END"
+            )
+
+
+def drop_revision_triggers(conn: Connection, key: str, tables: Iterable[str]):
+    for table in tables:
+        for event in _EVENTS:
+            conn.exec_driver_sql(
+                f"DROP TRIGGER IF EXISTS {_trigger_name(key, table, event)}"
+            )
+
+
+def revision_triggers_exist(key: str, table: str):
+    """
+    An `EXISTS` clause, true if the triggers of `key` on `table` exist.
+    They're created and dropped together, so checking one is enough.
+    """
+    return exists().where(
+        (_SQLITE_MASTER.c.type == "trigger")
+        & (_SQLITE_MASTER.c.name == _trigger_name(key, table, "INSERT"))
+    )
+
+
+def get_revisions(conn: Connection, keys: Iterable[str]) -> Dict[str, int]:
+    """The revision of every key of `keys`, `0` if never bumped."""
+    revisions = dict.fromkeys(keys, 0)
+    stmt = select(Property.key, Property.value).where(Property.key.in_(revisions))
+    for key, value in conn.execute(stmt):
+        revisions[key] = int(value)
+    return revisions
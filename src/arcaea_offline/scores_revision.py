@@ -0,0 +1,71 @@
+"""
+The `scores_revision` property, a counter bumped by SQLite triggers on every
+write to `scores`, `charts_info` and `difficulties`, i.e. whenever a score or
+a potential may have changed. See `arcaea_offline.revisions`.
+
+The triggers add a write to every score write, so they're only created on
+request, by `Database.enable_scores_revision()`, for the caches that need them.
+"""
+
+from typing import Optional
+
+from sqlalchemy import Connection, select
+
+from .models.config import Property
+from .models.scores import Score
+from .models.songs import ChartInfo, Difficulty
+from .revisions import (
+    create_revision_triggers,
+    drop_revision_triggers,
+    revision_triggers_exist,
+)
+
+__all__ = [
+    "SCORES_REVISION_KEY",
+    "create_scores_revision_triggers",
+    "drop_scores_revision_triggers",
+    "has_scores_revision_triggers",
+    "get_scores_revision",
+]
+
+SCORES_REVISION_KEY = "scores_revision"
+
+_WATCHED_TABLES = [
+    Score.__tablename__,
+    ChartInfo.__tablename__,
+    Difficulty.__tablename__,
+]
+
+
+def create_scores_revision_triggers(conn: Connection):
+    create_revision_triggers(conn, SCORES_REVISION_KEY, _WATCHED_TABLES)
+
+
+def drop_scores_revision_triggers(conn: Connection):
+    drop_revision_triggers(conn, SCORES_REVISION_KEY, _WATCHED_TABLES)
+
+
+def _triggers_exist():
+    return revision_triggers_exist(SCORES_REVISION_KEY, Score.__tablename__)
+
+
+def has_scores_revision_triggers(conn: Connection) -> bool:
+    return bool(conn.scalar(select(_triggers_exist())))
+
+
+def get_scores_revision(conn: Connection) -> Optional[int]:
+    """
+    The current revision, `0` if nothing was written since the triggers exist,
+    or `None` if they don't, i.e. the revision can't tell if scores changed.
+    """
+    value, triggers_exist = conn.execute(
+        select(
+            select(Property.value)
+            .where(Property.key == SCORES_REVISION_KEY)
+            .scalar_subquery(),
+            _triggers_exist(),
+        )
+    ).one()
+    if not triggers_exist:
+        return None
+    return int(value) if value is not None else 0
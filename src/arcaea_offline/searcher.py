@@ -1,18 +1,47 @@
-from typing import List, Union
+import hashlib
+import json
+from concurrent.futures import ThreadPoolExecutor
+from os import PathLike
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple, Union
 
-from sqlalchemy import select
+from sqlalchemy import Engine, select
 from sqlalchemy.orm import Session
 from whoosh.analysis import NgramFilter, StandardAnalyzer
 from whoosh.fields import ID, KEYWORD, TEXT, Schema
-from whoosh.filedb.filestore import RamStorage
+from whoosh.filedb.filestore import FileStorage, RamStorage
 from whoosh.qparser import FuzzyTermPlugin, MultifieldParser, OrGroup
 
 from .models.songs import Song, SongLocalized
+from .searcher_fts5 import Fts5Searcher
+from .utils.cache import LRUCache
 from .utils.search_title import recover_search_title
+from .utils.spelling import TermSuggester
 
 
 class Searcher:
-    def __init__(self):
+    def __init__(
+        self,
+        index_dir: Optional[Union[str, PathLike]] = None,
+        *,
+        search_cache_size: int = 256,
+        engine: Optional[Engine] = None,
+    ):
+        """
+        :param index_dir: if specified, the index is stored in this directory and
+            reused by later `Searcher`s, `import_songs` then only applies the
+            changed songs to it. Otherwise the index lives in memory.
+        :param search_cache_size: how many `search` results are kept in
+            `search_cache`, 0 disables the cache.
+        :param engine: the arcaea-offline database. If specified and its SQLite
+            supports the FTS5 `trigram` tokenizer (3.34+), songs are indexed in
+            that database by an `Fts5Searcher`, and `index_dir` is ignored.
+            Otherwise, or on older SQLite, the Whoosh index is used.
+        """
+        self.fts5: Optional[Fts5Searcher] = None
+        if engine is not None and Fts5Searcher.is_supported(engine):
+            self.fts5 = Fts5Searcher(engine)
+
         self.text_analyzer = StandardAnalyzer() | NgramFilter(minsize=2, maxsize=5)
         self.song_schema = Schema(
             song_id=ID(stored=True, unique=True),
@@ -20,9 +49,24 @@ class Searcher:
             artist=TEXT(analyzer=self.text_analyzer, spelling=True),
             source=TEXT(analyzer=self.text_analyzer, spelling=True),
             keywords=KEYWORD(lowercase=True, stored=True, scorable=True),
+            fingerprint=ID(stored=True),
         )
-        self.storage = RamStorage()
-        self.index = self.storage.create_index(self.song_schema)
+        if self.fts5 is not None:
+            self.storage = None
+            self.index = None
+        elif index_dir is None:
+            self.storage = RamStorage()
+            self.index = self.storage.create_index(self.song_schema)
+        else:
+            self.storage = FileStorage(str(index_dir)).create()
+            self.index = None
+            if self.storage.index_exists():
+                index = self.storage.open_index()
+                # rebuild indexes created with another schema
+                if set(index.schema.names()) == set(self.song_schema.names()):
+                    self.index = index
+            if self.index is None:
+                self.index = self.storage.create_index(self.song_schema)
 
         self.default_query_parser = MultifieldParser(
             ["song_id", "title", "artist", "source", "keywords"],
@@ -31,81 +75,202 @@ class Searcher:
         )
         self.default_query_parser.add_plugin(FuzzyTermPlugin())
 
-    def import_songs(self, session: Session):
-        writer = self.index.writer()
-        songs = list(session.scalars(select(Song)))
-        song_localize_stmt = select(SongLocalized)
-        for song in songs:
-            stmt = song_localize_stmt.where(SongLocalized.id == song.id)
-            sl = session.scalar(stmt)
-            song_id = song.id
-            possible_titles: List[Union[str, None]] = [song.title]
-            possible_artists: List[Union[str, None]] = [song.artist]
-            possible_sources: List[Union[str, None]] = [song.source]
-            if sl:
-                possible_titles.extend(
-                    [sl.title_ja, sl.title_ko, sl.title_zh_hans, sl.title_zh_hant]
-                )
-                possible_titles.extend(
-                    recover_search_title(sl.search_title_ja)
-                    + recover_search_title(sl.search_title_ko)
-                    + recover_search_title(sl.search_title_zh_hans)
-                    + recover_search_title(sl.search_title_zh_hant)
-                )
-                possible_artists.extend(
-                    recover_search_title(sl.search_artist_ja)
-                    + recover_search_title(sl.search_artist_ko)
-                    + recover_search_title(sl.search_artist_zh_hans)
-                    + recover_search_title(sl.search_artist_zh_hant)
-                )
-                possible_sources.extend(
-                    [
-                        sl.source_ja,
-                        sl.source_ko,
-                        sl.source_zh_hans,
-                        sl.source_zh_hant,
-                    ]
-                )
+        # incremented every time `import_songs` changes the Whoosh index
+        self.__generation = 0
+        self.__suggesters: Optional[Tuple[int, Dict[str, TermSuggester]]] = None
+        # (normalized query, limit, generation) -> song ids
+        self.search_cache: LRUCache[Tuple[str, ...]] = LRUCache(search_cache_size)
+
+    @property
+    def backend(self) -> str:
+        """`"fts5"` or `"whoosh"`."""
+        return "whoosh" if self.fts5 is None else "fts5"
+
+    @property
+    def generation(self) -> int:
+        """Changes every time the indexed songs change."""
+        if self.fts5 is not None:
+            return self.fts5.generation
+        return self.__generation
 
-            # remove empty items in list
-            titles = [t for t in possible_titles if t != "" and t is not None]
-            artists = [t for t in possible_artists if t != "" and t is not None]
-            sources = [t for t in possible_sources if t != "" and t is not None]
-
-            writer.update_document(
-                song_id=song_id,
-                title=" ".join(titles),
-                artist=" ".join(artists),
-                source=" ".join(sources),
-                keywords=" ".join([song_id] + titles + artists + sources),
+    @staticmethod
+    def index_dir_for(database_path: Union[str, PathLike]) -> Path:
+        """Suggested `index_dir` for a database file, next to that file."""
+        database_path = Path(database_path)
+        return database_path.with_name(f"{database_path.name}.search-index")
+
+    @staticmethod
+    def _song_document(song: Song, sl: Optional[SongLocalized]) -> Dict[str, str]:
+        song_id = song.id
+        possible_titles: List[Union[str, None]] = [song.title]
+        possible_artists: List[Union[str, None]] = [song.artist]
+        possible_sources: List[Union[str, None]] = [song.source]
+        if sl:
+            possible_titles.extend(
+                [sl.title_ja, sl.title_ko, sl.title_zh_hans, sl.title_zh_hant]
+            )
+            possible_titles.extend(
+                recover_search_title(sl.search_title_ja)
+                + recover_search_title(sl.search_title_ko)
+                + recover_search_title(sl.search_title_zh_hans)
+                + recover_search_title(sl.search_title_zh_hant)
+            )
+            possible_artists.extend(
+                recover_search_title(sl.search_artist_ja)
+                + recover_search_title(sl.search_artist_ko)
+                + recover_search_title(sl.search_artist_zh_hans)
+                + recover_search_title(sl.search_artist_zh_hant)
+            )
+            possible_sources.extend(
+                [
+                    sl.source_ja,
+                    sl.source_ko,
+                    sl.source_zh_hans,
+                    sl.source_zh_hant,
+                ]
             )
 
+        # remove empty items in list
+        titles = [t for t in possible_titles if t != "" and t is not None]
+        artists = [t for t in possible_artists if t != "" and t is not None]
+        sources = [t for t in possible_sources if t != "" and t is not None]
+
+        document = {
+            "song_id": song_id,
+            "title": " ".join(titles),
+            "artist": " ".join(artists),
+            "source": " ".join(sources),
+            "keywords": " ".join([song_id] + titles + artists + sources),
+        }
+        document["fingerprint"] = hashlib.sha1(
+            json.dumps(document, sort_keys=True).encode("utf-8")
+        ).hexdigest()
+        return document
+
+    def import_songs(self, session: Session):
+        if self.fts5 is not None:
+            self.fts5.import_songs(session)
+            return
+
+        stmt = select(Song, SongLocalized).outerjoin(
+            SongLocalized, SongLocalized.id == Song.id
+        )
+        documents = {
+            song.id: self._song_document(song, sl)
+            for song, sl in session.execute(stmt).tuples()
+        }
+
+        # compare with the fingerprints recorded in the index, so that an
+        # up-to-date persistent index doesn't need to be written at all
+        with self.index.searcher() as searcher:
+            indexed_fingerprints = {
+                fields["song_id"]: fields.get("fingerprint")
+                for fields in searcher.all_stored_fields()
+            }
+        removed_song_ids = indexed_fingerprints.keys() - documents.keys()
+        changed_documents = [
+            document
+            for song_id, document in documents.items()
+            if indexed_fingerprints.get(song_id) != document["fingerprint"]
+        ]
+        if not removed_song_ids and not changed_documents:
+            return
+
+        writer = self.index.writer()
+        for song_id in removed_song_ids:
+            writer.delete_by_term("song_id", song_id)
+        for document in changed_documents:
+            writer.update_document(**document)
         writer.commit()
+        self.__generation += 1
+
+    def __term_suggesters(self) -> Dict[str, TermSuggester]:
+        if self.__suggesters is None or self.__suggesters[0] != self.generation:
+            suggesters = {}
+            with self.index.searcher() as searcher:
+                reader = searcher.reader()
+                for fieldname in ["keywords", "song_id", "title", "artist", "source"]:
+                    # same terms and frequencies as `searcher.corrector(fieldname)`
+                    sugfield = self.song_schema[fieldname].spelling_fieldname(fieldname)
+                    suggesters[fieldname] = TermSuggester(
+                        {
+                            term: reader.frequency(fieldname, term)
+                            for term in reader.field_terms(sugfield)
+                        }
+                    )
+            self.__suggesters = (self.generation, suggesters)
+        return self.__suggesters[1]
 
     def did_you_mean(self, string: str):
+        if self.fts5 is not None:
+            return self.fts5.did_you_mean(string)
+
         results = set()
 
-        with self.index.searcher() as searcher:
-            corrector_keywords = searcher.corrector("keywords")  # type: ignore
-            corrector_song_id = searcher.corrector("song_id")  # type: ignore
-            corrector_title = searcher.corrector("title")  # type: ignore
-            corrector_artist = searcher.corrector("artist")  # type: ignore
-            corrector_source = searcher.corrector("source")  # type: ignore
-
-            results.update(corrector_keywords.suggest(string))
-            results.update(corrector_song_id.suggest(string))
-            results.update(corrector_title.suggest(string))
-            results.update(corrector_artist.suggest(string))
-            results.update(corrector_source.suggest(string))
+        for suggester in self.__term_suggesters().values():
+            results.update(suggester.suggest(string))
 
         if string in results:
             results.remove(string)
 
         return list(results)
 
+    @staticmethod
+    def _normalize_query(string: str) -> str:
+        return " ".join(string.split())
+
+    def __search(self, searcher, string: str, limit: int) -> Tuple[str, ...]:
+        query = self.default_query_parser.parse(string)
+        results = searcher.search(query, limit=limit)
+        return tuple(result.get("song_id") for result in results)
+
     def search(self, string: str, *, limit: int = 10):
-        query_string = f"{string}"
-        query = self.default_query_parser.parse(query_string)
-        with self.index.searcher() as searcher:
-            results = searcher.search(query, limit=limit)
-            return [result.get("song_id") for result in results]
+        key = (self._normalize_query(string), limit, self.generation)
+        song_ids = self.search_cache.get(key)
+        if song_ids is None:
+            if self.fts5 is not None:
+                song_ids = tuple(self.fts5.search(key[0], limit=limit))
+            else:
+                with self.index.searcher() as searcher:
+                    song_ids = self.__search(searcher, key[0], limit)
+            self.search_cache.put(key, song_ids)
+        return list(song_ids)
+
+    def search_many(
+        self,
+        strings: Iterable[str],
+        *,
+        limit: int = 10,
+        max_workers: Optional[int] = None,
+    ) -> List[List[str]]:
+        """
+        `search` every string in `strings` with one shared index searcher, and
+        return the results in the same order as `strings`.
+        """
+        generation = self.generation
+        keys = [(self._normalize_query(s), limit, generation) for s in strings]
+
+        results = {}
+        for key in dict.fromkeys(keys):
+            song_ids = self.search_cache.get(key)
+            if song_ids is not None:
+                results[key] = song_ids
+
+        missing_keys = [key for key in dict.fromkeys(keys) if key not in results]
+        if missing_keys and self.fts5 is not None:
+            # SQLite queries are cheap, and threads can't share its connections
+            for key in missing_keys:
+                results[key] = tuple(self.fts5.search(key[0], limit=limit))
+                self.search_cache.put(key, results[key])
+        elif missing_keys:
+            with self.index.searcher() as searcher, ThreadPoolExecutor(
+                max_workers
+            ) as executor:
+                searched = executor.map(
+                    lambda key: self.__search(searcher, key[0], limit), missing_keys
+                )
+                for key, song_ids in zip(missing_keys, searched):
+                    results[key] = song_ids
+                    self.search_cache.put(key, song_ids)
+
+        return [list(results[key]) for key in keys]
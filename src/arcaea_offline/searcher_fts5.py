@@ -0,0 +1,248 @@
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import Engine, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+
+from .models.songs import Song, SongLocalized
+from .utils.spelling import TermSuggester
+
+__all__ = ["Fts5Searcher"]
+
+# Mirrors `whoosh.analysis.StandardAnalyzer` & `NgramFilter(minsize=2, maxsize=5)`
+# used by `Searcher`, so that `did_you_mean` suggests the same kind of terms.
+_TOKEN_PATTERN = re.compile(r"\w+(\.?\w+)*", re.UNICODE)
+_STOP_WORDS = frozenset(
+    ("a", "an", "and", "are", "as", "at", "be", "by", "can", "for", "from", "have",
+     "if", "in", "is", "it", "may", "not", "of", "on", "or", "tbd", "that", "the",
+     "this", "to", "us", "we", "when", "will", "with", "yet", "you", "your")
+)  # fmt: skip
+_NGRAM_MIN_SIZE = 2
+_NGRAM_MAX_SIZE = 5
+_TRIGRAM_MIN_LENGTH = 3
+# the first release with the FTS5 `trigram` tokenizer
+_TRIGRAM_SQLITE_VERSION = (3, 34, 0)
+
+
+def _join_sql(*expressions: str) -> str:
+    return " || ' ' || ".join(f"coalesce({e}, '')" for e in expressions)
+
+
+def _json_words_sql(column: str) -> str:
+    return f"(SELECT group_concat(value, ' ') FROM json_each({column}))"
+
+
+def _localized_sql(column: str, *, json_array: bool = False) -> List[str]:
+    columns = [f"sl.{column}_{lang}" for lang in ["ja", "ko", "zh_hans", "zh_hant"]]
+    return [_json_words_sql(c) for c in columns] if json_array else columns
+
+
+def _ngrams(string: str) -> Iterable[str]:
+    for match in _TOKEN_PATTERN.finditer(string):
+        token = match.group(0).lower()
+        if len(token) < _NGRAM_MIN_SIZE or token in _STOP_WORDS:
+            continue
+        for start in range(len(token)):
+            for size in range(_NGRAM_MIN_SIZE, _NGRAM_MAX_SIZE + 1):
+                if start + size > len(token):
+                    break
+                yield token[start : start + size]
+
+
+class Fts5Searcher:
+    """
+    A `Searcher` backend storing songs in an SQLite FTS5 table inside the
+    arcaea-offline database itself, with the same `import_songs`, `search`
+    and `did_you_mean` methods.
+
+    The `trigram` tokenizer makes substring matches work for CJK titles as well.
+    After `import_songs`, triggers on `songs` and `songs_localized` keep the FTS5
+    table in sync, so it never needs to be rebuilt after a songlist import.
+
+    `Searcher(engine=...)` uses it when `is_supported(engine)`.
+    """
+
+    TABLE_NAME = "songs_fts"
+    REVISION_TABLE_NAME = "songs_fts_revision"
+
+    TITLE_SQL = _join_sql(
+        "s.title",
+        *_localized_sql("title"),
+        *_localized_sql("search_title", json_array=True),
+    )
+    ARTIST_SQL = _join_sql(
+        "s.artist", *_localized_sql("search_artist", json_array=True)
+    )
+    SOURCE_SQL = _join_sql("s.source", *_localized_sql("source"))
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self.__suggesters: Optional[Tuple[int, Dict[str, TermSuggester]]] = None
+
+    @staticmethod
+    def is_supported(engine: Engine) -> bool:
+        """
+        Whether the SQLite of `engine` has FTS5 and its `trigram` tokenizer,
+        i.e. is SQLite 3.34+ built with FTS5.
+        """
+        if engine.dialect.name != "sqlite":
+            return False
+        with engine.connect() as conn:
+            version = conn.exec_driver_sql("SELECT sqlite_version()").scalar_one()
+            version_info = tuple(int(part) for part in version.split("."))
+            if version_info < _TRIGRAM_SQLITE_VERSION:
+                return False
+            try:
+                conn.exec_driver_sql(
+                    "CREATE VIRTUAL TABLE temp.fts5_trigram_probe "
+                    "USING fts5(value, tokenize = 'trigram')"
+                )
+            except DBAPIError:
+                return False
+            conn.exec_driver_sql("DROP TABLE temp.fts5_trigram_probe")
+        return True
+
+    def _documents_select(self, where: str) -> str:
+        return (
+            f"SELECT s.id, {self.TITLE_SQL}, {self.ARTIST_SQL}, {self.SOURCE_SQL}, "
+            f"{_join_sql('s.id', self.TITLE_SQL, self.ARTIST_SQL, self.SOURCE_SQL)} "
+            f"FROM {Song.__tablename__} s LEFT JOIN {SongLocalized.__tablename__} sl "
+            f"ON sl.id = s.id WHERE {where}"
+        )
+
+    def _ddls(self) -> List[str]:
+        table = self.TABLE_NAME
+        ddls = [
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {table} USING fts5("
+            "song_id UNINDEXED, title, artist, source, keywords, "
+            "tokenize = 'trigram')",
+            f"CREATE TABLE IF NOT EXISTS {self.REVISION_TABLE_NAME} "
+            "(revision INTEGER NOT NULL)",
+        ]
+        for source_table in [Song.__tablename__, SongLocalized.__tablename__]:
+            for event, row_aliases in [
+                ("INSERT", "NEW.id"),
+                ("DELETE", "OLD.id"),
+                ("UPDATE", "OLD.id, NEW.id"),
+            ]:
+                ddls.append(
+                    f"CREATE TRIGGER IF NOT EXISTS trg_{table}_{source_table}_"
+                    f"{event.lower()} AFTER {event} ON {source_table} BEGIN "
+                    f"DELETE FROM {table} WHERE song_id IN ({row_aliases}); "
+                    f"INSERT INTO {table} "
+                    f"{self._documents_select(f's.id IN ({row_aliases})')}; "
+                    f"UPDATE {self.REVISION_TABLE_NAME} SET revision = revision + 1; "
+                    "END"
+                )
+        return ddls
+
+    def import_songs(self, session: Session):
+        """
+        (Re)build the FTS5 table from `songs` and `songs_localized`, and install
+        the triggers that keep it in sync. `session` is committed.
+        """
+        for ddl in self._ddls():
+            session.execute(text(ddl))
+        session.execute(text(f"DELETE FROM {self.TABLE_NAME}"))
+        session.execute(
+            text(f"INSERT INTO {self.TABLE_NAME} {self._documents_select('1')}")
+        )
+        revision = session.scalar(
+            text(f"SELECT max(revision) FROM {self.REVISION_TABLE_NAME}")
+        )
+        session.execute(text(f"DELETE FROM {self.REVISION_TABLE_NAME}"))
+        session.execute(
+            text(f"INSERT INTO {self.REVISION_TABLE_NAME} VALUES (:revision)"),
+            {"revision": (revision or 0) + 1},
+        )
+        session.commit()
+
+    @property
+    def generation(self) -> int:
+        """
+        Incremented every time the FTS5 table changes, either by `import_songs`
+        or by the triggers.
+        """
+        with self.engine.connect() as conn:
+            return (
+                conn.scalar(
+                    text(f"SELECT max(revision) FROM {self.REVISION_TABLE_NAME}")
+                )
+                or 0
+            )
+
+    def _field_term_frequencies(self) -> Dict[str, Dict[str, int]]:
+        fields: Dict[str, Counter] = {
+            name: Counter()
+            for name in ["song_id", "title", "artist", "source", "keywords"]
+        }
+        with self.engine.connect() as conn:
+            rows = conn.execute(
+                text(
+                    "SELECT song_id, title, artist, source, keywords "
+                    f"FROM {self.TABLE_NAME}"
+                )
+            )
+            for song_id, title, artist, source, keywords in rows:
+                fields["song_id"][song_id] += 1
+                fields["title"].update(_ngrams(title))
+                fields["artist"].update(_ngrams(artist))
+                fields["source"].update(_ngrams(source))
+                fields["keywords"].update(keywords.lower().split())
+        return fields
+
+    def __term_suggesters(self) -> Dict[str, TermSuggester]:
+        generation = self.generation
+        if self.__suggesters is None or self.__suggesters[0] != generation:
+            self.__suggesters = (
+                generation,
+                {
+                    fieldname: TermSuggester(term_frequencies)
+                    for fieldname, term_frequencies in (
+                        self._field_term_frequencies().items()
+                    )
+                },
+            )
+        return self.__suggesters[1]
+
+    def did_you_mean(self, string: str):
+        results = set()
+
+        for suggester in self.__term_suggesters().values():
+            results.update(suggester.suggest(string))
+
+        if string in results:
+            results.remove(string)
+
+        return list(results)
+
+    def search(self, string: str, *, limit: int = 10) -> List[str]:
+        words = string.split()
+        phrases = [
+            '"{}"'.format(word.replace('"', '""'))
+            for word in words
+            if len(word) >= _TRIGRAM_MIN_LENGTH
+        ]
+
+        with self.engine.connect() as conn:
+            if phrases:
+                # columns: song_id, title, artist, source, keywords
+                stmt = text(
+                    f"SELECT song_id FROM {self.TABLE_NAME} "
+                    f"WHERE {self.TABLE_NAME} MATCH :query "
+                    f"ORDER BY bm25({self.TABLE_NAME}, 0, 1, 1, 1, 1) LIMIT :limit"
+                )
+                params = {"query": " OR ".join(phrases), "limit": limit}
+            elif words:
+                # trigrams cannot match words shorter than 3 characters
+                stmt = text(
+                    f"SELECT song_id FROM {self.TABLE_NAME} "
+                    "WHERE keywords LIKE :pattern ESCAPE '\\' LIMIT :limit"
+                )
+                escaped = re.sub(r"([\\%_])", r"\\\1", words[0])
+                params = {"pattern": f"%{escaped}%", "limit": limit}
+            else:
+                return []
+            return list(conn.execute(stmt, params).scalars())
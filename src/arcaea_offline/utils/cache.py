@@ -0,0 +1,72 @@
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Generic, Hashable, TypeVar
+
+V = TypeVar("V")
+
+
+@dataclass
+class LRUCacheStats:
+    hits: int
+    misses: int
+    size: int
+    maxsize: int
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class LRUCache(Generic[V]):
+    """A thread-safe, bounded least-recently-used cache with hit/miss counters."""
+
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.__items: "OrderedDict[Hashable, V]" = OrderedDict()
+        self.__lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.__items)
+
+    def get(self, key: Hashable, default=None):
+        with self.__lock:
+            if key in self.__items:
+                self.__items.move_to_end(key)
+                self.hits += 1
+                return self.__items[key]
+            self.misses += 1
+            return default
+
+    def put(self, key: Hashable, value: V):
+        if self.maxsize <= 0:
+            return
+        with self.__lock:
+            self.__items[key] = value
+            self.__items.move_to_end(key)
+            while len(self.__items) > self.maxsize:
+                self.__items.popitem(last=False)
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], V]) -> V:
+        sentinel = object()
+        value = self.get(key, sentinel)
+        if value is sentinel:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        with self.__lock:
+            self.__items.clear()
+
+    def stats(self) -> LRUCacheStats:
+        with self.__lock:
+            return LRUCacheStats(
+                hits=self.hits,
+                misses=self.misses,
+                size=len(self.__items),
+                maxsize=self.maxsize,
+            )
@@ -0,0 +1,40 @@
+import hashlib
+from typing import TYPE_CHECKING, Any, Mapping, Optional, Union
+
+from .timestamp import fix_timestamp
+
+if TYPE_CHECKING:
+    from ..models.scores import Score
+
+FINGERPRINT_FIELDS = ("song_id", "rating_class", "score", "pure", "far", "lost", "date")
+
+# dates past this are taken as milliseconds, 1e11 seconds being in year 5138
+_MILLISECONDS_DATE_MIN = 10**11
+
+
+def _normalize_date(date: Optional[int]) -> Optional[int]:
+    if date is None:
+        return None
+    date = fix_timestamp(date)
+    if date is not None and abs(date) >= _MILLISECONDS_DATE_MIN:
+        date //= 1000
+    return date
+
+
+def score_fingerprint(score: Union["Score", Mapping[str, Any]]) -> str:
+    """
+    Identity of a play, stored in `Score.fingerprint` to detect the same score
+    imported twice, from the `FINGERPRINT_FIELDS` of `score`, a `Score` or a
+    mapping such as a row of `scores`.
+
+    `date` is normalized to seconds first: truncated st3 timestamps are fixed
+    with `fix_timestamp`, and milliseconds, like the `time_played` of the web
+    API, are truncated to seconds.
+    """
+    if isinstance(score, Mapping):
+        fields = [score[name] for name in FINGERPRINT_FIELDS]
+    else:
+        fields = [getattr(score, name) for name in FINGERPRINT_FIELDS]
+    fields[-1] = _normalize_date(fields[-1])
+    key = "|".join("" if field is None else str(field) for field in fields)
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
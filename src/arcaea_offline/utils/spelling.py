@@ -0,0 +1,99 @@
+import heapq
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set
+
+
+def levenshtein_distance(a: str, b: str, limit: Optional[int] = None) -> int:
+    """
+    Levenshtein (insertion, deletion, substitution) distance between `a` and `b`.
+
+    If `limit` is specified, only the diagonal band of width `limit` is
+    calculated, and `limit + 1` is returned as soon as the distance is known to
+    be larger than `limit`.
+    """
+    if len(a) < len(b):
+        a, b = b, a
+    if limit is None:
+        limit = len(a)
+    if len(a) - len(b) > limit:
+        return limit + 1
+
+    # cells farther than `limit` from the diagonal are always larger than it
+    over = limit + 1
+    previous_row = [j if j <= limit else over for j in range(len(b) + 1)]
+    for i, char_a in enumerate(a, start=1):
+        current_row = [over] * (len(b) + 1)
+        if i <= limit:
+            current_row[0] = i
+        low = max(1, i - limit)
+        high = min(len(b), i + limit)
+        for j in range(low, high + 1):
+            current_row[j] = min(
+                previous_row[j] + 1,
+                current_row[j - 1] + 1,
+                previous_row[j - 1] + (char_a != b[j - 1]),
+            )
+        if min(current_row[low - 1 : high + 1]) > limit:
+            return over
+        previous_row = current_row
+    return min(previous_row[-1], over)
+
+
+def _deletes(term: str, distance: int) -> Set[str]:
+    """`term` and every string obtained by deleting up to `distance` characters."""
+    results = {term}
+    current = {term}
+    for _ in range(distance):
+        current = {s[:i] + s[i + 1 :] for s in current for i in range(len(s))}
+        results.update(current)
+    return results
+
+
+class TermSuggester:
+    """
+    Suggests terms within an edit distance of a text, ranked the same way as
+    `whoosh.spelling.ReaderCorrector`: by term frequency, then alphabetically.
+
+    Candidates are looked up in a symmetric deletion dictionary (SymSpell)
+    built once for `max_distance`, and then verified with the exact
+    Levenshtein distance.
+    """
+
+    def __init__(self, term_frequencies: Dict[str, int], max_distance: int = 2):
+        self.term_frequencies = term_frequencies
+        self.max_distance = max_distance
+
+        self.__deletes: Dict[str, List[str]] = defaultdict(list)
+        for term in term_frequencies:
+            for deleted in _deletes(term, max_distance):
+                self.__deletes[deleted].append(term)
+
+    def terms_within(self, text: str, maxdist: int, prefix: int = 0) -> List[str]:
+        if maxdist > self.max_distance:
+            candidates: Iterable[str] = self.term_frequencies
+        else:
+            # if two strings are within `maxdist`, deleting at most `maxdist`
+            # characters from each of them gives a common string
+            candidates = {
+                term
+                for deleted in _deletes(text, maxdist)
+                for term in self.__deletes.get(deleted, [])
+            }
+
+        return [
+            term
+            for term in candidates
+            if term[:prefix] == text[:prefix]
+            and levenshtein_distance(term, text, maxdist) <= maxdist
+        ]
+
+    def suggest(
+        self, text: str, limit: int = 5, maxdist: int = 2, prefix: int = 0
+    ) -> List[str]:
+        scored = (
+            # higher scores are better
+            (0 - (maxdist + (1.0 / (self.term_frequencies[term] or 1) * 0.5)), term)
+            for term in self.terms_within(text, maxdist, prefix)
+        )
+        best = heapq.nlargest(limit, scored)
+        return [term for _, term in sorted(best, key=lambda x: (0 - x[0], x[1]))]
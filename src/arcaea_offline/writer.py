@@ -0,0 +1,172 @@
+"""
+A single writer thread for `Database`.
+
+SQLite allows one writer at a time, so instead of letting every thread open its
+own write transaction (and wait on, or fail with, `database is locked`), writes
+are submitted as jobs to one `DatabaseWriter` thread, which commits the jobs
+queued at the same moment together in a single transaction.
+"""
+
+import logging
+import queue
+import threading
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Callable, List, Optional, TypeVar
+
+from sqlalchemy.orm import Session, sessionmaker
+
+from .performance import SqlitePerformanceProfile
+
+__all__ = ["DatabaseWriter", "DatabaseWriterStats", "WriteJob"]
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+WriteJob = Callable[[Session], T]
+"""a write on the session it's given, which must not commit it"""
+
+
+@dataclass
+class DatabaseWriterStats:
+    jobs: int = 0
+    """jobs finished, successfully or not"""
+    failed_jobs: int = 0
+    commits: int = 0
+    fallbacks: int = 0
+    """batches that failed and were retried job by job"""
+
+
+class _Job:
+    __slots__ = ("write", "future")
+
+    def __init__(self, write: WriteJob, future: Future):
+        self.write = write
+        self.future = future
+
+
+_STOP = object()
+
+
+class DatabaseWriter:
+    """
+    Runs submitted `WriteJob`s on a dedicated thread.
+
+    Jobs waiting in the queue when the writer becomes free are run together in
+    one transaction, at most `max_batch_jobs` of them. If any of them raises,
+    the transaction is rolled back and each job of the batch is run again in a
+    transaction of its own, so one bad job doesn't fail the others.
+
+    The future returned by `submit` resolves to the job's return value once
+    its transaction is committed.
+    """
+
+    def __init__(
+        self,
+        session_maker: sessionmaker,
+        *,
+        max_batch_jobs: int = 256,
+        profile: Optional[SqlitePerformanceProfile] = None,
+    ):
+        """
+        :param profile: if specified, transactions failing with
+            `database is locked` are retried as configured in it.
+        """
+        self.sessionmaker = session_maker
+        self.max_batch_jobs = max_batch_jobs
+        self.profile = profile
+        self.stats = DatabaseWriterStats()
+
+        self.__queue: "queue.Queue" = queue.Queue()
+        self.__closed = False
+        self.__close_lock = threading.Lock()
+        self.__thread = threading.Thread(
+            target=self.__run, name="arcaea-offline-writer", daemon=True
+        )
+        self.__thread.start()
+
+    def submit(self, write: WriteJob) -> Future:
+        future = Future()
+        with self.__close_lock:
+            if self.__closed:
+                raise RuntimeError("DatabaseWriter is closed.")
+            self.__queue.put(_Job(write, future))
+        return future
+
+    def close(self, *, wait: bool = True):
+        """Stop the writer once every job submitted before is done."""
+        with self.__close_lock:
+            if not self.__closed:
+                self.__closed = True
+                self.__queue.put(_STOP)
+        if wait:
+            self.__thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    # region writer thread
+
+    def __run(self):
+        while True:
+            item = self.__queue.get()
+            if item is _STOP:
+                return
+
+            jobs: List[_Job] = [item]
+            stop = False
+            while len(jobs) < self.max_batch_jobs:
+                try:
+                    item = self.__queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                jobs.append(item)
+
+            jobs = [job for job in jobs if job.future.set_running_or_notify_cancel()]
+            if jobs:
+                self.__run_batch(jobs)
+            if stop:
+                return
+
+    def __commit(self, jobs: List[_Job]) -> list:
+        def write():
+            with self.sessionmaker() as session:
+                results = [job.write(session) for job in jobs]
+                session.commit()
+            return results
+
+        results = write() if self.profile is None else self.profile.run_write(write)
+        self.stats.commits += 1
+        return results
+
+    def __run_batch(self, jobs: List[_Job]):
+        try:
+            results = self.__commit(jobs)
+        except Exception as e:
+            if len(jobs) == 1:
+                self.stats.jobs += 1
+                self.stats.failed_jobs += 1
+                jobs[0].future.set_exception(e)
+                return
+            logger.debug(
+                "A batch of %d write jobs failed, retrying them one by one",
+                len(jobs),
+                exc_info=True,
+            )
+            self.stats.fallbacks += 1
+            for job in jobs:
+                self.__run_batch([job])
+            return
+
+        for job, result in zip(jobs, results):
+            self.stats.jobs += 1
+            job.future.set_result(result)
+
+    # endregion
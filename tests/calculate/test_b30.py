@@ -0,0 +1,102 @@
+import random
+from decimal import Decimal
+from types import SimpleNamespace
+
+from arcaea_offline.calculate import (
+    B30Tracker,
+    calculate_b30,
+    calculate_play_rating,
+    get_b30_calculated_list,
+)
+from arcaea_offline.calculate.score import PLAY_RATING_SCALE
+
+
+def _score(rng, score_id):
+    constant = rng.choice([80, 95, 98, 105, 110])
+    score = rng.randrange(9000000, 10002000)
+    return SimpleNamespace(
+        id=score_id,
+        song_id=f"song{rng.randrange(25)}",
+        rating_class=rng.randrange(4),
+        score=score,
+        potential=float(calculate_play_rating(constant, score)),
+    )
+
+
+def _brute_force(scores):
+    bests = {}
+    for score in scores:
+        key = (score.song_id, score.rating_class)
+        stored = bests.get(key)
+        if stored is None or (stored.potential, stored.score) < (
+            score.potential,
+            score.score,
+        ):
+            bests[key] = score
+    return sorted(bests.values(), key=lambda s: (s.potential, s.score), reverse=True)
+
+
+def _ids(scores):
+    return [score.id for score in scores]
+
+
+def test_random_updates():
+    rng = random.Random(283375)
+    tracker = B30Tracker()
+    scores = {}
+    for i in range(3000):
+        if scores and rng.random() < 0.3:
+            removed = scores.pop(rng.choice(list(scores)))
+            tracker.remove(removed if rng.random() < 0.5 else removed.id)
+        else:
+            # replace an existing score sometimes
+            score_id = rng.choice(list(scores)) if scores and i % 7 == 0 else i
+            scores[score_id] = _score(rng, score_id)
+            tracker.add(scores[score_id])
+
+        if i % 50 == 0:
+            expected = _brute_force(scores.values())
+            assert len(tracker) == len(expected)
+            assert _ids(tracker.b30_list()) == _ids(expected[:30])
+            assert _ids(tracker.overflow_list()) == _ids(expected[30:40])
+            ratings = [round(s.potential * PLAY_RATING_SCALE) for s in expected[:30]]
+            assert tracker.b30_fixed == (sum(ratings), len(ratings))
+            if expected:
+                chart = (expected[-1].song_id, expected[-1].rating_class)
+                assert tracker.best(*chart) is expected[-1]
+
+    tracker.rebuild()
+    assert (len(tracker), tracker.b30_list(), tracker.b30) == (0, [], Decimal("0.0"))
+
+
+def test_b30_functions():
+    rng = random.Random(1)
+    scores = [_score(rng, i) for i in range(200)]
+    expected = _brute_force(scores)[:30]
+    assert _ids(get_b30_calculated_list(scores)) == _ids(expected)
+
+    total = sum(round(s.potential * PLAY_RATING_SCALE) for s in expected)
+    assert calculate_b30(scores) == Decimal(total) / (30 * PLAY_RATING_SCALE)
+    assert calculate_b30(scores) == B30Tracker(iter(scores)).b30
+
+
+def test_same_chart_ranked_by_potential_then_score():
+    scores = [
+        SimpleNamespace(
+            id=1, song_id="a", rating_class=2, score=10001000, potential=12.0
+        ),
+        SimpleNamespace(
+            id=2, song_id="a", rating_class=2, score=10000500, potential=12.0
+        ),
+        SimpleNamespace(
+            id=3, song_id="b", rating_class=2, score=9000000, potential=0.0
+        ),
+    ]
+    tracker = B30Tracker(scores, limit=1, overflow_limit=2)
+    assert _ids(tracker.b30_list()) == [1]
+    assert _ids(tracker.overflow_list()) == [3]
+    tracker.remove(1)
+    assert _ids(tracker.b30_list()) == [2]
+    tracker.remove(2)
+    assert _ids(tracker.b30_list()) == [3]
+    assert tracker.b30 == Decimal("0.0")
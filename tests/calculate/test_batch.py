@@ -0,0 +1,85 @@
+from itertools import product
+
+import pytest
+
+from arcaea_offline.calculate import batch
+from arcaea_offline.calculate.score import (
+    calculate_play_rating,
+    calculate_score_modifier,
+    calculate_score_range,
+    calculate_shiny_pure,
+)
+
+# around the 9.5M, 9.8M and 10M boundaries
+SCORES = [
+    s + d
+    for s in (9500000, 9800000, 10000000)
+    for d in (-200001, -1, 0, 1, 199999, 1000)
+] + [0, 8000000, 10001234]
+CONSTANTS = [0, 15, 80, 98, 105, 116, 120]
+NOTES = [500, 800, 1000, 1250, 1600, 1337, 2599]
+
+
+@pytest.fixture(params=["numpy", "python"])
+def numpy_or_fallback(request, monkeypatch):
+    if request.param == "python":
+        monkeypatch.setattr(batch, "np", None)
+    elif batch.np is None:
+        pytest.skip("numpy is not installed")
+    return request.param
+
+
+def _list(values):
+    return [v.item() if hasattr(v, "item") else v for v in values]
+
+
+def test_score_modifiers(numpy_or_fallback):
+    assert _list(batch.calculate_score_modifiers(SCORES)) == [
+        float(calculate_score_modifier(score)) for score in SCORES
+    ]
+
+
+def test_play_ratings(numpy_or_fallback):
+    constants, scores = zip(*product(CONSTANTS, SCORES))
+    assert _list(batch.calculate_play_ratings(list(constants), list(scores))) == [
+        float(calculate_play_rating(c, s)) for c, s in zip(constants, scores)
+    ]
+    # scalars are broadcast
+    assert _list(batch.calculate_play_ratings(98, SCORES)) == [
+        float(calculate_play_rating(98, s)) for s in SCORES
+    ]
+
+
+def test_score_ranges_and_shiny_pures(numpy_or_fallback):
+    notes, pure, far = [], [], []
+    for n, lost, f in product(NOTES, (0, 3), (0, 1, 7, 20)):
+        notes.append(n)
+        pure.append(n - lost - f)
+        far.append(f)
+
+    lower, upper = batch.calculate_score_ranges(notes, pure, far)
+    expected = [calculate_score_range(*args) for args in zip(notes, pure, far)]
+    assert list(zip(_list(lower), _list(upper))) == expected
+
+    scores = [low + p // 2 for low, p in zip(_list(lower), pure)]
+    assert _list(batch.calculate_shiny_pures(notes, scores, pure, far)) == [
+        calculate_shiny_pure(*args) for args in zip(notes, scores, pure, far)
+    ]
+
+
+def test_exact(numpy_or_fallback):
+    # 10M / 2599 isn't exact in `Decimal`
+    lower, upper = batch.calculate_score_ranges([2599], [2599], [0])
+    assert (_list(lower), _list(upper)) == ([10000000], [10002599])
+    assert calculate_score_range(2599, 2599, 0) == (10000000, 10002599)
+    assert calculate_shiny_pure(2599, 10002599, 2599, 0) == 2599
+
+    for text in ["98", b"98"]:
+        with pytest.raises(TypeError):
+            batch.calculate_play_ratings(text, [9800000, 9900000])
+
+    with pytest.raises(ValueError, match="positive"):
+        batch.calculate_shiny_pures([0], [0], [0], [0])
+    if numpy_or_fallback == "python":
+        with pytest.raises(ValueError, match="same length"):
+            batch.calculate_play_ratings([98, 99], [9800000])
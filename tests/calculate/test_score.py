@@ -0,0 +1,88 @@
+import random
+from decimal import Decimal
+from types import SimpleNamespace
+
+from arcaea_offline.calculate import (
+    calculate_b30,
+    calculate_constants_from_play_rating,
+    calculate_play_rating,
+    calculate_score_modifier,
+)
+from arcaea_offline.calculate.score import (
+    PLAY_RATING_SCALE,
+    calculate_play_rating_fixed,
+    potential_to_fixed,
+)
+
+
+def _decimal_score_modifier(score: int) -> Decimal:
+    if score >= 10000000:
+        return Decimal(2)
+    if score >= 9800000:
+        return Decimal(1) + (Decimal(score - 9800000) / 200000)
+    return Decimal(score - 9500000) / 300000
+
+
+def _decimal_play_rating(constant: int, score: int) -> Decimal:
+    return max(Decimal(0), Decimal(constant) / 10 + _decimal_score_modifier(score))
+
+
+def _scores():
+    rng = random.Random(283375)
+    boundaries = [b + d for b in (9500000, 9800000, 10000000) for d in range(-3, 4)]
+    return [0, 8000000, 10001234, *boundaries] + [
+        rng.randrange(8000000, 10002000) for _ in range(2000)
+    ]
+
+
+def test_same_as_decimal():
+    for score in _scores():
+        expected = _decimal_score_modifier(score)
+        assert str(calculate_score_modifier(score)) == str(expected)
+        for constant in (0, 10, 15, 80, 98, 105, 116, 120):
+            expected = _decimal_play_rating(constant, score)
+            result = calculate_play_rating(constant, score)
+            assert str(result) == str(expected), (constant, score)
+    assert str(calculate_play_rating(98, 9840000)) == "11.0"
+
+
+def test_constants_from_play_rating():
+    result = calculate_constants_from_play_rating("12.3456")
+    assert result.EXPlus == (
+        Decimal("12.3456") - _decimal_score_modifier(10000000),
+        Decimal("12.3456") - _decimal_score_modifier(9900000),
+    )
+    assert result.C[1] == Decimal("12.3456") - _decimal_score_modifier(8600000)
+
+
+def test_b30():
+    rng = random.Random(1)
+    charts = [(f"song{i}", rng.randrange(10, 120)) for i in range(45)]
+    calculated = []
+    for i, (song_id, constant) in enumerate(charts):
+        score = rng.randrange(9000000, 10002000)
+        # potentials as the `scores_calculated` view computes them
+        if score >= 10000000:
+            potential = constant / 10.0 + 2
+        elif score >= 9800000:
+            potential = constant / 10.0 + 1 + (score - 9800000) / 200000.0
+        else:
+            potential = max(constant / 10.0 + (score - 9500000) / 300000.0, 0)
+        assert potential_to_fixed(potential) == calculate_play_rating_fixed(
+            constant, score
+        )
+        calculated.append(
+            SimpleNamespace(
+                id=i,
+                song_id=song_id,
+                rating_class=2,
+                score=score,
+                potential=potential,
+                rating=calculate_play_rating(constant, score),
+            )
+        )
+
+    best30 = sorted(calculated, key=lambda c: c.potential, reverse=True)[:30]
+    exact = sum(c.rating * PLAY_RATING_SCALE for c in best30)
+    assert calculate_b30(calculated) == exact / (30 * PLAY_RATING_SCALE)
+    assert calculate_b30([]) == Decimal("0.0")
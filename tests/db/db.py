@@ -1,5 +1,63 @@
+from typing import Iterable, Optional, Tuple
+
 from sqlalchemy import Engine, create_engine, inspect
 
+from arcaea_offline.database import Database
+from arcaea_offline.models import ChartInfo, Difficulty, Pack, Song
+
 
 def create_engine_in_memory():
     return create_engine("sqlite:///:memory:")
+
+
+def create_database_in_memory() -> Database:
+    engine = create_engine_in_memory()
+    database = Database(engine)
+    # `Database` is a singleton, make sure the existing instance uses the new engine
+    database.engine = engine
+    database.init()
+    return database
+
+
+def insert_test_charts(
+    database: Database,
+    charts: Iterable[Tuple[str, int, int, Optional[int]]],
+):
+    """
+    Insert a "test" pack, and a song, difficulty & chart info for every
+    `(song_id, rating_class, constant, notes)` in `charts`.
+    """
+    with database.sessionmaker() as session:
+        session.add(Pack(id="test", name="Test Pack"))
+        song_ids = set()
+        for song_id, rating_class, constant, notes in charts:
+            if song_id not in song_ids:
+                session.add(
+                    Song(
+                        idx=len(song_ids),
+                        id=song_id,
+                        title=song_id,
+                        artist="test",
+                        set="test",
+                    )
+                )
+                song_ids.add(song_id)
+            session.add(
+                Difficulty(
+                    song_id=song_id,
+                    rating_class=rating_class,
+                    rating=constant // 10,
+                    rating_plus=False,
+                    audio_override=False,
+                    jacket_override=False,
+                )
+            )
+            session.add(
+                ChartInfo(
+                    song_id=song_id,
+                    rating_class=rating_class,
+                    constant=constant,
+                    notes=notes,
+                )
+            )
+        session.commit()
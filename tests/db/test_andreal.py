@@ -0,0 +1,132 @@
+import json
+
+import pytest
+from sqlalchemy import select
+
+from arcaea_offline.external.andreal import AndrealImageGeneratorApiDataConverter
+from arcaea_offline.external.andreal.account import AndrealImageGeneratorAccount
+from arcaea_offline.models import CalculatedPotential, Score, ScoreBest
+from arcaea_offline.utils.cache import LRUCache
+
+from .db import create_database_in_memory, insert_test_charts
+
+
+def _database():
+    database = create_database_in_memory()
+    insert_test_charts(database, [(f"song{i}", 2, 80 + i, 1000) for i in range(35)])
+    database.insert_scores(
+        Score(
+            song_id=f"song{i % 35}",
+            rating_class=2,
+            score=9500000 + i * 3001,
+            pure=900,
+            far=50,
+            lost=50,
+            date=1700000000 + (i * 7919) % 100,
+        )
+        for i in range(100)
+    )
+    return database
+
+
+class Test_AndrealApiData:
+    def test_payloads(self):
+        database = _database()
+        with database.sessionmaker() as session:
+            converter = AndrealImageGeneratorApiDataConverter(session)
+            bests = list(
+                session.scalars(select(ScoreBest).order_by(ScoreBest.potential.desc()))
+            )
+
+            best30 = converter.user_best30()["content"]
+            assert best30["best30_list"] == [converter.score(s) for s in bests[:30]]
+            assert best30["best30_overflow"] == [
+                converter.score(s) for s in bests[30:40]
+            ]
+            assert best30["best30_avg"] == pytest.approx(
+                session.scalar(select(CalculatedPotential.b30))
+            )
+
+            record = converter.user_best("song3", 2)["content"]["record"]
+            assert record == converter.score(
+                bests[[s.song_id for s in bests].index("song3")]
+            )
+            with pytest.raises(ValueError, match="No score"):
+                converter.user_best("song3", 3)
+
+            recent = converter.user_info()["content"]["recent_score"][0]
+            latest = max(database.get_scores(), key=lambda s: (s.date, s.id))
+            assert recent["time_played"] == latest.date * 1000
+            assert recent["score"] == latest.score
+
+    def test_no_scores(self):
+        database = create_database_in_memory()
+        with database.sessionmaker() as session:
+            converter = AndrealImageGeneratorApiDataConverter(session)
+            with pytest.raises(ValueError, match="No score"):
+                converter.user_best30()
+            with pytest.raises(ValueError, match="No score"):
+                converter.user_info()
+
+    def test_cache(self):
+        database = _database()
+        cache = LRUCache()
+        accounts = [
+            AndrealImageGeneratorAccount(name="a", code=1),
+            AndrealImageGeneratorAccount(name="b", code=2),
+        ]
+
+        assert database.scores_revision() is None
+        with database.sessionmaker() as session:
+            converter = AndrealImageGeneratorApiDataConverter(session, cache=cache)
+            with pytest.raises(ValueError, match="enable_scores_revision"):
+                converter.dumps("user_best30")
+            converter.cache = None
+            assert converter.dumps_many(accounts, "user_best30")
+        database.enable_scores_revision()
+
+        with database.sessionmaker() as session:
+            converter = AndrealImageGeneratorApiDataConverter(session, cache=cache)
+            payloads = converter.dumps_many(accounts, "user_best30")
+            assert [
+                json.loads(p)["content"]["account_info"]["name"] for p in payloads
+            ] == ["a", "b"]
+            assert (
+                json.loads(payloads[0])["content"]["best30_list"]
+                == (converter.user_best30()["content"]["best30_list"])
+            )
+            assert converter.account.name == "Player"
+            with pytest.raises(ValueError, match="Unknown payload"):
+                converter.dumps("account_info")
+
+        with database.sessionmaker() as session:
+            converter = AndrealImageGeneratorApiDataConverter(
+                session, accounts[0], cache=cache
+            )
+            hits = cache.hits
+            assert converter.dumps("user_best30") == payloads[0]
+            assert cache.hits == hits + 1
+
+        revision = database.scores_revision()
+        database.insert_score(Score(song_id="song34", rating_class=2, score=10000000))
+        assert database.scores_revision() > revision
+
+        with database.sessionmaker() as session:
+            converter = AndrealImageGeneratorApiDataConverter(
+                session, accounts[0], cache=cache
+            )
+            best30 = json.loads(converter.dumps("user_best30"))["content"]
+            assert best30["best30_list"][0]["score"] == 10000000
+
+    def test_scores_revision(self):
+        database = create_database_in_memory()
+        insert_test_charts(database, [("song0", 2, 80, 1000)])
+        assert database.scores_revision() is None
+
+        database.enable_scores_revision()
+        assert database.scores_revision() == 0
+        database.insert_score(Score(song_id="song0", rating_class=2, score=9000000))
+        assert database.scores_revision() == 1
+
+        database.disable_scores_revision()
+        assert database.scores_revision() is None
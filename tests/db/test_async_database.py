@@ -0,0 +1,91 @@
+import asyncio
+import inspect
+import threading
+
+from sqlalchemy import event
+
+from arcaea_offline.async_database import AsyncDatabase
+from arcaea_offline.database import Database, ScoreQuery
+from arcaea_offline.models import Score
+
+from .db import insert_test_charts
+
+
+class Test_AsyncDatabase:
+    def test_concurrent_requests(self, tmp_path):
+        engine = Database.create_engine(tmp_path / "arcaea_offline.db")
+        connections = []
+        event.listen(engine, "connect", lambda *args: connections.append(args[0]))
+        database = Database(engine)
+        database.engine = engine
+        database.init()
+        insert_test_charts(database, [(f"song{i}", 2, 90 + i, None) for i in range(40)])
+
+        async def main():
+            async with AsyncDatabase(database, max_workers=3) as async_database:
+                await async_database.insert_scores(
+                    Score(song_id=f"song{i}", rating_class=2, score=9800000)
+                    for i in range(40)
+                )
+                results = await asyncio.gather(
+                    *[async_database.get_b30() for _ in range(50)],
+                    *[async_database.get_chart(f"song{i}", 2) for i in range(40)],
+                    *[async_database.recommend_charts(11.0) for _ in range(10)],
+                )
+                assert await async_database.count_scores() == 40
+            return results
+
+        results = asyncio.run(main())
+        assert set(results[:50]) == {database.get_b30()}
+        assert [chart.constant for chart in results[50:90]] == list(range(90, 130))
+        recommended = [[chart.song_id for chart in charts] for charts in results[90:]]
+        assert (
+            recommended
+            == [[chart.song_id for chart in database.recommend_charts(11.0)]] * 10
+        )
+        assert len(recommended[0]) > 0
+
+        # connections are pooled, at most one per worker thread (+ `init`s)
+        assert len(connections) <= 4
+
+    def test_iter_scores(self, tmp_path):
+        engine = Database.create_engine(tmp_path / "arcaea_offline.db")
+        database = Database(engine)
+        database.engine = engine
+        database.init()
+        insert_test_charts(database, [("song0", 2, 100, None)])
+        database.insert_scores(
+            Score(song_id="song0", rating_class=2, score=9000000 + i, date=i + 1)
+            for i in range(250)
+        )
+
+        query_threads = []
+
+        def before_cursor_execute(conn, cursor, statement, *args):
+            if "FROM scores" in statement:
+                query_threads.append(threading.current_thread().name)
+
+        event.listen(engine, "before_cursor_execute", before_cursor_execute)
+
+        async def main():
+            async with AsyncDatabase(database) as async_database:
+                assert not inspect.iscoroutinefunction(async_database.sessionmaker)
+                assert async_database.sessionmaker is database.sessionmaker
+
+                scores = [
+                    score.score
+                    async for score in async_database.iter_scores(page_size=100)
+                ]
+                query = ScoreQuery(order="date", descending=True)
+                dates = [
+                    score.date
+                    async for score in async_database.iter_scores_calculated(query)
+                ]
+            return scores, dates
+
+        scores, dates = asyncio.run(main())
+        assert scores == [9000000 + i for i in range(250)]
+        assert dates == list(range(250, 0, -1))
+        # 3 pages, then 1 page of dated and 1 of undated scores
+        assert len(query_threads) == 5
+        assert all(name.startswith("arcaea-offline-async") for name in query_threads)
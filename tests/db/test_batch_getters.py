@@ -0,0 +1,55 @@
+from arcaea_offline.models import Score
+
+from .db import create_database_in_memory, insert_test_charts
+
+
+def _database():
+    database = create_database_in_memory()
+    # more keys than `Database.CHART_KEYS_CHUNK_SIZE`
+    insert_test_charts(
+        database,
+        [(f"song{i}", rc, 80 + i % 30, None) for i in range(300) for rc in range(3)],
+    )
+    database.insert_scores(
+        Score(song_id=f"song{i}", rating_class=2, score=9800000 + i)
+        for i in range(0, 300, 2)
+    )
+    return database
+
+
+class Test_BatchGetters:
+    def test_same_as_single_getters(self):
+        database = _database()
+        keys = [(f"song{i}", rc) for i in range(310) for rc in range(4)]
+
+        charts = database.get_charts(keys)
+        assert len(charts) == 900
+        assert charts[("song5", 1)].constant == database.get_chart("song5", 1).constant
+        assert ("song305", 0) not in charts
+        assert ("song5", 3) not in charts
+
+        chart_infos = database.get_chart_infos_by_keys(keys)
+        assert chart_infos.keys() == charts.keys()
+        difficulties = database.get_difficulties_by_keys(iter(keys))
+        assert difficulties.keys() == charts.keys()
+
+        scores_best = database.get_scores_best(keys)
+        assert len(scores_best) == 150
+        for key, score_best in scores_best.items():
+            assert score_best.score == database.get_score_best(*key).score
+
+    def test_without_keys(self):
+        database = _database()
+        assert len(database.get_chart_infos()) == 900
+        assert len(database.get_difficulties()) == 900
+        assert database.get_chart_infos_by_keys([]) == {}
+        assert database.get_charts([]) == {}
+
+    def test_catalog_cache(self):
+        database = _database()
+        keys = [("song1", 2), ("song1", 3), ("song1", 2)]
+        expected = database.get_charts(keys)
+        database.enable_catalog_cache()
+        assert database.get_charts(keys).keys() == expected.keys() == {("song1", 2)}
+        assert database.get_scores_best(keys).keys() == set()
+        database.disable_catalog_cache()
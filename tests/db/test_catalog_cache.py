@@ -0,0 +1,124 @@
+import pytest
+from sqlalchemy import create_engine, update
+
+from arcaea_offline.database import Database
+from arcaea_offline.external.upsert import bulk_upsert
+from arcaea_offline.models import ChartInfo, ChartRecord, Score, Song
+
+from .db import create_database_in_memory, insert_test_charts
+
+
+def _chart_keys(charts):
+    return [(c.song_id, c.rating_class, c.constant) for c in charts]
+
+
+class Test_CatalogCache:
+    def test_getters(self):
+        database = create_database_in_memory()
+        insert_test_charts(
+            database,
+            [(f"song{i}", rc, 90 + i, None) for i in range(5) for rc in range(3)],
+        )
+        expected = {
+            "songs": [s.id for s in database.get_songs()],
+            "pack": database.get_pack("test").name,
+            "difficulties": [
+                (d.song_id, d.rating_class)
+                for d in database.get_difficulties_by_song_id("song1")
+            ],
+            "charts": _chart_keys(database.get_charts_by_pack_id("test")),
+            "chart": _chart_keys([database.get_chart("song2", 1)]),
+        }
+
+        database.enable_catalog_cache(preload=True)
+        for _ in range(2):
+            assert [s.id for s in database.get_songs()] == expected["songs"]
+            assert database.get_pack("test").name == expected["pack"]
+            assert [
+                (d.song_id, d.rating_class)
+                for d in database.get_difficulties_by_song_id("song1")
+            ] == expected["difficulties"]
+            assert (
+                _chart_keys(database.get_charts_by_pack_id("test"))
+                == expected["charts"]
+            )
+            assert _chart_keys([database.get_chart("song2", 1)]) == expected["chart"]
+            assert database.get_chart("song9", 1) is None
+            assert database.get_songs_by_pack_id("missing") == []
+
+        with pytest.raises(AttributeError):
+            database.get_song("song0").title = "changed"
+        assert isinstance(database.get_chart("song2", 1), ChartRecord)
+
+        stats = database.catalog_cache_stats()
+        assert stats.hits == 16
+        assert stats.rows["charts"] == 15
+        assert stats.memory_bytes > 0
+
+        database.disable_catalog_cache()
+        assert database.catalog_cache_stats() is None
+
+    def test_invalidated_by_own_writes(self):
+        database = create_database_in_memory()
+        insert_test_charts(database, [("song0", 2, 90, None)])
+        cache = database.enable_catalog_cache()
+        assert database.get_chart("song0", 2).constant == 90
+        assert database.get_song("song0").title == "song0"
+
+        # ORM writes
+        with database.sessionmaker() as session:
+            session.merge(ChartInfo(song_id="song0", rating_class=2, constant=95))
+            session.commit()
+        assert database.get_chart("song0", 2).constant == 95
+
+        # core writes, as done by the parsers
+        with database.sessionmaker() as session:
+            bulk_upsert(
+                session,
+                [Song(idx=0, id="song0", title="changed", artist="test", set="test")],
+            )
+            session.execute(update(ChartInfo).values(notes=1000))
+            session.commit()
+        assert database.get_song("song0").title == "changed"
+        assert database.get_chart_info("song0", 2).notes == 1000
+
+        # rolled back writes keep the cache
+        invalidations = cache.invalidations
+        with database.sessionmaker() as session:
+            session.merge(Song(id="song0", title="rolled back"))
+            session.flush()
+            session.rollback()
+        assert database.get_song("song0").title == "changed"
+        assert cache.invalidations == invalidations
+
+    def test_invalidated_by_other_connections(self, tmp_path):
+        engine = create_engine(f"sqlite:///{tmp_path / 'arcaea_offline.db'}")
+        database = Database(engine)
+        database.engine = engine
+        database.init()
+        insert_test_charts(database, [("song0", 2, 90, None)])
+
+        cache = database.enable_catalog_cache(preload=True)
+        assert database.get_song("song0").title == "song0"
+        assert database.get_song("song0").title == "song0"
+
+        # commits outside of the catalog keep it
+        database.insert_score(Score(song_id="song0", rating_class=2, score=9900000))
+        database.insert_scores_chunked([("song0", 2, 9800000)])
+        misses = cache.misses
+        assert database.get_song("song0").title == "song0"
+        assert database.get_chart("song0", 2).constant == 90
+        assert cache.misses == misses
+
+        other_engine = create_engine(f"sqlite:///{tmp_path / 'arcaea_offline.db'}")
+        with other_engine.begin() as conn:
+            conn.execute(update(Song).values(title="changed"))
+        other_engine.dispose()
+
+        assert database.get_song("song0").title == "changed"
+        assert database.get_chart("song0", 2).title == "changed"
+        assert database.get_pack("test").name == "Test Pack"
+        # songs, and the charts view over them
+        assert cache.misses == misses + 2
+        database.disable_catalog_cache()
+        engine.dispose()
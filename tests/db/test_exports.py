@@ -0,0 +1,50 @@
+import io
+import json
+
+from arcaea_offline.models import Score
+
+from .db import create_database_in_memory
+
+
+def _json_dump(obj) -> bytes:
+    fp = io.StringIO()
+    json.dump(obj, fp)
+    return fp.getvalue().encode("utf-8")
+
+
+def _write(write, **kwargs) -> bytes:
+    fp = io.BytesIO()
+    write(fp, **kwargs)
+    return fp.getvalue()
+
+
+class Test_StreamingExports:
+    def test_empty(self):
+        database = create_database_in_memory()
+        assert _write(database.write_scores) == b"[]"
+        assert _write(database.write_scores_def_v2) == _json_dump(
+            database.export_scores_def_v2()
+        )
+        assert _write(database.write_scores_def_v2, ndjson=True) == b""
+
+    def test_same_as_json_dump(self):
+        database = create_database_in_memory()
+        database.insert_scores(
+            [
+                Score(song_id="a", rating_class=2, score=9900000, comment='好\n"1"'),
+                Score(song_id="b", rating_class=0, score=10000000, pure=100, date=1),
+                *[Score(song_id="c", rating_class=1, score=i) for i in range(2500)],
+            ]
+        )
+
+        assert _write(database.write_scores) == _json_dump(database.export_scores())
+        assert _write(database.write_scores_def_v2) == _json_dump(
+            database.export_scores_def_v2()
+        )
+
+        lines = _write(database.write_scores_def_v2, ndjson=True).splitlines()
+        assert [json.loads(line) for line in lines] == (
+            database.export_scores_def_v2()["scores"]
+        )
+        lines = _write(database.write_scores, ndjson=True).splitlines()
+        assert [json.loads(line) for line in lines] == database.export_scores()
@@ -0,0 +1,90 @@
+import tracemalloc
+
+import pytest
+from sqlalchemy import inspect
+
+from arcaea_offline.models import Score
+
+from .db import create_database_in_memory
+
+
+class Test_InsertScores:
+    def test_row_types(self):
+        database = create_database_in_memory()
+        progress = []
+        result = database.insert_scores_chunked(
+            [
+                Score(song_id="a", rating_class=2, score=9900000, pure=1000),
+                {"song_id": "b", "rating_class": 1, "score": 9800000, "date": 1},
+                ("c", 0, 9700000, 900, 10, 5),
+            ],
+            chunk_size=2,
+            progress=lambda r: progress.append((r.inserted, r.chunks)),
+        )
+        assert (result.inserted, result.skipped, result.chunks) == (3, 0, 2)
+        assert progress == [(2, 1), (3, 2)]
+
+        scores = {s.song_id: s for s in database.get_scores()}
+        assert scores["a"].pure == 1000
+        assert scores["b"].date == 1
+        assert (scores["c"].far, scores["c"].lost, scores["c"].date) == (10, 5, None)
+
+        with pytest.raises(ValueError, match="Unknown score fields"):
+            database.insert_scores([{"song_id": "a", "potential": 1}])
+        with pytest.raises(ValueError, match="at most"):
+            database.insert_scores([tuple(range(12))])
+
+    def test_atomic(self):
+        database = create_database_in_memory()
+        rows = [("a", 2, 9000000 + i) for i in range(1500)]
+        # the first chunk of 1000 is inserted before the last row fails
+        with pytest.raises(ValueError, match="Unknown score fields"):
+            database.insert_scores([*rows, {"song_id": "a", "potential": 1}])
+        assert database.count_scores() == 0
+
+        with pytest.raises(ValueError, match="Unknown score fields"):
+            database.insert_scores_chunked([*rows, {"song_id": "a", "potential": 1}])
+        assert database.count_scores() == 1000
+
+        assert database.insert_scores(rows) is None
+        assert database.count_scores() == 2500
+
+    def test_skip_duplicate(self):
+        database = create_database_in_memory()
+        database.insert_scores([("a", 2, 9900000, 990, 10, 0, 1670283375)])
+
+        result = database.insert_scores_chunked(
+            [
+                ("a", 2, 9900000, 991, 9, 0, 1670283375),  # same score & date
+                ("a", 2, 9900000, 990, 10, 0, 1670283376),
+                ("a", 2, 9900000, 990, 10, 0, None),
+                ("a", 2, 9900000, 991, 9, 0, None),  # earlier in the input
+                ("a", 1, 9900000, 990, 10, 0, 1670283375),
+            ],
+            chunk_size=3,
+            skip_duplicate=True,
+        )
+        assert (result.inserted, result.skipped) == (3, 2)
+        assert database.count_scores() == 4
+
+        indexes = inspect(database.engine).get_indexes("scores")
+        assert ["song_id", "rating_class", "score", "date"] in [
+            i["column_names"] for i in indexes
+        ]
+
+    def test_generator_memory(self):
+        database = create_database_in_memory()
+
+        def rows(start, count):
+            for i in range(start, start + count):
+                yield (f"song{i % 100}", i % 4, 9000000 + i, 1000, 0, 0, None)
+
+        peaks = []
+        for start, count in [(0, 2000), (2000, 20000)]:
+            tracemalloc.start()
+            database.insert_scores_chunked(rows(start, count), chunk_size=200)
+            peaks.append(tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+
+        assert database.count_scores() == 22000
+        assert peaks[1] < peaks[0] * 2
@@ -0,0 +1,84 @@
+import pytest
+
+from arcaea_offline.database import ScoreQuery
+from arcaea_offline.models import Score
+
+from .db import create_database_in_memory, insert_test_charts
+
+
+def _insert_scores(database):
+    insert_test_charts(database, [("a", 1, 90, 1000), ("a", 2, 100, 1200)])
+    scores = [
+        Score(
+            song_id="a",
+            rating_class=1 + i % 2,
+            score=9000000 + i * 1000,
+            date=None if i % 7 == 0 else 1700000000 + (i % 5) * 1000,
+            clear_type=i % 3,
+        )
+        for i in range(25)
+    ]
+    database.insert_scores(scores)
+    return database.get_scores()
+
+
+def _date_key(score):
+    # SQLite sorts NULLs first
+    return (score.date is not None, score.date or 0, score.id)
+
+
+class Test_IterScores:
+    def test_order(self):
+        database = create_database_in_memory()
+        scores = _insert_scores(database)
+
+        def ids(iterable):
+            return [score.id for score in iterable]
+
+        assert ids(database.iter_scores(page_size=3)) == ids(scores)
+        assert ids(
+            database.iter_scores(ScoreQuery(descending=True), page_size=4)
+        ) == ids(reversed(scores))
+        assert ids(database.iter_scores(ScoreQuery(order="date"), page_size=3)) == ids(
+            sorted(scores, key=_date_key)
+        )
+        assert ids(
+            database.iter_scores(ScoreQuery(order="date", descending=True))
+        ) == ids(sorted(scores, key=_date_key, reverse=True))
+
+        with pytest.raises(ValueError, match="order"):
+            ScoreQuery(order="score")
+        with pytest.raises(ValueError, match="page_size"):
+            database.iter_scores(page_size=0)
+
+    def test_filters(self):
+        database = create_database_in_memory()
+        scores = _insert_scores(database)
+
+        def ids(iterable):
+            return sorted(score.id for score in iterable)
+
+        assert ids(
+            database.iter_scores(ScoreQuery(rating_class=2, clear_type=1))
+        ) == ids(s for s in scores if s.rating_class == 2 and s.clear_type == 1)
+        assert ids(
+            database.iter_scores(
+                ScoreQuery(date_from=1700001000, date_to=1700003000, order="date"),
+                page_size=2,
+            )
+        ) == ids(s for s in scores if s.date and 1700001000 <= s.date < 1700003000)
+        assert list(database.iter_scores(ScoreQuery(song_id="b"))) == []
+
+        calculated = list(
+            database.iter_scores_calculated(
+                ScoreQuery(rating_class=1, order="date"), page_size=2
+            )
+        )
+        assert ids(calculated) == ids(s for s in scores if s.rating_class == 1)
+        assert all(s.potential is not None for s in calculated)
+
+    def test_export(self):
+        database = create_database_in_memory()
+        scores = _insert_scores(database)
+        exported = database.export_scores_def_v2()["scores"]
+        assert [score["id"] for score in exported] == [score.id for score in scores]
@@ -0,0 +1,68 @@
+from arcaea_offline.models import ChartInfo, Score, ScoreBestMaterialized
+
+from .db import create_database_in_memory, insert_test_charts
+
+
+def _database():
+    database = create_database_in_memory()
+    insert_test_charts(database, [(f"song{i}", 2, 80 + i, None) for i in range(40)])
+    return database
+
+
+class Test_MaterializedScores:
+    def test_triggers(self):
+        database = _database()
+        database.insert_scores(
+            [
+                Score(song_id=f"song{i}", rating_class=2, score=9800000)
+                for i in range(40)
+            ]
+        )
+        database.enable_materialized_scores()
+        assert database.materialized_scores
+        assert database.check_materialized_scores().ok
+
+        # insert
+        database.insert_score(Score(song_id="song0", rating_class=2, score=10000000))
+        assert database.check_materialized_scores().ok
+        best = database.get_score_best("song0", 2)
+        assert isinstance(best, ScoreBestMaterialized)
+        assert best.score == 10000000
+
+        # update
+        score = database.get_score(1)
+        score.song_id = "song39"
+        score.score = 9999999
+        database.update_score(score)
+        assert database.check_materialized_scores().ok
+
+        # delete
+        database.delete_score(database.get_score(2))
+        assert database.check_materialized_scores().ok
+
+        # chart constant changes
+        with database.sessionmaker() as session:
+            session.merge(ChartInfo(song_id="song10", rating_class=2, constant=120))
+            session.commit()
+        report = database.check_materialized_scores()
+        assert report.ok
+        assert database.get_b30() == report.b30_view
+
+    def test_rebuild_and_disable(self):
+        database = _database()
+        database.enable_materialized_scores()
+        assert database.get_b30() is None
+        assert database.count_scores_best() == 0
+
+        with database.engine.begin() as conn:
+            conn.exec_driver_sql("DELETE FROM scores_best_materialized")
+            conn.exec_driver_sql("DROP TRIGGER trg_materialized_scores_scores_insert")
+        database.insert_score(Score(song_id="song0", rating_class=2, score=9500000))
+        assert database.check_materialized_scores().missing == [("song0", 2)]
+
+        database.rebuild_materialized_scores()
+        assert database.check_materialized_scores().ok
+
+        database.disable_materialized_scores()
+        assert not database.materialized_scores
+        assert database.get_b30() == 8.0
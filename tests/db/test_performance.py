@@ -0,0 +1,78 @@
+import sqlite3
+import threading
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from arcaea_offline.database import Database
+from arcaea_offline.models import Score
+from arcaea_offline.performance import SqlitePerformanceProfile, get_performance_profile
+
+
+def _database(path, profile):
+    engine = Database.create_engine(path, profile=profile)
+    database = Database(engine)
+    database.engine = engine
+    database.init()
+    return database
+
+
+class Test_PerformanceProfile:
+    def test_pragmas(self, tmp_path):
+        profile = SqlitePerformanceProfile(cache_size=-2000, busy_timeout=1234)
+        database = _database(tmp_path / "arcaea_offline.db", profile)
+        assert get_performance_profile(database.engine) is profile
+
+        with database.engine.connect() as conn:
+            pragmas = {
+                name: conn.exec_driver_sql(f"PRAGMA {name}").scalar()
+                for name in [
+                    "journal_mode",
+                    "synchronous",
+                    "cache_size",
+                    "temp_store",
+                    "busy_timeout",
+                ]
+            }
+        assert pragmas == {
+            "journal_mode": "wal",
+            "synchronous": 1,
+            "cache_size": -2000,
+            "temp_store": 2,
+            "busy_timeout": 1234,
+        }
+
+        plain_engine = Database.create_engine(tmp_path / "plain.db", profile=None)
+        assert get_performance_profile(plain_engine) is None
+
+    def test_retry_when_locked(self, tmp_path):
+        path = tmp_path / "arcaea_offline.db"
+        database = _database(
+            path,
+            SqlitePerformanceProfile(
+                busy_timeout=10, write_retries=10, retry_backoff=0.02
+            ),
+        )
+
+        # another process holding the write lock for a while
+        other = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        other.execute("BEGIN IMMEDIATE")
+        timer = threading.Timer(0.2, other.commit)
+        timer.start()
+        database.insert_score(Score(song_id="test", rating_class=2, score=9900000))
+        timer.join()
+        other.close()
+        assert database.count_scores() == 1
+
+        # giving up after `write_retries`
+        database = _database(
+            path,
+            SqlitePerformanceProfile(busy_timeout=10, write_retries=2, retry_backoff=0),
+        )
+        other = sqlite3.connect(path, isolation_level=None)
+        other.execute("BEGIN IMMEDIATE")
+        with pytest.raises(OperationalError, match="database is locked"):
+            database.insert_score(Score(song_id="test", rating_class=2, score=9900000))
+        other.rollback()
+        other.close()
+        assert database.count_scores() == 1
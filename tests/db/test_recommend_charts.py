@@ -0,0 +1,91 @@
+import math
+import random
+
+from sqlalchemy import select
+
+from arcaea_offline.models import Score, ScoreBest
+
+from .db import create_database_in_memory, insert_test_charts
+
+
+def _recommend_charts_legacy(database, play_result: float, bounds: float = 0.1):
+    """The per-constant, per-chart implementation `recommend_charts` replaced."""
+    base_constant = math.ceil(play_result * 10)
+
+    results = []
+    results_id = []
+    with database.sessionmaker() as session:
+        for constant in range(base_constant - 20, base_constant + 1):
+            score_modifier = (play_result * 10 - constant) / 10
+            if score_modifier >= 2.0:
+                min_score = 10000000
+            elif score_modifier >= 1.0:
+                min_score = 200000 * (score_modifier - 1) + 9800000
+            else:
+                min_score = 300000 * score_modifier + 9500000
+            min_score = int(min_score)
+
+            charts = database.get_charts_by_constant(constant)
+            for chart in charts:
+                score_best_stmt = select(ScoreBest).where(
+                    (ScoreBest.song_id == chart.song_id)
+                    & (ScoreBest.rating_class == chart.rating_class)
+                    & (ScoreBest.score >= min_score)
+                    & (play_result - bounds < ScoreBest.potential)
+                    & (ScoreBest.potential < play_result + bounds)
+                )
+                if session.scalar(score_best_stmt):
+                    chart_id = f"{chart.song_id},{chart.rating_class}"
+                    if chart_id not in results_id:
+                        results.append(chart)
+                        results_id.append(chart_id)
+
+    return results
+
+
+def _chart_keys(charts):
+    return [(c.constant, c.song_id, c.rating_class) for c in charts]
+
+
+class Test_RecommendCharts:
+    def test_same_as_legacy(self):
+        rng = random.Random(283375)
+        database = create_database_in_memory()
+        charts = [
+            (f"song{i}", rating_class, rng.randint(70, 120), None)
+            for i in range(100)
+            for rating_class in range(4)
+        ]
+        insert_test_charts(database, charts)
+        database.insert_scores(
+            Score(
+                song_id=song_id,
+                rating_class=rating_class,
+                score=rng.randint(9000000, 10002000),
+            )
+            for song_id, rating_class, _, _ in charts
+            for _ in range(rng.randint(0, 3))
+        )
+
+        for play_result in [9.5, 10.0, 10.7, 11.25, 12.0, 12.5]:
+            for bounds in [0.1, 0.5]:
+                expected = sorted(
+                    _chart_keys(_recommend_charts_legacy(database, play_result, bounds))
+                )
+                results = _chart_keys(database.recommend_charts(play_result, bounds))
+                assert results == expected
+
+    def test_paging(self):
+        database = create_database_in_memory()
+        insert_test_charts(database, [(f"song{i}", 2, 100, None) for i in range(10)])
+        database.insert_scores(
+            Score(song_id=f"song{i}", rating_class=2, score=9800000) for i in range(10)
+        )
+
+        results = _chart_keys(database.recommend_charts(11.0))
+        assert len(results) == 10
+        assert _chart_keys(database.recommend_charts(11.0, limit=4)) == results[:4]
+        assert (
+            _chart_keys(database.recommend_charts(11.0, limit=4, offset=8))
+            == results[8:]
+        )
@@ -0,0 +1,87 @@
+import pytest
+
+from arcaea_offline.database import ScoreQuery
+from arcaea_offline.models import (
+    ChartRecord,
+    Score,
+    ScoreBestRecord,
+    ScoreCalculatedRecord,
+    ScoreRecord,
+)
+from arcaea_offline.models.records import RECORD_TYPES, to_record
+
+from .db import create_database_in_memory, insert_test_charts
+
+
+def _database():
+    database = create_database_in_memory()
+    insert_test_charts(database, [("a", 1, 90, 1000), ("a", 2, 100, 1200)])
+    database.insert_scores(
+        Score(song_id="a", rating_class=1 + i % 2, score=9800000 + i, date=i)
+        for i in range(10)
+    )
+    return database
+
+
+def _values(instance):
+    # the catalog cache returns records already
+    if isinstance(instance, tuple):
+        return instance._asdict()
+    return to_record(instance)._asdict()
+
+
+class Test_Records:
+    @pytest.mark.parametrize("model", list(RECORD_TYPES))
+    def test_fields(self, model):
+        assert set(RECORD_TYPES[model]._fields) == set(model.__table__.columns.keys())
+
+    def test_scores(self):
+        database = _database()
+
+        records = database.get_scores(as_records=True)
+        assert all(isinstance(record, ScoreRecord) for record in records)
+        assert [r._asdict() for r in records] == [
+            _values(s) for s in database.get_scores()
+        ]
+        assert database.get_score(3, as_records=True) == records[2]
+        assert database.get_score(30, as_records=True) is None
+
+        calculated = list(database.iter_scores_calculated(as_records=True))
+        assert all(isinstance(record, ScoreCalculatedRecord) for record in calculated)
+        assert [r._asdict() for r in calculated] == [
+            _values(s) for s in database.iter_scores_calculated()
+        ]
+        assert list(
+            database.iter_scores(ScoreQuery(order="date"), page_size=3, as_records=True)
+        ) == sorted(records, key=lambda r: (r.date, r.id))
+
+    def test_scores_best(self):
+        database = _database()
+        for _ in range(2):
+            best = database.get_score_best("a", 2, as_records=True)
+            assert isinstance(best, ScoreBestRecord)
+            assert best._asdict() == _values(database.get_score_best("a", 2))
+            assert (
+                database.get_scores_best([("a", 2), ("a", 1)], as_records=True)[
+                    ("a", 2)
+                ]
+                == best
+            )
+            database.enable_materialized_scores()
+
+    def test_charts(self):
+        database = _database()
+        for _ in range(2):
+            charts = database.get_charts_by_song_id("a", as_records=True)
+            assert all(isinstance(chart, ChartRecord) for chart in charts)
+            assert [c._asdict() for c in charts] == [
+                _values(c) for c in database.get_charts_by_song_id("a")
+            ]
+            assert database.get_chart("a", 2, as_records=True) == charts[1]
+            assert database.get_charts_by_constant(90, as_records=True) == charts[:1]
+            assert database.get_charts_by_pack_id("test", as_records=True) == charts
+            assert database.get_charts([("a", 1)], as_records=True) == {
+                ("a", 1): charts[0]
+            }
+            database.enable_catalog_cache()
+        assert database.get_charts_by_song_id("a") == charts
@@ -0,0 +1,126 @@
+import pytest
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.exc import IntegrityError
+
+from arcaea_offline.database import Database
+from arcaea_offline.migrations import SCHEMA_VERSION
+from arcaea_offline.models import Score
+from arcaea_offline.utils.score_fingerprint import (
+    FINGERPRINT_FIELDS,
+    score_fingerprint,
+)
+
+from .db import create_database_in_memory
+
+
+class Test_ScoreFingerprint:
+    @staticmethod
+    def fingerprint(*fields):
+        return score_fingerprint(dict(zip(FINGERPRINT_FIELDS, fields)))
+
+    def test_fingerprint(self):
+        truncated = self.fingerprint("song", 2, 9900000, 990, 10, 0, 167028)
+        assert truncated == self.fingerprint("song", 2, 9900000, 990, 10, 0, 1670280000)
+        assert truncated == self.fingerprint(
+            "song", 2, 9900000, 990, 10, 0, 1670280000123
+        )
+        assert truncated != self.fingerprint("song", 2, 9900000, 990, 10, 1, 1670280000)
+
+    def test_duplicates(self):
+        database = create_database_in_memory()
+        database.insert_score(
+            Score(song_id="song", rating_class=2, score=9900000, date=1670280000)
+        )
+        assert database.get_score(1).fingerprint == self.fingerprint(
+            "song", 2, 9900000, None, None, None, 1670280000
+        )
+
+        result = database.insert_scores_chunked(
+            [
+                ("song", 2, 9900000, None, None, None, 167028),
+                ("song", 2, 9900000, 990, 10, 0, 167028),
+                ("song", 2, 9900000, 990, 10, 0, 1670280000),
+            ]
+        )
+        assert (result.inserted, result.skipped) == (1, 2)
+
+        with pytest.raises(IntegrityError):
+            database.insert_score(
+                Score(song_id="song", rating_class=2, score=9900000, date=1670280000)
+            )
+
+    def test_undated_duplicates(self):
+        database = create_database_in_memory()
+        for _ in range(2):
+            database.insert_score(Score(song_id="song", rating_class=2, score=9900000))
+        result = database.insert_scores_chunked([("song", 2, 9900000)])
+        assert (result.inserted, result.skipped) == (1, 0)
+        assert database.count_scores() == 3
+
+        result = database.backfill_score_fingerprints()
+        assert (result.updated, result.merged) == (0, 0)
+        assert database.count_scores() == 3
+
+    def test_migrate_and_backfill(self, tmp_path):
+        path = tmp_path / "arcaea_offline.db"
+        engine = create_engine(f"sqlite:///{path}")
+        with engine.begin() as conn:
+            # a `scores` table from before fingerprints
+            conn.exec_driver_sql(
+                "CREATE TABLE scores (id INTEGER PRIMARY KEY, song_id TEXT, "
+                "rating_class INTEGER, score INTEGER, pure INTEGER, far INTEGER, "
+                "lost INTEGER, date INTEGER, max_recall INTEGER, modifier INTEGER, "
+                "clear_type INTEGER, comment TEXT)"
+            )
+            conn.exec_driver_sql(
+                "INSERT INTO scores (song_id, rating_class, score, pure, far, lost, "
+                "date, clear_type, comment) VALUES "
+                "('song', 2, 9900000, 990, 10, 0, 1670280000, NULL, 'manual'), "
+                "('song', 2, 9900000, 990, 10, 0, 167028, 2, 'st3'), "
+                "('song', 2, 9800000, 980, 20, 0, 1670280000, 1, NULL), "
+                "('song', 2, 9900000, 990, 10, 0, 1670280000, NULL, NULL)"
+            )
+
+        database = Database(engine)
+        database.engine = engine
+        database.init()
+        assert "fingerprint" in {
+            c["name"] for c in inspect(engine).get_columns("scores")
+        }
+        assert database.version() == SCHEMA_VERSION
+        assert database.check_init()
+
+        result = database.backfill_score_fingerprints()
+        assert (result.updated, result.merged) == (2, 2)
+        scores = database.get_scores()
+        assert [(s.id, s.clear_type, s.comment) for s in scores] == [
+            (1, 2, "manual"),
+            (3, 1, None),
+        ]
+        assert all(s.fingerprint for s in scores)
+
+        result = database.backfill_score_fingerprints()
+        assert (result.updated, result.merged) == (0, 0)
+        engine.dispose()
+
+    def test_check_init_version_4(self, tmp_path):
+        path = tmp_path / "arcaea_offline.db"
+        engine = create_engine(f"sqlite:///{path}")
+        database = Database(engine)
+        database.engine = engine
+        database.init()
+        with engine.begin() as conn:
+            # a version 4 database, from before fingerprints
+            conn.exec_driver_sql("DROP INDEX ux_scores_fingerprint")
+            conn.exec_driver_sql("ALTER TABLE scores DROP COLUMN fingerprint")
+            conn.exec_driver_sql(
+                "UPDATE properties SET value = '4' WHERE key = 'version'"
+            )
+        assert not database.check_init()
+
+        database.init()
+        assert database.check_init()
+        assert database.version() == SCHEMA_VERSION
+        database.insert_score(Score(song_id="song", rating_class=2, score=9900000))
+        assert database.get_score(1).fingerprint
+        engine.dispose()
@@ -0,0 +1,36 @@
+import csv
+import io
+
+from arcaea_offline.external.smartrte import SmartRteB30CsvConverter
+from arcaea_offline.models import Score
+
+from .db import create_database_in_memory, insert_test_charts
+
+
+class Test_SmartRteB30CsvConverter:
+    def test_rows(self):
+        database = create_database_in_memory()
+        insert_test_charts(database, [("a,b", 2, 98, 1000), ("c", 3, 105, 1200)])
+        database.insert_scores(
+            [
+                Score(song_id="a,b", rating_class=2, score=9950000, pure=990, far=10),
+                Score(song_id="c", rating_class=3, score=9712345),
+            ]
+        )
+
+        with database.sessionmaker() as session:
+            converter = SmartRteB30CsvConverter(session)
+            fp = io.StringIO(newline="")
+            converter.write_csv(fp)
+            # the session is still usable
+            rows = list(converter.iter_rows())
+            assert converter.rows() == rows
+
+        assert rows[0] == SmartRteB30CsvConverter.CSV_ROWS
+        assert rows[1][:3] == ["ab", "a,b", "Future"]
+        assert rows[1][-2:] == [9.8, round(9.8 + 1 + 150000 / 200000, 5)]
+        assert rows[2][-2:] == [10.5, round(10.5 + 212345 / 300000, 5)]
+
+        expected = io.StringIO(newline="")
+        csv.writer(expected).writerows(rows)
+        assert fp.getvalue() == expected.getvalue()
@@ -0,0 +1,97 @@
+import threading
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from arcaea_offline.database import Database
+from arcaea_offline.models import Score
+
+
+def _file_database(tmp_path):
+    engine = Database.create_engine(tmp_path / "arcaea_offline.db")
+    database = Database(engine)
+    database.engine = engine
+    database.init()
+    return database
+
+
+class Test_DatabaseWriter:
+    def test_stress(self, tmp_path):
+        database = _file_database(tmp_path)
+        writer = database.enable_writer()
+
+        threads_count = 8
+        jobs_per_thread = 100
+        futures = []
+        errors = []
+        futures_lock = threading.Lock()
+
+        def submit(thread_index: int):
+            try:
+                for i in range(jobs_per_thread):
+                    score = Score(
+                        song_id=f"song{thread_index}", rating_class=2, score=i
+                    )
+                    future = (
+                        database.submit_insert_score(score)
+                        if i % 2
+                        else database.submit_insert_scores([score])
+                    )
+                    with futures_lock:
+                        futures.append(future)
+                    # reads keep going while writing
+                    database.count_scores()
+            except Exception as e:  # noqa: BLE001
+                errors.append(e)
+
+        threads = [
+            threading.Thread(target=submit, args=(i,)) for i in range(threads_count)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for future in futures:
+            future.result(timeout=30)
+        database.disable_writer()
+
+        assert errors == []
+        assert database.count_scores() == threads_count * jobs_per_thread
+        assert writer.stats.jobs == threads_count * jobs_per_thread
+        assert writer.stats.failed_jobs == 0
+        assert writer.stats.commits < writer.stats.jobs
+
+    def test_failed_job_in_batch(self, tmp_path):
+        database = _file_database(tmp_path)
+        database.insert_score(Score(id=1, song_id="test", rating_class=2, score=1))
+
+        with database.enable_writer() as writer:
+            # keep the writer busy, so that the next jobs are batched together
+            started = threading.Event()
+            release = threading.Event()
+
+            def wait(session):
+                started.set()
+                release.wait()
+
+            database.submit_write(wait)
+            started.wait()
+            ok = database.submit_insert_score(
+                Score(song_id="test", rating_class=2, score=2)
+            )
+            duplicate = database.submit_insert_score(
+                Score(id=1, song_id="test", rating_class=2, score=3)
+            )
+            release.set()
+
+            assert ok.result(timeout=5) is None
+            with pytest.raises(IntegrityError):
+                duplicate.result(timeout=5)
+        database.disable_writer()
+
+        assert writer.stats.fallbacks == 1
+        assert writer.stats.failed_jobs == 1
+        assert sorted(s.score for s in database.get_scores()) == [1, 2]
+
+        with pytest.raises(ValueError, match="not enabled"):
+            database.submit_write(wait)
@@ -0,0 +1,83 @@
+import io
+import json
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+
+from arcaea_offline.external.arcsong.arcsong_json import ArcSongJsonBuilder
+from arcaea_offline.models import (
+    ChartInfo,
+    Difficulty,
+    DifficultyLocalized,
+    Pack,
+    Song,
+    SongLocalized,
+    SongsBase,
+)
+
+
+def _difficulty(**kw):
+    defaults = {"rating_plus": False, "audio_override": False, "jacket_override": False}
+    defaults.update(kw)
+    return Difficulty(**defaults)
+
+
+class Test_ArcSongJsonBuilder:
+    def db(self):
+        engine = create_engine("sqlite:///:memory:")
+        SongsBase.metadata.create_all(engine)
+        with Session(engine) as session:
+            session.add_all(
+                [
+                    Pack(id="base", name="Base"),
+                    Pack(id="base_append_1", name="Append"),
+                    Song(idx=0, id="song0", title="Song 0", artist="a", set="base"),
+                    Song(
+                        idx=1,
+                        id="song1",
+                        title="Song 1",
+                        artist="a",
+                        set="base_append_1",
+                    ),
+                    Song(
+                        idx=2, id="song2", title="No Difficulty", artist="a", set="base"
+                    ),
+                    SongLocalized(id="song0", title_ja="曲 0"),
+                    _difficulty(song_id="song0", rating_class=3, rating=10),
+                    _difficulty(song_id="song0", rating_class=2, rating=9),
+                    _difficulty(song_id="song1", rating_class=2, rating=9),
+                    DifficultyLocalized(
+                        song_id="song0", rating_class=3, title_ja="曲 0 BYD"
+                    ),
+                    ChartInfo(song_id="song0", rating_class=2, constant=95),
+                    ChartInfo(song_id="song1", rating_class=2, constant=97, notes=1000),
+                ]
+            )
+            session.commit()
+        return engine
+
+    def test_generate(self):
+        engine = self.db()
+        statements = []
+        event.listen(
+            engine, "before_cursor_execute", lambda *args: statements.append(args[2])
+        )
+
+        with Session(engine) as session:
+            arcsong = ArcSongJsonBuilder(session).generate_arcsong_json()
+
+        # one query per table, no matter how many songs there are
+        assert len(statements) == 6
+        assert [s["song_id"] for s in arcsong["songs"]] == ["song0", "song1"]
+        song0_difficulties = arcsong["songs"][0]["difficulties"]
+        assert [d["name_jp"] for d in song0_difficulties] == ["曲 0", "曲 0 BYD"]
+        assert [d["rating"] for d in song0_difficulties] == [95, 0]
+        assert arcsong["songs"][1]["difficulties"][0]["set_friendly"] == "Base - Append"
+
+    def test_write(self):
+        with Session(self.db()) as session:
+            builder = ArcSongJsonBuilder(session)
+            expected = json.dumps(builder.generate_arcsong_json())
+            fp = io.StringIO()
+            builder.write_arcsong_json(fp)
+            assert fp.getvalue() == expected
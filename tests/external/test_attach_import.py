@@ -0,0 +1,107 @@
+import sqlite3
+
+from sqlalchemy import create_engine, event, select
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import Pool
+
+from arcaea_offline.external.arcsong import ArcsongDbParser
+from arcaea_offline.external.chart_info_db import ChartInfoDbParser
+from arcaea_offline.external.upsert import (
+    UpsertResult,
+    _detach_databases,
+    attach_database,
+    bulk_upsert,
+)
+from arcaea_offline.models import ChartInfo, SongsBase
+
+SOURCE_ROWS = [
+    ("song0", 0, 35, 500),
+    ("song0", 1, 70, 0),
+    ("song0", 2, 95, None),
+    ("song1", 2, 104, 1234),
+]
+
+
+def _chart_infos(session: Session):
+    return [
+        (c.song_id, c.rating_class, c.constant, c.notes)
+        for c in session.scalars(
+            select(ChartInfo).order_by(ChartInfo.song_id, ChartInfo.rating_class)
+        )
+    ]
+
+
+class Test_AttachImport:
+    def db(self):
+        engine = create_engine("sqlite:///:memory:")
+        SongsBase.metadata.create_all(engine)
+        return engine
+
+    def test_chart_info_db(self, tmp_path):
+        filepath = tmp_path / "chart_info.db"
+        with sqlite3.connect(filepath) as conn:
+            conn.execute(
+                "CREATE TABLE charts_info (song_id TEXT, rating_class INTEGER, "
+                "constant INTEGER, notes INTEGER)"
+            )
+            conn.executemany("INSERT INTO charts_info VALUES (?, ?, ?, ?)", SOURCE_ROWS)
+
+        parser = ChartInfoDbParser(filepath)
+        with Session(self.db()) as expected_session:
+            bulk_upsert(expected_session, parser.parse())
+            expected = _chart_infos(expected_session)
+
+        with Session(self.db()) as session:
+            session.add(ChartInfo(song_id="song1", rating_class=2, constant=103))
+            session.add(
+                ChartInfo(song_id="song0", rating_class=0, constant=35, notes=500)
+            )
+            session.commit()
+
+            result = parser.write_database(session)
+            assert result == UpsertResult(inserted=2, updated=1, unchanged=1)
+            session.commit()
+            assert _chart_infos(session) == expected
+
+            # the source database is detached, importing again works
+            result = parser.write_database(session)
+            assert result == UpsertResult(unchanged=4)
+            session.commit()
+
+    def test_arcsong_db(self, tmp_path):
+        filepath = tmp_path / "arcsong.db"
+        with sqlite3.connect(filepath) as conn:
+            conn.execute(
+                "CREATE TABLE charts (song_id TEXT, rating_class INTEGER, "
+                "name_en TEXT, rating INTEGER, note INTEGER)"
+            )
+            conn.executemany(
+                "INSERT INTO charts VALUES (?, ?, 'name', ?, ?)", SOURCE_ROWS
+            )
+
+        parser = ArcsongDbParser(filepath)
+        with Session(self.db()) as expected_session:
+            bulk_upsert(expected_session, parser.parse())
+            expected = _chart_infos(expected_session)
+
+        with Session(self.db()) as session:
+            assert parser.write_database(session) == UpsertResult(inserted=4)
+            session.commit()
+            assert _chart_infos(session) == expected
+
+    def test_detach_listener_scope(self, tmp_path):
+        filepath = tmp_path / "chart_info.db"
+        sqlite3.connect(filepath).close()
+
+        engine = self.db()
+        other_engine = self.db()
+        with Session(engine) as session:
+            schema = attach_database(session, filepath)
+            session.commit()
+        with engine.connect() as conn:
+            databases = [row[1] for row in conn.exec_driver_sql("PRAGMA database_list")]
+        assert schema not in databases
+
+        assert event.contains(engine.pool, "checkin", _detach_databases)
+        assert not event.contains(other_engine.pool, "checkin", _detach_databases)
+        assert not event.contains(Pool, "checkin", _detach_databases)
@@ -0,0 +1,89 @@
+import sqlite3
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from arcaea_offline.external.arcaea import St3ScoreParser
+from arcaea_offline.models import Score, ScoresBase
+
+
+def _st3(filepath):
+    with sqlite3.connect(filepath) as conn:
+        conn.execute(
+            "CREATE TABLE scores (songId TEXT, songDifficulty INTEGER, score INTEGER, "
+            "perfectCount INTEGER, nearCount INTEGER, missCount INTEGER, "
+            "date INTEGER, modifier INTEGER)"
+        )
+        conn.execute(
+            "CREATE TABLE cleartypes (songId TEXT, songDifficulty INTEGER, "
+            "clearType INTEGER)"
+        )
+        conn.executemany(
+            "INSERT INTO scores VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                ("song0", 2, 9900000, 1000, 10, 0, 1670283375, 0),
+                ("song1", 2, 9500000, 950, 40, 10, 167028, 0),
+                ("song2", 3, 9800000, 980, 20, 0, 1670283375, 2),
+            ],
+        )
+        conn.executemany(
+            "INSERT INTO cleartypes VALUES (?, ?, ?)",
+            [("song0", 2, 2), ("song1", 2, 1)],
+        )
+    return filepath
+
+
+class Test_St3ScoreParser:
+    def test_parse(self, tmp_path):
+        scores = St3ScoreParser(_st3(tmp_path / "st3")).parse()
+
+        assert [(s.song_id, s.clear_type) for s in scores] == [
+            ("song0", 2),
+            ("song1", 1),
+            ("song2", None),
+        ]
+        assert scores[1].date == 1670280000
+
+    def test_write_database_skip_duplicate(self, tmp_path):
+        engine = create_engine("sqlite:///:memory:")
+        ScoresBase.metadata.create_all(engine)
+        parser = St3ScoreParser(_st3(tmp_path / "st3"))
+
+        with Session(engine) as session:
+            # entered by hand, without a date
+            session.add(Score(song_id="song0", rating_class=2, score=9900000))
+            session.commit()
+
+            result = parser.write_database(session)
+            session.commit()
+            assert (result.inserted, result.skipped) == (2, 1)
+            assert len(session.scalars(select(Score)).all()) == 3
+
+            # the same scores are never imported twice
+            parser.write_database(session)
+            session.commit()
+            assert len(session.scalars(select(Score)).all()) == 3
+
+            # only exact duplicates are skipped then
+            result = parser.write_database(session, skip_duplicate=False)
+            session.commit()
+            assert (result.inserted, result.skipped) == (1, 2)
+            assert len(session.scalars(select(Score)).all()) == 4
+
+    def test_write_database_skip_duplicate_dates(self, tmp_path):
+        engine = create_engine("sqlite:///:memory:")
+        ScoresBase.metadata.create_all(engine)
+        parser = St3ScoreParser(_st3(tmp_path / "st3"))
+
+        with Session(engine) as session:
+            session.add(
+                Score(song_id="song2", rating_class=3, score=9800000, date=1600000000)
+            )
+            session.commit()
+
+            result = parser.write_database(session)
+            session.commit()
+            assert (result.inserted, result.skipped) == (2, 1)
+            assert session.scalars(
+                select(Score.date).where(Score.song_id == "song2")
+            ).all() == [1600000000]
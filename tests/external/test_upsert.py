@@ -0,0 +1,50 @@
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from arcaea_offline.external.upsert import UpsertResult, bulk_upsert
+from arcaea_offline.models import Pack, Score, ScoresBase, SongsBase
+
+
+class Test_BulkUpsert:
+    def db(self):
+        engine = create_engine("sqlite:///:memory:")
+        SongsBase.metadata.create_all(engine)
+        ScoresBase.metadata.create_all(engine)
+        return engine
+
+    def test_counts(self):
+        with Session(self.db()) as session:
+            packs = [Pack(id=f"pack{i}", name=f"Pack {i}") for i in range(1000)]
+            result = bulk_upsert(session, packs)
+            assert result == UpsertResult(inserted=1000)
+
+            packs = [Pack(id=f"pack{i}", name=f"Pack {i}") for i in range(1001)]
+            packs[10].name = "Renamed"
+            result = bulk_upsert(session, packs, chunk_size=64)
+            assert result == UpsertResult(inserted=1, updated=1, unchanged=999)
+            assert session.scalar(select(Pack.name).where(Pack.id == "pack10")) == (
+                "Renamed"
+            )
+
+    def test_unset_attributes_preserved(self):
+        with Session(self.db()) as session:
+            bulk_upsert(session, [Pack(id="test", name="Test", description="desc")])
+            bulk_upsert(session, [Pack(id="test", name="Test Renamed")])
+            pack = session.scalar(select(Pack))
+            assert pack.name == "Test Renamed"
+            assert pack.description == "desc"
+
+    def test_duplicates_and_autoincrement(self):
+        with Session(self.db()) as session:
+            result = bulk_upsert(
+                session,
+                [
+                    Pack(id="test", name="First"),
+                    Pack(id="test", name="Last"),
+                    Score(song_id="test", rating_class=2, score=9900000),
+                    Score(song_id="test", rating_class=2, score=9900000),
+                ],
+            )
+            assert result == UpsertResult(inserted=3)
+            assert session.scalar(select(Pack.name)) == "Last"
+            assert len(session.scalars(select(Score)).all()) == 2
@@ -0,0 +1,197 @@
+from sqlalchemy import create_engine, delete
+from sqlalchemy.orm import Session
+
+from arcaea_offline.models import Song, SongLocalized, SongsBase
+from arcaea_offline.searcher import Searcher
+from arcaea_offline.searcher_fts5 import Fts5Searcher
+
+
+def _song(**kw):
+    defaults = {"artist": "test", "set": "test"}
+    defaults.update(kw)
+    return Song(**defaults)
+
+
+def _db():
+    engine = create_engine("sqlite:///:memory:")
+    SongsBase.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add_all(
+            [
+                _song(
+                    idx=0,
+                    id="grievouslady",
+                    title="Grievous Lady",
+                    artist="Team Grimoire",
+                ),
+                _song(
+                    idx=1, id="fractureray", title="Fracture Ray", artist="Sound Souler"
+                ),
+                _song(
+                    idx=2,
+                    id="tempestissimo",
+                    title="Tempestissimo",
+                    artist="t+pazolite",
+                ),
+                SongLocalized(id="tempestissimo", search_title_ja='["テンペスト"]'),
+            ]
+        )
+        session.commit()
+    return engine
+
+
+class Test_Searcher:
+    def test_search(self):
+        searcher = Searcher()
+        with Session(_db()) as session:
+            searcher.import_songs(session)
+
+        assert searcher.search("grievous")[0] == "grievouslady"
+        assert searcher.search("テンペスト")[0] == "tempestissimo"
+        assert "fracture" in searcher.did_you_mean("fractrue")
+
+    def test_persistent_index(self, tmp_path):
+        engine = _db()
+        index_dir = Searcher.index_dir_for(tmp_path / "arcaea_offline.db")
+        assert index_dir == tmp_path / "arcaea_offline.db.search-index"
+
+        with Session(engine) as session:
+            Searcher(index_dir).import_songs(session)
+
+        # warm start: the index is already there, and nothing changed
+        searcher = Searcher(index_dir)
+        assert searcher.search("fracture")[0] == "fractureray"
+        generation = searcher.index.latest_generation()
+        with Session(engine) as session:
+            searcher.import_songs(session)
+        assert searcher.index.latest_generation() == generation
+
+        # incremental changes
+        with Session(engine) as session:
+            session.merge(_song(idx=1, id="fractureray", title="Fracture Ray Remix"))
+            session.execute(delete(Song).where(Song.id == "grievouslady"))
+            session.commit()
+            searcher.import_songs(session)
+        assert searcher.search("remix") == ["fractureray"]
+        assert searcher.search("grievous") == []
+        assert searcher.index.doc_count() == 2
+
+    def test_did_you_mean_generation(self):
+        engine = _db()
+        searcher = Searcher()
+        with Session(engine) as session:
+            searcher.import_songs(session)
+            assert searcher.generation == 1
+            assert "testify" not in searcher.did_you_mean("testfy")
+
+            # nothing changed, the index is not written
+            searcher.import_songs(session)
+            assert searcher.generation == 1
+
+            session.add(_song(idx=3, id="testify", title="Testify"))
+            session.commit()
+            searcher.import_songs(session)
+        assert searcher.generation == 2
+        assert "testify" in searcher.did_you_mean("testfy")
+
+    def test_search_many(self):
+        engine = _db()
+        searcher = Searcher()
+        with Session(engine) as session:
+            searcher.import_songs(session)
+
+        strings = [
+            "grievous",
+            "テンペスト",
+            "fracture  ray",
+            "grievous",
+            "pazolite",
+        ] * 5
+        uncached_searcher = Searcher(search_cache_size=0)
+        with Session(engine) as session:
+            uncached_searcher.import_songs(session)
+        results = searcher.search_many(strings, limit=3, max_workers=4)
+        assert results == [uncached_searcher.search(s, limit=3) for s in strings]
+        assert searcher.search_cache.stats().misses == 4
+
+        assert searcher.search(" grievous ", limit=3) == results[0]
+        assert searcher.search_cache.hits == 1
+
+        # results of an older index generation are not reused
+        with Session(engine) as session:
+            session.execute(delete(Song).where(Song.id == "grievouslady"))
+            session.commit()
+            searcher.import_songs(session)
+        assert searcher.search_many(["grievous", "fracture ray"]) == [
+            [],
+            ["fractureray"],
+        ]
+
+
+class Test_Fts5Searcher:
+    def test_parity(self):
+        engine = _db()
+        searcher = Searcher()
+        fts5_searcher = Fts5Searcher(engine)
+        with Session(engine) as session:
+            searcher.import_songs(session)
+            fts5_searcher.import_songs(session)
+
+        for string in ["grievous lady", "テンペスト", "fracture", "pazolite", "gr"]:
+            assert fts5_searcher.search(string)[:1] == searcher.search(string)[:1]
+        for string in ["fractrue", "grievous lady", "grimoir"]:
+            assert sorted(fts5_searcher.did_you_mean(string)) == sorted(
+                searcher.did_you_mean(string)
+            )
+
+    def test_triggers(self):
+        engine = _db()
+        searcher = Fts5Searcher(engine)
+        with Session(engine) as session:
+            searcher.import_songs(session)
+            assert "testify" not in searcher.did_you_mean("testfy")
+            generation = searcher.generation
+
+            session.add(_song(idx=3, id="testify", title="Testify", artist="void"))
+            session.merge(_song(idx=1, id="fractureray", title="Fracture Ray Remix"))
+            session.execute(delete(Song).where(Song.id == "grievouslady"))
+            session.merge(
+                SongLocalized(id="testify", search_title_ja='["テスティファイ"]')
+            )
+            session.commit()
+
+        assert searcher.search("testify") == ["testify"]
+        assert "testify" in searcher.did_you_mean("testfy")
+        assert searcher.generation > generation
+        assert searcher.search("テスティファイ") == ["testify"]
+        assert searcher.search("remix") == ["fractureray"]
+        assert searcher.search("grievous") == []
+        assert searcher.search("") == []
+
+    def test_searcher_backend(self, monkeypatch):
+        engine = _db()
+        assert Fts5Searcher.is_supported(engine)
+        searcher = Searcher(engine=engine)
+        assert searcher.backend == "fts5"
+        with Session(engine) as session:
+            searcher.import_songs(session)
+            generation = searcher.generation
+            assert searcher.search("テンペスト") == ["tempestissimo"]
+            assert searcher.search_many(["grievous", "gr"]) == [
+                ["grievouslady"],
+                ["grievouslady"],
+            ]
+
+            # triggers keep the FTS5 table, and so the search cache, up to date
+            session.execute(delete(Song).where(Song.id == "grievouslady"))
+            session.commit()
+        assert searcher.generation > generation
+        assert searcher.search("grievous") == []
+
+        # SQLite without the trigram tokenizer falls back to Whoosh
+        monkeypatch.setattr(Fts5Searcher, "is_supported", lambda engine: False)
+        searcher = Searcher(engine=engine)
+        assert searcher.backend == "whoosh"
+        with Session(engine) as session:
+            searcher.import_songs(session)
+        assert searcher.search("fracture")[0] == "fractureray"
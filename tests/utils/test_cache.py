@@ -0,0 +1,26 @@
+from arcaea_offline.utils.cache import LRUCache
+
+
+class Test_LRUCache:
+    def test_eviction(self):
+        cache = LRUCache(2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        assert cache.get("a") == 1
+        cache.put("c", 3)
+
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.get_or_compute("c", lambda: 0) == 3
+        assert cache.get_or_compute("d", lambda: 4) == 4
+        assert len(cache) == 2
+
+        stats = cache.stats()
+        assert (stats.hits, stats.misses, stats.size) == (3, 2, 2)
+        assert stats.hit_rate == 0.6
+
+    def test_disabled(self):
+        cache = LRUCache(0)
+        cache.put("a", 1)
+        assert cache.get("a") is None
+        assert len(cache) == 0
@@ -0,0 +1,47 @@
+import random
+import string
+
+from arcaea_offline.utils.spelling import TermSuggester, levenshtein_distance
+
+
+def _levenshtein_distance_naive(a: str, b: str) -> int:
+    if not a or not b:
+        return len(a) + len(b)
+    return min(
+        _levenshtein_distance_naive(a[1:], b) + 1,
+        _levenshtein_distance_naive(a, b[1:]) + 1,
+        _levenshtein_distance_naive(a[1:], b[1:]) + (a[0] != b[0]),
+    )
+
+
+class Test_Spelling:
+    def test_levenshtein_distance(self):
+        rng = random.Random(2)
+        for _ in range(300):
+            a = "".join(rng.choices("abc", k=rng.randint(0, 6)))
+            b = "".join(rng.choices("abc", k=rng.randint(0, 6)))
+            distance = _levenshtein_distance_naive(a, b)
+            assert levenshtein_distance(a, b) == distance
+            assert levenshtein_distance(a, b, 1) == min(distance, 2)
+
+    def test_suggester_same_as_scan(self):
+        rng = random.Random(5)
+        alphabet = string.ascii_lowercase[:6]
+        terms = {
+            "".join(rng.choices(alphabet, k=rng.randint(1, 8))): rng.randint(0, 5)
+            for _ in range(500)
+        }
+        suggester = TermSuggester(terms)
+
+        for _ in range(50):
+            text = "".join(rng.choices(alphabet, k=rng.randint(1, 8)))
+            for maxdist in [0, 1, 2, 3]:
+                expected = [
+                    term
+                    for term in terms
+                    if levenshtein_distance(term, text, maxdist) <= maxdist
+                ]
+                assert sorted(suggester.terms_within(text, maxdist)) == sorted(expected)
+            assert sorted(suggester.terms_within(text, 2, prefix=1)) == sorted(
+                term for term in suggester.terms_within(text, 2) if term[0] == text[0]
+            )